@@ -1,12 +1,33 @@
+import hashlib
+import json
+
 import frappe
 from frappe import _
 from frappe import utils
+from frappe.utils.background_jobs import is_job_enqueued
+
+from ksa_logistics.masters import (
+    get_company_masters,
+    get_default_company,
+    get_expense_account,
+    get_trip_allowance_component,
+)
 
 """
 
 """
 
 
+# Child item table of each target doctype prefilled from Job Record items
+REMAINING_ITEMS_TARGETS = {
+    "Purchase Order": "Purchase Order Item",
+    "Purchase Invoice": "Purchase Invoice Item",
+    "Sales Order": "Sales Order Item",
+    "Sales Invoice": "Sales Invoice Item",
+    "Quotation": "Quotation Item"
+}
+
+
 @frappe.whitelist()
 def get_remaining_items_from_job(job_record_id, target_doctype):
     """
@@ -16,148 +37,296 @@ def get_remaining_items_from_job(job_record_id, target_doctype):
         - 'Purchase Invoice'
         - 'Sales Order'
         - 'Sales Invoice'
+        - 'Quotation'
     """
-    if target_doctype not in ['Purchase Order', 'Purchase Invoice', 'Sales Order', 'Sales Invoice', 'Quotation']:
-        frappe.throw(_('Unsupported target doctype: {0}').format(target_doctype))
+    items = get_remaining_items_for_jobs([job_record_id], target_doctype)
+    for item in items:
+        item.pop("job_record")
+    return items
 
-    job = frappe.get_doc("Job Record", job_record_id)
-    if not job.items:
-        return []
 
-    # Determine target doc's link field to Job Record
-    link_field = "custom_job_record"
-
-    # Get existing documents linked to this Job Record
-    existing_docs = frappe.get_all(target_doctype, {
-        link_field: job_record_id,
-        "docstatus": 1
-    }, pluck="name")
-
-    # Figure out child table name
-    child_table_map = {
-        "Purchase Order": "Purchase Order Item",
-        "Purchase Invoice": "Purchase Invoice Item",
-        "Sales Order": "Sales Order Item",
-        "Sales Invoice": "Sales Invoice Item",
-        "Quotation": "Quotation Item"
-    }
+@frappe.whitelist()
+def get_remaining_items_from_jobs(job_record_ids, target_doctype):
+    """
+    Multi-job variant of get_remaining_items_from_job, e.g. to prefill one
+    consolidated Purchase Order for several jobs. Each row carries its `job_record`.
+    """
+    if isinstance(job_record_ids, str):
+        job_record_ids = frappe.parse_json(job_record_ids)
 
-    item_field_map = {
-        "item_code": "item_code",
-        "qty": "qty"
-    }
+    return get_remaining_items_for_jobs(job_record_ids, target_doctype)
 
-    item_table = child_table_map.get(target_doctype)
-    if not item_table:
-        frappe.throw(_('Unknown child table for {0}').format(target_doctype))
 
-    ordered_qty = {}
+def get_remaining_items_for_jobs(job_records, target_doctype):
+    """
+    Compute the remaining quantity of each Job Record item in one grouped join.
 
-    if existing_docs:
-        item_rows = frappe.get_all(item_table, {
-            "parent": ["in", existing_docs]
-        }, [item_field_map["item_code"], item_field_map["qty"]])
+    Quantities are compared in stock UOM (Job Record rows through the item's UOM
+    Conversion Detail, target rows through their stock_qty) so an item ordered in
+    a different UOM is still deducted correctly. Submitted target documents are
+    attributed to a job through their `custom_job_record`.
+    """
+    if target_doctype not in REMAINING_ITEMS_TARGETS:
+        frappe.throw(_('Unsupported target doctype: {0}').format(target_doctype))
 
-        for row in item_rows:
-            ordered_qty[row.item_code] = ordered_qty.get(row.item_code, 0) + row.qty
+    job_records = [job for job in job_records or [] if job]
+    if not job_records:
+        return []
+
+    for job_record in job_records:
+        frappe.has_permission("Job Record", "read", job_record, throw=True)
+
+    items_field = frappe.get_meta("Job Record").get_field("items")
+    if not items_field:
+        return []
 
+    rows = frappe.db.sql(f"""
+        SELECT
+            ji.parent AS job_record,
+            ji.item AS item_code,
+            ji.item_name,
+            ji.uom,
+            ji.rate,
+            ji.quantity,
+            IFNULL(ucd.conversion_factor, 1) AS conversion_factor,
+            IFNULL(ordered.stock_qty, 0) AS ordered_stock_qty
+        FROM `tab{items_field.options}` ji
+        LEFT JOIN `tabUOM Conversion Detail` ucd
+            ON ucd.parent = ji.item AND ucd.parenttype = 'Item' AND ucd.uom = ji.uom
+        LEFT JOIN (
+            SELECT t.custom_job_record, ti.item_code, SUM(ti.stock_qty) AS stock_qty
+            FROM `tab{REMAINING_ITEMS_TARGETS[target_doctype]}` ti
+            INNER JOIN `tab{target_doctype}` t ON t.name = ti.parent
+            WHERE t.docstatus = 1 AND t.custom_job_record IN %(job_records)s
+            GROUP BY t.custom_job_record, ti.item_code
+        ) ordered ON ordered.custom_job_record = ji.parent AND ordered.item_code = ji.item
+        WHERE ji.parenttype = 'Job Record'
+            AND ji.parentfield = %(parentfield)s
+            AND ji.parent IN %(job_records)s
+            AND IFNULL(ji.item, '') != ''
+        ORDER BY ji.parent, ji.idx
+    """, {"job_records": job_records, "parentfield": items_field.fieldname}, as_dict=True)
+
+    # Ordered quantity is used up row by row when a job lists the same item more than once
+    available = {}
     remaining_items = []
-    for row in job.items:
-        already_ordered = ordered_qty.get(row.item, 0)
-        remaining = row.quantity - already_ordered
+    for row in rows:
+        key = (row.job_record, row.item_code)
+        available.setdefault(key, utils.flt(row.ordered_stock_qty))
+
+        conversion_factor = utils.flt(row.conversion_factor) or 1
+        job_stock_qty = utils.flt(row.quantity) * conversion_factor
+        used = min(available[key], job_stock_qty)
+        available[key] -= used
+
+        remaining = (job_stock_qty - used) / conversion_factor
         if remaining > 0:
             remaining_items.append({
-                "item_code": row.item,
+                "job_record": row.job_record,
+                "item_code": row.item_code,
                 "item_name": row.item_name,
-                # "description": row.description,
                 "qty": remaining,
                 "uom": row.uom,
                 "rate": row.rate,
-                # "schedule_date": today(),
-                # "warehouse": "Stores - " + frappe.db.get_value("Company", job.company, "abbr")
             })
 
     return remaining_items
 
 
+# Order doctype and its progress field behind Job Record % Received / % Delivered
+JOB_PERCENT_SOURCES = {
+    "per_received": ("Purchase Order", "per_received"),
+    "per_delivered": ("Sales Order", "per_delivered"),
+}
+
+
+def get_job_percents(job_field, job_records=None):
+    """
+    Return {job_record: percent} for `job_field` ("per_received" / "per_delivered").
+
+    Computed in one grouped query: each submitted order contributes its progress
+    weighted by its quantity, over the Job Record total quantity (or the ordered
+    quantity when the job has none). Draft and cancelled orders are ignored.
+    """
+    order_doctype, progress_field = JOB_PERCENT_SOURCES[job_field]
+
+    if job_records is not None:
+        if not job_records:
+            return {}
+        condition = "AND jr.name IN %(job_records)s"
+    else:
+        condition = "AND jr.job_status NOT IN ('Completed', 'Cancelled')"
+
+    rows = frappe.db.sql(f"""
+        SELECT
+            jr.name,
+            jr.total_quantity,
+            SUM(o.`{progress_field}` * o.total_qty) / 100 AS done_qty,
+            SUM(o.total_qty) AS ordered_qty
+        FROM `tabJob Record` jr
+        LEFT JOIN `tab{order_doctype}` o
+            ON o.custom_job_record = jr.name AND o.docstatus = 1
+        WHERE jr.docstatus < 2 {condition}
+        GROUP BY jr.name, jr.total_quantity
+    """, {"job_records": list(job_records or [])}, as_dict=True)
+
+    percents = {}
+    for row in rows:
+        total_qty = utils.flt(row.total_quantity) or utils.flt(row.ordered_qty)
+        percent = utils.flt(row.done_qty) * 100 / total_qty if total_qty else 0
+        percents[row.name] = min(utils.flt(percent, 2), 100)
+
+    return percents
+
+
 @frappe.whitelist()
 def update_percent_purchased(job_record):
-    #get all POs under this JR
-    pos = frappe.db.get_all("Purchase Order",
-        filters={
-            "custom_job_record": job_record,
-            "status": ["!=", "Cancelled"]},
-        fields=['name', 'per_received', 'total_qty'])
-    
-    total_qty = frappe.db.get_value("Job Record", job_record, 'total_quantity')
-
-    if len(pos) > 0:
-        percent = 0
-        total = 0
-        for po in pos:
-            total += po['per_received']*po['total_qty']
-        percent = total/total_qty
-        frappe.db.set_value('Job Record', job_record, '_received', percent)
-    else:
-        frappe.db.set_value('Job Record', job_record, '_received', 0)
+    percent = get_job_percents("per_received", [job_record]).get(job_record, 0)
+    frappe.db.set_value("Job Record", job_record, "per_received", percent)
 
 
 @frappe.whitelist()
 def update_percent_delivered(job_record):
-    sos = frappe.db.get_all("Sales Order",
-        filters={
-            "custom_job_record": job_record,
-            "status": ["!=", "Cancelled"]},
-        fields=['name', 'per_delivered'])
-    
-    if len(sos) > 0:
-        percent = 0
-        total = 0
-        for so in sos:
-            total += so['per_delivered']
-        percent = total/len(sos)
-        frappe.db.set_value('Job Record', job_record, '_delivered', percent)
-    else:
-        frappe.db.set_value('Job Record', job_record, '_delivered', 0)
+    percent = get_job_percents("per_delivered", [job_record]).get(job_record, 0)
+    frappe.db.set_value("Job Record", job_record, "per_delivered", percent)
+
+
+def update_percent_for_open_jobs():
+    """Backfill % Received / % Delivered for every open Job Record"""
+    for job_field in JOB_PERCENT_SOURCES:
+        percents = get_job_percents(job_field)
+        frappe.db.bulk_update(
+            "Job Record",
+            {job: {job_field: percent} for job, percent in percents.items()},
+            update_modified=False
+        )
 
 
 @frappe.whitelist()
-def get_quotations_for_customer(customer):
+def get_quotations_for_customer(customer, txt=None, status=None, valid_only=0,
+        after_creation=None, after_name=None, page_length=20):
+    """
+    Return one page of submitted quotations for the customer, newest first.
+
+    Paged with a (creation, name) keyset cursor: pass the `creation` and `name`
+    of the last row received as `after_creation` / `after_name` to get the next
+    page. The sort is served by the (party_name, creation) index.
+    """
     if not customer:
         return []
 
-    quotations = frappe.get_all("Quotation",
-        filters={
-            "docstatus": 1,
-            "quotation_to": "Customer",
-            "party_name": customer
-        },
-        fields=["name", "grand_total"],
-        order_by="creation desc"
-    )
-    return quotations
+    frappe.has_permission("Quotation", "read", throw=True)
+
+    conditions = [
+        "docstatus = 1",
+        "quotation_to = 'Customer'",
+        "party_name = %(customer)s",
+    ]
+    values = {
+        "customer": customer,
+        "page_length": min(utils.cint(page_length) or 20, 500),
+    }
+
+    if txt:
+        conditions.append("(name LIKE %(txt)s OR title LIKE %(txt)s)")
+        values["txt"] = f"%{txt}%"
+
+    if status:
+        conditions.append("status = %(status)s")
+        values["status"] = status
+
+    if utils.cint(valid_only):
+        conditions.append("(valid_till IS NULL OR valid_till >= %(today)s)")
+        values["today"] = utils.today()
+
+    if after_creation and after_name:
+        conditions.append("(creation < %(after_creation)s OR (creation = %(after_creation)s AND name < %(after_name)s))")
+        values.update({"after_creation": after_creation, "after_name": after_name})
+
+    return frappe.db.sql(f"""
+        SELECT name, title, transaction_date, valid_till, status, grand_total, creation
+        FROM `tabQuotation`
+        WHERE {" AND ".join(conditions)}
+        ORDER BY creation DESC, name DESC
+        LIMIT %(page_length)s
+    """, values, as_dict=True)
+
+
+QUOTATION_ITEM_CHUNK_SIZE = 500
 
 
 @frappe.whitelist()
-def get_items_from_multiple_quotations(quotations):
-    import json
+def get_items_from_multiple_quotations(quotations, merge=0, start=0):
+    """
+    Return the items of the selected submitted Quotations.
+
+    Without `merge` the items come one page of QUOTATION_ITEM_CHUNK_SIZE
+    quotations at a time: pass the returned `next_start` as `start` for the
+    next page, it is None after the last one.
+
+    With `merge`, rows with the same item, UOM and rate are combined across
+    quotations: qty and amount are summed, `parent` keeps the first quotation
+    and `quotations` lists all of them. Merging needs every quotation, so it is
+    returned at once, holding one row per distinct item, UOM and rate.
+    """
     if isinstance(quotations, str):
-        quotations = json.loads(quotations)
-
-    items = []
-    for quotation in quotations:
-        quotation_doc = frappe.get_doc("Quotation", quotation)
-        for item in quotation_doc.items:
-            items.append({
-                "item_code": item.item_code,
-                "item_name": item.item_name,
-                "uom": item.uom,
-                "qty": item.qty,
-                "rate": item.rate,
-                "amount": item.amount,
-                "parent": quotation_doc.name
-            })
-    return {"items": items}
+        quotations = frappe.parse_json(quotations)
+
+    frappe.has_permission("Quotation", "read", throw=True)
+
+    if not utils.cint(merge):
+        quotations = list(dict.fromkeys(q for q in quotations or [] if q))
+        start = utils.cint(start)
+        end = start + QUOTATION_ITEM_CHUNK_SIZE
+        return {
+            "items": list(iter_quotation_items(quotations[start:end])),
+            "next_start": end if end < len(quotations) else None
+        }
+
+    merged = {}
+    for item in iter_quotation_items(quotations):
+        key = (item.item_code, item.uom, item.rate)
+        if key not in merged:
+            merged[key] = item
+            item.quotations = [item.parent]
+            continue
+
+        row = merged[key]
+        row.qty += item.qty
+        row.amount += item.amount
+        if item.parent not in row.quotations:
+            row.quotations.append(item.parent)
+
+    for row in merged.values():
+        row.quotations = ", ".join(row.quotations)
+
+    return {"items": list(merged.values()), "next_start": None}
+
+
+def iter_quotation_items(quotations, chunk_size=QUOTATION_ITEM_CHUNK_SIZE):
+    """
+    Yield Quotation Item rows of submitted quotations, in the order the
+    quotations were selected. Quotations are read `chunk_size` at a time with
+    a projection query so large selections never load full documents.
+    """
+    quotations = list(dict.fromkeys(q for q in quotations or [] if q))
+
+    for i in range(0, len(quotations), chunk_size):
+        chunk = quotations[i:i + chunk_size]
+        position = {name: idx for idx, name in enumerate(chunk)}
+
+        rows = frappe.db.sql("""
+            SELECT qi.item_code, qi.item_name, qi.uom, qi.qty, qi.rate, qi.amount, qi.parent, qi.idx
+            FROM `tabQuotation Item` qi
+            INNER JOIN `tabQuotation` q ON q.name = qi.parent
+            WHERE qi.parenttype = 'Quotation'
+                AND qi.parent IN %(quotations)s
+                AND q.docstatus = 1
+        """, {"quotations": chunk}, as_dict=True)
+
+        for row in sorted(rows, key=lambda r: (position[r.parent], r.idx)):
+            row.pop("idx")
+            yield row
 
 
 @frappe.whitelist()
@@ -451,6 +620,144 @@ def process_driver_allowance(driver_name, amount=None):
     return result
 
 
+DRIVER_PAYOUT_CHUNK_SIZE = 50
+
+
+def get_driver_allowance_balances(drivers=None):
+    """
+    Return allowance balances of internal drivers in one grouped query:
+    completed trip allowances minus submitted Additional Salaries.
+    """
+    condition = "AND d.name IN %(drivers)s" if drivers else ""
+
+    return frappe.db.sql(f"""
+        SELECT
+            d.name AS driver,
+            d.employee,
+            d.full_name,
+            emp.company,
+            IFNULL(trips.allowance, 0) - IFNULL(paid.amount, 0) AS balance
+        FROM `tabDriver` d
+        LEFT JOIN `tabEmployee` emp ON emp.name = d.employee
+        LEFT JOIN (
+            SELECT driver, SUM(allowance) AS allowance
+            FROM `tabTrip Details`
+            WHERE status = 'Trip Completed'
+            GROUP BY driver
+        ) trips ON trips.driver = d.name
+        LEFT JOIN (
+            SELECT ref_docname, SUM(amount) AS amount
+            FROM `tabAdditional Salary`
+            WHERE ref_doctype = 'Driver' AND docstatus = 1
+            GROUP BY ref_docname
+        ) paid ON paid.ref_docname = d.name
+        WHERE IFNULL(d.employee, '') != '' {condition}
+        ORDER BY d.name
+    """, {"drivers": list(drivers or [])}, as_dict=True)
+
+
+@frappe.whitelist()
+def process_driver_allowances_bulk(drivers=None, payroll_date=None):
+    """
+    Month-end payout: queue one background job that creates an Additional Salary
+    for the full allowance balance of every internal driver (or of `drivers`).
+    Progress and the final summary are pushed to the user who started it.
+    """
+    frappe.has_permission("Additional Salary", "create", throw=True)
+
+    if isinstance(drivers, str):
+        drivers = frappe.parse_json(drivers)
+
+    payroll_date = utils.getdate(payroll_date or utils.today())
+
+    # Only a second run of the same drivers and payroll date is held back
+    driver_set = hashlib.md5(json.dumps(sorted(drivers or [])).encode()).hexdigest()[:10]
+    job_id = f"ksa_logistics:driver_allowance_payout:{payroll_date}:{driver_set}"
+    if is_job_enqueued(job_id):
+        return {
+            "status": "not_queued",
+            "message": _("A payout for these drivers and payroll date is already running, it was not queued again")
+        }
+
+    frappe.enqueue(
+        "ksa_logistics.api.run_driver_allowance_payout",
+        queue="long",
+        timeout=3600,
+        job_id=job_id,
+        drivers=drivers,
+        payroll_date=str(payroll_date)
+    )
+
+    return {"status": "queued", "message": _("Driver allowance payout started in the background")}
+
+
+def run_driver_allowance_payout(drivers=None, payroll_date=None):
+    balances = [row for row in get_driver_allowance_balances(drivers) if utils.flt(row.balance, 2) > 0]
+    salary_component = get_trip_allowance_component()
+    default_company = get_default_company()
+
+    created, failed = [], []
+    new_balances = {}
+    total = len(balances)
+
+    for start in range(0, total, DRIVER_PAYOUT_CHUNK_SIZE):
+        for row in balances[start:start + DRIVER_PAYOUT_CHUNK_SIZE]:
+            amount = utils.flt(row.balance, 2)
+            frappe.db.savepoint("driver_allowance_payout")
+            try:
+                additional_salary = frappe.new_doc("Additional Salary")
+                additional_salary.employee = row.employee
+                additional_salary.company = row.company or default_company
+                additional_salary.salary_component = salary_component
+                additional_salary.amount = amount
+                additional_salary.payroll_date = payroll_date or utils.today()
+                additional_salary.overwrite_salary_structure_amount = 0
+                additional_salary.ref_doctype = "Driver"
+                additional_salary.ref_docname = row.driver
+                additional_salary.description = f"Driver Allowance - {row.full_name or row.driver}"
+                additional_salary.insert()
+                additional_salary.submit()
+            except Exception:
+                frappe.db.rollback(save_point="driver_allowance_payout")
+                failed.append({"driver": row.driver, "error": frappe.get_traceback()})
+                new_balances[row.driver] = row.balance
+                continue
+
+            created.append({"driver": row.driver, "additional_salary": additional_salary.name, "amount": amount})
+            new_balances[row.driver] = row.balance - amount
+
+        frappe.db.commit()
+        done = min(start + DRIVER_PAYOUT_CHUNK_SIZE, total)
+        frappe.publish_progress(
+            done * 100 / total,
+            title=_("Driver Allowance Payout"),
+            description=_("{0} of {1} drivers processed").format(done, total)
+        )
+
+    # Driver balances are written once at the end instead of per driver
+    if new_balances:
+        frappe.db.bulk_update(
+            "Driver",
+            {driver: {"allowance_balance": balance} for driver, balance in new_balances.items()},
+            update_modified=False
+        )
+        frappe.db.commit()
+
+    if failed:
+        frappe.log_error(
+            "\n\n".join(f"{row['driver']}:\n{row['error']}" for row in failed),
+            "Driver allowance payout failures"
+        )
+
+    summary = {
+        "created": created,
+        "failed": [row["driver"] for row in failed],
+        "total_amount": sum(row["amount"] for row in created)
+    }
+    frappe.publish_realtime("driver_allowance_payout", summary, user=frappe.session.user)
+    return summary
+
+
 @frappe.whitelist()
 def process_job_assignment_allowance(job_record_name, assignment_idx, amount=None):
     """
@@ -540,16 +847,8 @@ def create_additional_salary_from_driver_data(driver_name, employee_name, driver
     Create Additional Salary for internal driver (from Driver doctype)
     Uses driver_name and employee_name instead of driver object to avoid loading full document
     """
-    employee = frappe.get_doc("Employee", employee_name)
-    company = getattr(employee, "company", None) or frappe.defaults.get_user_default("company") or frappe.db.get_single_value("Global Defaults", "default_company")
-    
-    # Get or create "Trip Allowance" salary component
-    salary_component = "Trip Allowance"
-    if not frappe.db.exists("Salary Component", salary_component):
-        component = frappe.new_doc("Salary Component")
-        component.salary_component = salary_component
-        component.type = "Earning"
-        component.insert()
+    company = frappe.db.get_value("Employee", employee_name, "company") or get_default_company()
+    salary_component = get_trip_allowance_component(company)
     
     # Create Additional Salary
     additional_salary = frappe.new_doc("Additional Salary")
@@ -596,16 +895,8 @@ def create_additional_salary_from_assignment(job_record, assignment, driver, amo
     if not driver.employee:
         frappe.throw("Driver must have an employee linked")
     
-    employee = frappe.get_doc("Employee", driver.employee)
-    company = job_record.company or frappe.defaults.get_user_default("company") or frappe.db.get_single_value("Global Defaults", "default_company")
-    
-    # Get or create "Trip Allowance" salary component
-    salary_component = "Trip Allowance"
-    if not frappe.db.exists("Salary Component", salary_component):
-        component = frappe.new_doc("Salary Component")
-        component.salary_component = salary_component
-        component.type = "Earning"
-        component.insert()
+    company = job_record.company or get_default_company()
+    salary_component = get_trip_allowance_component(company)
     
     # Create Additional Salary
     additional_salary = frappe.new_doc("Additional Salary")
@@ -641,33 +932,12 @@ def create_purchase_invoice_from_driver(driver, amount):
     if not driver.transporter:
         frappe.throw("External driver must have a transporter linked")
     
-    company = frappe.defaults.get_user_default("company") or frappe.db.get_single_value("Global Defaults", "default_company")
+    company = get_default_company()
     posting_date = utils.today()
     
-    # Get expense account
-    expense_account = frappe.db.get_value(
-        "Company", company, "default_expense_account"
-    ) or frappe.db.get_value(
-        "Account", {"account_type": "Expense Account", "company": company}, "name"
-    )
-    
-    if not expense_account:
-        frappe.throw("Please set default expense account for company")
-    
-    # Get or create service item
-    service_item = "Driver Service"
-    if not frappe.db.exists("Item", service_item):
-        try:
-            item = frappe.new_doc("Item")
-            item.item_code = service_item
-            item.item_name = "Driver Service"
-            item.item_group = "Services"
-            item.is_stock_item = 0
-            item.is_service_item = 1
-            item.insert()
-        except frappe.DuplicateEntryError:
-            # Item was created by another process, just use it
-            pass
+    # Expense account and service item are resolved once per company and cached
+    expense_account = get_expense_account(company)
+    service_item = get_company_masters(company).driver_service_item
     
     # Create Purchase Invoice (draft, not submitted)
     pi = frappe.new_doc("Purchase Invoice")
@@ -713,33 +983,12 @@ def create_purchase_invoice_from_assignment(job_record, assignment, driver, amou
     if not driver.transporter:
         frappe.throw("External driver must have a transporter linked")
     
-    company = job_record.company or frappe.defaults.get_user_default("company") or frappe.db.get_single_value("Global Defaults", "default_company")
+    company = job_record.company or get_default_company()
     posting_date = utils.today()
     
-    # Get expense account
-    expense_account = frappe.db.get_value(
-        "Company", company, "default_expense_account"
-    ) or frappe.db.get_value(
-        "Account", {"account_type": "Expense Account", "company": company}, "name"
-    )
-    
-    if not expense_account:
-        frappe.throw("Please set default expense account for company")
-    
-    # Get or create service item
-    service_item = "Driver Service"
-    if not frappe.db.exists("Item", service_item):
-        try:
-            item = frappe.new_doc("Item")
-            item.item_code = service_item
-            item.item_name = "Driver Service"
-            item.item_group = "Services"
-            item.is_stock_item = 0
-            item.is_service_item = 1
-            item.insert()
-        except frappe.DuplicateEntryError:
-            # Item was created by another process, just use it
-            pass
+    # Expense account and service item are resolved once per company and cached
+    expense_account = get_expense_account(company)
+    service_item = get_company_masters(company).driver_service_item
     
     # Get vehicle from assignment
     vehicle = assignment.vehicle if assignment else None
@@ -917,6 +1166,9 @@ def create_trip_details(job_record, job_assignment, driver, vehicle, trip_amount
     trip.cell_no_1 = cell_no_1
     trip.iqama_no = iqama_no
     trip.status = "Trip Completed"
+    if not driver_employee:
+        # External trips are billed in bulk by make_transporter_invoices
+        trip.custom_purchase_invoice_status = "Pending"
     trip.insert(ignore_permissions=True)
 
     frappe.db.set_value(
@@ -925,34 +1177,167 @@ def create_trip_details(job_record, job_assignment, driver, vehicle, trip_amount
         "trip_detail_status",
         "Created"
     )
-       
-    if not driver_employee:
 
-        ITEM = "Service Transportation"
-        supplier = driver_transporter
-        company = frappe.defaults.get_user_default("company")
+    return {
+        "trip_name": trip.name
+    }
+
 
-        pi = frappe.new_doc("Purchase Invoice")
-        pi.company = company
-        pi.supplier = supplier
-        pi.posting_date = frappe.utils.today()
-        pi.bill_date = frappe.utils.today()
-        pi.custom_job_record = job_record
-   
+def get_uninvoiced_transporter_trips(from_date, to_date, transporter=None):
+    """Completed trips of external drivers in the period that are not on a Purchase Invoice yet"""
+    condition = "AND d.transporter = %(transporter)s" if transporter else ""
+
+    return frappe.db.sql(f"""
+        SELECT
+            td.name,
+            td.posting_date,
+            td.vehicle,
+            td.job_records,
+            td.origin,
+            td.destination,
+            td.allowance,
+            d.transporter,
+            jr.company
+        FROM `tabTrip Details` td
+        INNER JOIN `tabDriver` d ON d.name = td.driver
+        LEFT JOIN `tabJob Record` jr ON jr.name = td.job_records
+        WHERE td.status = 'Trip Completed'
+            AND IFNULL(d.employee, '') = ''
+            AND IFNULL(d.transporter, '') != ''
+            AND IFNULL(td.custom_purchase_invoice, '') = ''
+            AND td.posting_date BETWEEN %(from_date)s AND %(to_date)s
+            {condition}
+            -- Trips billed from the trip form (make_purchase_invoice) before it linked back
+            AND NOT EXISTS (
+                SELECT 1 FROM `tabPurchase Invoice` pi
+                WHERE pi.custom_trip_details = td.name AND pi.docstatus < 2
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM `tabPurchase Invoice Item` pii
+                INNER JOIN `tabPurchase Invoice` pi ON pi.name = pii.parent
+                WHERE pii.custom_trip_details = td.name AND pi.docstatus < 2
+            )
+        ORDER BY d.transporter, td.posting_date, td.name
+    """, {"from_date": from_date, "to_date": to_date, "transporter": transporter}, as_dict=True)
+
+
+@frappe.whitelist()
+def consolidate_transporter_invoices(from_date, to_date, transporter=None):
+    """Queue make_transporter_invoices for the period (one draft Purchase Invoice per transporter)"""
+    frappe.has_permission("Purchase Invoice", "create", throw=True)
+
+    # Only a second run of the same period and transporter is held back
+    job_id = f"ksa_logistics:transporter_invoices:{utils.getdate(from_date)}:{utils.getdate(to_date)}:{transporter or ''}"
+    if is_job_enqueued(job_id):
+        return {
+            "status": "not_queued",
+            "message": _("Transporter invoicing for this period is already running, it was not queued again")
+        }
+
+    frappe.enqueue(
+        "ksa_logistics.api.make_transporter_invoices",
+        queue="long",
+        timeout=3600,
+        job_id=job_id,
+        from_date=from_date,
+        to_date=to_date,
+        transporter=transporter
+    )
+
+    return {"status": "queued", "message": _("Transporter invoicing started in the background")}
+
+
+def make_transporter_invoices(from_date, to_date, transporter=None):
+    """
+    Group completed, un-invoiced external trips by transporter (and company) and
+    create one draft Purchase Invoice per group with one line per trip. The
+    trips of each invoice are then linked back with a single update.
+    """
+    default_company = get_default_company()
+
+    groups = {}
+    for trip in get_uninvoiced_transporter_trips(from_date, to_date, transporter):
+        groups.setdefault((trip.transporter, trip.company or default_company), []).append(trip)
+
+    invoices, failed = [], []
+    for (supplier, company), trips in groups.items():
+        frappe.db.savepoint("transporter_invoice")
+        try:
+            pi = make_transporter_invoice(supplier, company, trips, from_date, to_date)
+            frappe.db.commit()
+            invoices.append(pi.name)
+        except Exception:
+            frappe.db.rollback(save_point="transporter_invoice")
+            frappe.log_error(title=f"Transporter invoice failed for {supplier} ({company})")
+            failed.append(supplier)
+
+    frappe.publish_realtime(
+        "transporter_invoices",
+        {"invoices": invoices, "failed": failed, "trips": sum(len(trips) for trips in groups.values())},
+        user=frappe.session.user
+    )
+    return invoices
+
+
+def make_transporter_invoice(supplier, company, trips, from_date, to_date):
+    """Draft Purchase Invoice of one transporter and company, with its trips linked back"""
+    masters = get_company_masters(company)
+
+    pi = frappe.new_doc("Purchase Invoice")
+    pi.company = company
+    pi.supplier = supplier
+    pi.posting_date = utils.today()
+    pi.bill_date = utils.today()
+    pi.remarks = _("Transport charges for {0} trips from {1} to {2}").format(
+        len(trips), utils.formatdate(from_date), utils.formatdate(to_date)
+    )
+
+    # Header job link only when every trip belongs to the same job
+    job_records = {trip.job_records for trip in trips}
+    if len(job_records) == 1:
+        pi.custom_job_record = job_records.pop()
+
+    for trip in trips:
         pi.append("items", {
-            "item_code": ITEM,
+            "item_code": masters.transporter_service_item,
+            "description": " - ".join(filter(None, [trip.name, trip.origin, trip.destination])),
             "qty": 1,
-            "rate": allowance,
-            "amount": allowance
+            "rate": trip.allowance or 0,
+            "expense_account": masters.expense_account,
+            "custom_vehicle": trip.vehicle,
+            "custom_job_record": trip.job_records,
+            "custom_trip_details": trip.name
         })
 
-        pi.flags.ignore_links = True
-        pi.insert(ignore_permissions=True)
+    pi.set_missing_values()
+    pi.insert(ignore_permissions=True)
 
-        frappe.db.set_value("Purchase Invoice", pi.name, "custom_trip_details", trip.name, update_modified=False)
-        frappe.db.set_value("Trip Details", trip.name, "custom_purchase_invoice", pi.name, update_modified=False)
-        frappe.db.set_value("Trip Details", trip.name, "custom_purchase_invoice_status", "Created", update_modified=False)
+    frappe.db.sql("""
+        UPDATE `tabTrip Details`
+        SET custom_purchase_invoice = %(pi)s, custom_purchase_invoice_status = 'Created'
+        WHERE name IN %(trips)s
+    """, {"pi": pi.name, "trips": [trip.name for trip in trips]})
+
+    return pi
+
+
+def link_transporter_trip(doc, method=None):
+    """Purchase Invoice after_insert: link the trip of an invoice made from the trip form (make_purchase_invoice)"""
+    if not doc.get("custom_trip_details"):
+        return
+
+    frappe.db.sql("""
+        UPDATE `tabTrip Details`
+        SET custom_purchase_invoice = %s, custom_purchase_invoice_status = 'Created'
+        WHERE name = %s AND IFNULL(custom_purchase_invoice, '') = ''
+    """, (doc.name, doc.custom_trip_details))
+
+
+def unlink_transporter_trips(doc, method=None):
+    """Purchase Invoice on_cancel / on_trash: put its trips back in the un-invoiced pool"""
+    frappe.db.sql("""
+        UPDATE `tabTrip Details`
+        SET custom_purchase_invoice = NULL, custom_purchase_invoice_status = 'Pending'
+        WHERE custom_purchase_invoice = %s
+    """, doc.name)
 
-    return {
-        "trip_name": trip.name
-    }
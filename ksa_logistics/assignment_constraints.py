@@ -0,0 +1,110 @@
+import click
+import frappe
+
+"""
+One workflow document per Job Assignment, enforced by the database.
+
+Collection Note, Waybill, Delivery Note Record and Proof of Delivery each carry
+a unique (job_record, job_assignment_name) constraint, so concurrent saves
+cannot both create a document for the same assignment and the duplicate check
+costs nothing on save. Documents without an assignment keep job_assignment_name
+NULL, which the constraint does not compare, so legacy per-job documents are
+still allowed.
+
+The constraint is only added once existing duplicates are cleaned up, the
+Duplicate Job Assignments report lists them, and is retried after every
+migrate. Until then `validate_assignment` falls back to querying for a duplicate.
+"""
+
+ASSIGNMENT_DOCTYPES = ("Collection Note", "Waybill", "Delivery Note Record", "Proof of Delivery")
+
+ASSIGNMENT_CONSTRAINT = "job_assignment_unique"
+CONSTRAINT_CACHE_KEY = "ksa_logistics:assignment_constraint"
+
+
+def get_duplicate_assignments(doctype):
+    """Assignments of `doctype` with more than one document, oldest document first"""
+    return frappe.db.sql(f"""
+        SELECT
+            job_record,
+            job_assignment_name,
+            COUNT(*) AS documents,
+            GROUP_CONCAT(name ORDER BY creation SEPARATOR ', ') AS names
+        FROM `tab{doctype}`
+        WHERE IFNULL(job_record, '') != '' AND IFNULL(job_assignment_name, '') != ''
+        GROUP BY job_record, job_assignment_name
+        HAVING COUNT(*) > 1
+        ORDER BY job_record, job_assignment_name
+    """, as_dict=True)
+
+
+def add_assignment_constraint(doctype):
+    """on_doctype_update of the workflow doctypes, and after every migrate"""
+    if frappe.db.has_index(f"tab{doctype}", ASSIGNMENT_CONSTRAINT):
+        return
+
+    frappe.db.sql(f"UPDATE `tab{doctype}` SET job_assignment_name = NULL WHERE job_assignment_name = ''")
+
+    if get_duplicate_assignments(doctype):
+        click.secho(
+            f"{doctype}: unique Job Assignment constraint not added, see the Duplicate Job Assignments report",
+            fg="yellow"
+        )
+    else:
+        frappe.db.add_unique(doctype, ["job_record", "job_assignment_name"], constraint_name=ASSIGNMENT_CONSTRAINT)
+
+    frappe.cache().hdel(CONSTRAINT_CACHE_KEY, doctype)
+
+
+def add_assignment_constraints():
+    """
+    after_migrate: on_doctype_update only runs when a doctype changes, so a
+    constraint held back by duplicates is added on the first migrate after
+    they are cleaned up.
+    """
+    for doctype in ASSIGNMENT_DOCTYPES:
+        add_assignment_constraint(doctype)
+
+
+def has_assignment_constraint(doctype):
+    return frappe.cache().hget(
+        CONSTRAINT_CACHE_KEY,
+        doctype,
+        generator=lambda: bool(frappe.db.has_index(f"tab{doctype}", ASSIGNMENT_CONSTRAINT))
+    )
+
+
+def get_assigned_duplicate(doc):
+    """Other document of the same Job Assignment"""
+    return frappe.db.get_value(doc.doctype, {
+        "job_record": doc.job_record,
+        "job_assignment_name": doc.job_assignment_name,
+        "name": ["!=", doc.name]
+    }, "name")
+
+
+def get_unassigned_duplicate(doc):
+    """Other document of the same job without an assignment, over the constraint's index"""
+    existing = frappe.db.sql(f"""
+        SELECT name FROM `tab{doc.doctype}`
+        WHERE job_record = %s AND job_assignment_name IS NULL AND name != %s
+        LIMIT 1
+    """, (doc.job_record, doc.name))
+    return existing[0][0] if existing else None
+
+
+def validate_assignment(doc):
+    """
+    Blank the assignment to NULL and return the duplicate of the same Job
+    Assignment, which only needs a query while the constraint is missing.
+    """
+    if not doc.job_assignment_name:
+        doc.job_assignment_name = None
+        return None
+
+    if doc.job_record and not has_assignment_constraint(doc.doctype):
+        return get_assigned_duplicate(doc)
+
+
+def is_assignment_violation(e):
+    return ASSIGNMENT_CONSTRAINT in str(e)
@@ -0,0 +1,119 @@
+import math
+
+import frappe
+from frappe.utils import flt
+
+"""
+Cargo measurements shared by Collection Note, Packing List, Survey Report and
+Job Record (Job Assignment) rows: volume and area from dimensions in cm,
+column totals and chargeable weight.
+
+Every row value and total is rounded the same way, so a document totals to the
+same figures whether it is saved from the form or imported.
+"""
+
+CM3_PER_CBM = 1000000
+CM2_PER_SQM = 10000
+
+VOLUME_PRECISION = 3
+AREA_PRECISION = 3
+WEIGHT_PRECISION = 2
+
+# Volumetric weight in kg per CBM (IATA 1:6000 for air, 1:3000 for road, 1 t per CBM for sea)
+VOLUMETRIC_KG_PER_CBM = {"Air": 167, "Land": 333, "Sea": 1000}
+
+
+def get_transport_mode(*values):
+    """First of Air / Sea / Land found in `values`, e.g. "Air Import" or the "Air Transport" job type"""
+    for value in values:
+        for mode in VOLUMETRIC_KG_PER_CBM:
+            if value and mode.lower() in value.lower():
+                return mode
+
+
+def get_chargeable_weight(gross_weight, cbm, mode=None):
+    """The greater of the gross weight and the volumetric weight for the transport mode"""
+    factor = VOLUMETRIC_KG_PER_CBM.get(mode)
+    volumetric_weight = flt(cbm) * factor if factor else 0
+    return flt(max(flt(gross_weight), volumetric_weight), WEIGHT_PRECISION)
+
+
+def measure_rows(rows, cbm_field=None, sqm_field=None, weight_field=None, qty_field=None,
+        length_field="length_cm", width_field="width_cm", height_field="height_cm"):
+    """
+    Set `cbm_field` / `sqm_field` of each row from its dimensions and return the
+    column totals as frappe._dict(qty, cbm, sqm, weight).
+
+    With `qty_field` the row volume and area are per piece times the quantity.
+    Rows without complete dimensions keep the value entered on them.
+    """
+    rows = list(rows or [])
+    lengths = [flt(row.get(length_field)) for row in rows]
+    widths = [flt(row.get(width_field)) for row in rows]
+    heights = [flt(row.get(height_field)) for row in rows]
+    qtys = [(flt(row.get(qty_field)) or 1) if qty_field else 1 for row in rows]
+
+    totals = frappe._dict(qty=0.0, cbm=0.0, sqm=0.0, weight=0.0)
+
+    if cbm_field:
+        values = [
+            flt(l * w * h * q / CM3_PER_CBM, VOLUME_PRECISION) if l and w and h else flt(row.get(cbm_field))
+            for row, l, w, h, q in zip(rows, lengths, widths, heights, qtys)
+        ]
+        for row, value in zip(rows, values):
+            setattr(row, cbm_field, value)
+        totals.cbm = flt(math.fsum(values), VOLUME_PRECISION)
+
+    if sqm_field:
+        values = [
+            flt(l * w * q / CM2_PER_SQM, AREA_PRECISION) if l and w else flt(row.get(sqm_field))
+            for row, l, w, q in zip(rows, lengths, widths, qtys)
+        ]
+        for row, value in zip(rows, values):
+            setattr(row, sqm_field, value)
+        totals.sqm = flt(math.fsum(values), AREA_PRECISION)
+
+    if weight_field:
+        totals.weight = flt(math.fsum(flt(row.get(weight_field)) for row in rows), WEIGHT_PRECISION)
+
+    if qty_field:
+        totals.qty = math.fsum(flt(row.get(qty_field)) for row in rows)
+
+    return totals
+
+
+def set_packing_list_totals(doc, method=None):
+    """Packing List validate"""
+    totals = measure_rows(doc.get("item"), cbm_field="volume_cbm", sqm_field="volume_sqrmtr", weight_field="weight_kg")
+    doc.total_volume_cbm = totals.cbm
+    doc.total_volume_sqrmtr = totals.sqm
+    doc.total_weight_kg = totals.weight
+
+
+def set_survey_report_volume(doc, method=None):
+    """
+    Survey Report validate: fill the volume from the cargo details total when it
+    is empty or still holds the previous total. A volume the surveyor entered
+    is kept.
+    """
+    totals = measure_rows(doc.get("cargo_details"), cbm_field="volume_cbm", sqm_field="volume_sqrmtr")
+    if not totals.cbm:
+        return
+
+    # Stored row volumes of the previous save, without recomputing into its rows
+    before = doc.get_doc_before_save()
+    previous = (
+        flt(math.fsum(flt(row.volume_cbm) for row in before.get("cargo_details") or []), VOLUME_PRECISION)
+        if before else None
+    )
+
+    if not flt(doc.volume_cbm) or (previous and flt(doc.volume_cbm) == flt(previous)):
+        doc.volume_cbm = totals.cbm
+
+
+def set_chargeable_weights(job):
+    """Chargeable weight of each Job Assignment row from its gross weight and volume"""
+    mode = get_transport_mode(job.get("mode"), job.get("job_types"))
+    for row in job.get("job_assignment") or []:
+        if flt(row.gross_weight_kg) or flt(row.volume_cbm):
+            row.chargeable_weight = get_chargeable_weight(row.gross_weight_kg, row.volume_cbm, mode)
@@ -28,7 +28,9 @@ app_license = "mit"
 # app_include_css = "/assets/ksa_logistics/css/ksa_logistics.css"
 app_include_js = [
     "assets/ksa_logistics/js/driver_quick_entry.js",
-    "assets/ksa_logistics/js/vehicle_quick_entry.js"
+    "assets/ksa_logistics/js/vehicle_quick_entry.js",
+    "assets/ksa_logistics/js/job_indicators.js",
+    "assets/ksa_logistics/js/photo_thumbnails.js"
 ]
 
 # include js, css files in header of web template
@@ -51,9 +53,15 @@ doctype_js = {
     # "Sales Order": "public/js/sales_order.js",
     # "Quotation": "public/js/quotation.js",
     "Vehicle": "public/js/vehicle.js",
-    "Driver": "public/js/driver.js"
+    "Driver": "public/js/driver.js",
+    "Warehouse Job Record": "public/js/warehouse_job_record.js",
+    "Packing List": "public/js/packing_list.js",
+    "Survey Report": "public/js/survey_report.js"
+}
+doctype_list_js = {
+    "Driver": "public/js/driver_list.js",
+    "Warehouse Job Record": "public/js/warehouse_job_record_list.js"
 }
-# doctype_list_js = {"doctype" : "public/js/doctype_list.js"}
 # doctype_tree_js = {"doctype" : "public/js/doctype_tree.js"}
 # doctype_calendar_js = {"doctype" : "public/js/doctype_calendar.js"}
 
@@ -88,11 +96,18 @@ doctype_js = {
 # 	"filters": "ksa_logistics.utils.jinja_filters"
 # }
 
+jinja = {
+    "methods": [
+        "ksa_logistics.thumbnails.get_thumbnail_data_uri"
+    ]
+}
+
 # Installation
 # ------------
 
 # before_install = "ksa_logistics.install.before_install"
-# after_install = "ksa_logistics.install.after_install"
+after_install = "ksa_logistics.install.after_install"
+after_migrate = "ksa_logistics.install.after_migrate"
 
 # Uninstallation
 # ------------
@@ -147,36 +162,111 @@ override_doctype_class = {
 # Hook on document methods and events
 
 doc_events = {
-    # "Purchase Order": {
-    #     "on_submit": "ksa_logistics.po_hooks.update_job_record_percent",
-    #     "on_cancel": "ksa_logistics.po_hooks.update_job_record_percent",
-    #     "on_amend": "ksa_logistics.po_hooks.update_job_record_percent"
-    # },
-    # "Purchase Invoice": {
-    #     "on_submit": "ksa_logistics.po_hooks.update_job_record_percent",
-    #     "on_cancel": "ksa_logistics.po_hooks.update_job_record_percent",
-    #     "on_amend": "ksa_logistics.po_hooks.update_job_record_percent"
-    # },
-    # "Purchase Receipt": {
-    #     "on_submit": "ksa_logistics.po_hooks.update_job_record_percent",
-    #     "on_cancel": "ksa_logistics.po_hooks.update_job_record_percent",
-    #     "on_amend": "ksa_logistics.po_hooks.update_job_record_percent"
-    # },
-    # "Sales Order": {
-    #     "on_submit": "ksa_logistics.po_hooks.update_job_record_percent",
-    #     "on_cancel": "ksa_logistics.po_hooks.update_job_record_percent",
-    #     "on_amend": "ksa_logistics.po_hooks.update_job_record_percent"
-    # },
-    # "Sales Invoice": {
-    #     "on_submit": "ksa_logistics.po_hooks.update_job_record_percent",
-    #     "on_cancel": "ksa_logistics.po_hooks.update_job_record_percent",
-    #     "on_amend": "ksa_logistics.po_hooks.update_job_record_percent"
-    # },
-    # "Delivery Note": {
-    #     "on_submit": "ksa_logistics.po_hooks.update_job_record_percent",
-    #     "on_cancel": "ksa_logistics.po_hooks.update_job_record_percent",
-    #     "on_amend": "ksa_logistics.po_hooks.update_job_record_percent"
-    # }
+    "Purchase Order": {
+        "on_submit": "ksa_logistics.po_hooks.update_job_record_percent",
+        "on_cancel": "ksa_logistics.po_hooks.update_job_record_percent"
+    },
+    "Purchase Invoice": {
+        "on_submit": [
+            "ksa_logistics.po_hooks.update_job_record_percent",
+            "ksa_logistics.job_vouchers.clear_job_voucher_cache",
+            "ksa_logistics.ksa_logistics.doctype.fleet_utilization.fleet_utilization.on_voucher_change"
+        ],
+        "on_cancel": [
+            "ksa_logistics.po_hooks.update_job_record_percent",
+            "ksa_logistics.job_vouchers.clear_job_voucher_cache",
+            "ksa_logistics.ksa_logistics.doctype.fleet_utilization.fleet_utilization.on_voucher_change",
+            "ksa_logistics.api.unlink_transporter_trips"
+        ],
+        "after_insert": "ksa_logistics.api.link_transporter_trip",
+        "on_trash": "ksa_logistics.api.unlink_transporter_trips"
+    },
+    "Purchase Receipt": {
+        "on_submit": [
+            "ksa_logistics.po_hooks.update_job_record_percent",
+            "ksa_logistics.job_vouchers.clear_job_voucher_cache"
+        ],
+        "on_cancel": [
+            "ksa_logistics.po_hooks.update_job_record_percent",
+            "ksa_logistics.job_vouchers.clear_job_voucher_cache"
+        ]
+    },
+    "Sales Order": {
+        "on_submit": "ksa_logistics.po_hooks.update_job_record_percent",
+        "on_cancel": "ksa_logistics.po_hooks.update_job_record_percent"
+    },
+    "Sales Invoice": {
+        "on_submit": [
+            "ksa_logistics.po_hooks.update_job_record_percent",
+            "ksa_logistics.job_vouchers.clear_job_voucher_cache"
+        ],
+        "on_cancel": [
+            "ksa_logistics.po_hooks.update_job_record_percent",
+            "ksa_logistics.job_vouchers.clear_job_voucher_cache"
+        ]
+    },
+    "Delivery Note": {
+        "on_submit": [
+            "ksa_logistics.po_hooks.update_job_record_percent",
+            "ksa_logistics.job_vouchers.clear_job_voucher_cache"
+        ],
+        "on_cancel": [
+            "ksa_logistics.po_hooks.update_job_record_percent",
+            "ksa_logistics.job_vouchers.clear_job_voucher_cache"
+        ]
+    },
+    "Journal Entry": {
+        "on_submit": [
+            "ksa_logistics.job_vouchers.clear_job_voucher_cache",
+            "ksa_logistics.ksa_logistics.doctype.fleet_utilization.fleet_utilization.on_voucher_change"
+        ],
+        "on_cancel": [
+            "ksa_logistics.job_vouchers.clear_job_voucher_cache",
+            "ksa_logistics.ksa_logistics.doctype.fleet_utilization.fleet_utilization.on_voucher_change"
+        ]
+    },
+    "Payment Entry": {
+        "on_submit": "ksa_logistics.job_vouchers.clear_job_voucher_cache",
+        "on_cancel": "ksa_logistics.job_vouchers.clear_job_voucher_cache"
+    },
+    "Company": {
+        "on_update": "ksa_logistics.masters.clear_master_cache",
+        "on_trash": "ksa_logistics.masters.clear_master_cache"
+    },
+    "Account": {
+        "on_update": "ksa_logistics.masters.clear_master_cache",
+        "on_trash": "ksa_logistics.masters.clear_master_cache"
+    },
+    "Item": {
+        "on_update": "ksa_logistics.masters.clear_master_cache",
+        "on_trash": "ksa_logistics.masters.clear_master_cache",
+        "after_rename": "ksa_logistics.masters.clear_master_cache"
+    },
+    "Salary Component": {
+        "on_update": "ksa_logistics.masters.clear_master_cache",
+        "on_trash": "ksa_logistics.masters.clear_master_cache"
+    },
+    "Global Defaults": {
+        "on_update": "ksa_logistics.masters.clear_master_cache"
+    },
+    "Warehouse Job Record": {
+        "on_update": "ksa_logistics.ksa_logistics.doctype.warehouse_stock_ledger.warehouse_stock_ledger.sync_stock_ledger",
+        "on_trash": "ksa_logistics.ksa_logistics.doctype.warehouse_stock_ledger.warehouse_stock_ledger.delete_stock_ledger"
+    },
+    "Packing List": {
+        "validate": "ksa_logistics.cargo.set_packing_list_totals"
+    },
+    "Survey Report": {
+        "validate": "ksa_logistics.cargo.set_survey_report_volume"
+    },
+    "Trip Details": {
+        "on_update": "ksa_logistics.ksa_logistics.doctype.fleet_utilization.fleet_utilization.on_trip_change",
+        "on_trash": "ksa_logistics.ksa_logistics.doctype.fleet_utilization.fleet_utilization.on_trip_change"
+    },
+    "Job Record": {
+        "on_update": "ksa_logistics.ksa_logistics.doctype.fleet_utilization.fleet_utilization.on_job_record_change",
+        "on_trash": "ksa_logistics.ksa_logistics.doctype.fleet_utilization.fleet_utilization.on_job_record_change"
+    }
 }
 
 # Scheduled Tasks
@@ -200,6 +290,15 @@ doc_events = {
 # 	],
 # }
 
+scheduler_events = {
+    "hourly": [
+        "ksa_logistics.thumbnails.evict_thumbnails"
+    ],
+    "daily": [
+        "ksa_logistics.photo_upload.remove_stale_uploads"
+    ],
+}
+
 # Testing
 # -------
 
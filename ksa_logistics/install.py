@@ -0,0 +1,13 @@
+from ksa_logistics.assignment_constraints import add_assignment_constraints
+from ksa_logistics.masters import ensure_masters
+from ksa_logistics.waybill_migration import create_land_waybill_view
+
+
+def after_install():
+    ensure_masters()
+
+
+def after_migrate():
+    ensure_masters()
+    create_land_waybill_view()
+    add_assignment_constraints()
@@ -0,0 +1,353 @@
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+from frappe.utils.background_jobs import get_job
+from rq.job import JobStatus
+
+"""
+Shared helpers for vouchers (Sales Invoice, Purchase Invoice, ...) linked to
+Job Record and Warehouse Job Record through their custom link fields.
+"""
+
+# Link field on the voucher doctypes pointing back at each job doctype
+JOB_LINK_FIELDS = {
+    "Job Record": "custom_job_record",
+    "Warehouse Job Record": "custom_warehouse_job_record",
+}
+
+DEFAULT_PAGE_LENGTH = 500
+MAX_PAGE_LENGTH = 5000
+
+
+def get_page_limits(filters):
+    """Return (limit, offset) from the `page` / `page_length` report filters, capped at MAX_PAGE_LENGTH"""
+    page_length = cint(filters.get("page_length")) or DEFAULT_PAGE_LENGTH
+    page_length = min(page_length, MAX_PAGE_LENGTH)
+    page = max(cint(filters.get("page")) or 1, 1)
+    return page_length, (page - 1) * page_length
+
+
+def get_voucher_lists(job_doctype, jobs, voucher_doctypes=("Sales Invoice", "Purchase Invoice")):
+    """
+    Return comma separated voucher names per job, split into submitted and unsubmitted.
+
+    Each voucher doctype is grouped once per (job, submitted) so the result never
+    multiplies rows across voucher types:
+        {job: {"Sales Invoice": {"submitted": "SI-1, SI-2", "unsubmitted": "SI-3"}, ...}}
+    """
+    link_field = JOB_LINK_FIELDS[job_doctype]
+    out = {job: {dt: {"submitted": "", "unsubmitted": ""} for dt in voucher_doctypes} for job in jobs}
+    if not jobs:
+        return out
+
+    for voucher_doctype in voucher_doctypes:
+        rows = frappe.db.sql(f"""
+            SELECT
+                `{link_field}` AS job,
+                IF(docstatus = 1, 'submitted', 'unsubmitted') AS state,
+                GROUP_CONCAT(name ORDER BY name SEPARATOR ', ') AS vouchers
+            FROM `tab{voucher_doctype}`
+            WHERE `{link_field}` IN %(jobs)s
+            GROUP BY `{link_field}`, state
+        """, {"jobs": list(jobs)}, as_dict=True)
+
+        for row in rows:
+            out[row.job][voucher_doctype][row.state] = row.vouchers
+
+    return out
+
+
+def add_voucher_columns(data, job_doctype, job_field="job_record"):
+    """Fill the submitted/unsubmitted SI and PI list columns on report rows"""
+    voucher_lists = get_voucher_lists(job_doctype, [row[job_field] for row in data])
+
+    for row in data:
+        vouchers = voucher_lists[row[job_field]]
+        row["unsubmitted_sales_invoices"] = vouchers["Sales Invoice"]["unsubmitted"]
+        row["unsubmitted_purchase_invoices"] = vouchers["Purchase Invoice"]["unsubmitted"]
+        row["submitted_sales_invoices"] = vouchers["Sales Invoice"]["submitted"]
+        row["submitted_purchase_invoices"] = vouchers["Purchase Invoice"]["submitted"]
+
+    return data
+
+
+def get_voucher_columns():
+    return [
+        {"fieldname": "unsubmitted_sales_invoices", "label": _("Unsubmitted Sales Invoices"), "fieldtype": "Data", "width": 200},
+        {"fieldname": "unsubmitted_purchase_invoices", "label": _("Unsubmitted Purchase Invoices"), "fieldtype": "Data", "width": 200},
+        {"fieldname": "submitted_sales_invoices", "label": _("Submitted Sales Invoices"), "fieldtype": "Data", "width": 200},
+        {"fieldname": "submitted_purchase_invoices", "label": _("Submitted Purchase Invoices"), "fieldtype": "Data", "width": 200},
+    ]
+
+
+# Cached per-job voucher breakdown (Job Details Report drilldown)
+# -----------------------------------------------------------------
+
+BREAKDOWN_CACHE_KEY = "ksa_logistics:job_voucher_breakdown"
+
+# Voucher events drop a job's breakdown, the expiry catches changes no hook sees
+BREAKDOWN_CACHE_TTL = 6 * 60 * 60
+
+
+def get_breakdown_cache_key(job):
+    return f"{BREAKDOWN_CACHE_KEY}:{job}"
+
+
+def get_job_voucher_breakdown(jobs):
+    """
+    Return {job: [voucher rows]} with submitted SI, PI and JE totals for the given Job Records.
+
+    Rows are served from the cache where possible, only jobs missing from the
+    cache are queried and only for the job set passed in.
+    """
+    cache = frappe.cache()
+    out = {}
+    missing = []
+
+    for job in jobs:
+        rows = cache.get_value(get_breakdown_cache_key(job))
+        if rows is None:
+            missing.append(job)
+        else:
+            out[job] = rows
+
+    if missing:
+        fetched = {job: [] for job in missing}
+        for row in _query_job_vouchers(missing):
+            fetched[row.job_record].append(row)
+
+        for job, rows in fetched.items():
+            cache.set_value(get_breakdown_cache_key(job), rows, expires_in_sec=BREAKDOWN_CACHE_TTL)
+            out[job] = rows
+
+    return out
+
+
+def _query_job_vouchers(jobs):
+    values = {"jobs": list(jobs)}
+
+    sales = frappe.db.sql("""
+        SELECT
+            custom_job_record AS job_record,
+            'Sales' AS invoice_type,
+            name AS invoice_id,
+            grand_total AS total_amount,
+            outstanding_amount AS sales_outstanding_amount,
+            0 AS purchase_outstanding_amount
+        FROM `tabSales Invoice`
+        WHERE docstatus = 1 AND custom_job_record IN %(jobs)s
+    """, values, as_dict=True)
+
+    purchase = frappe.db.sql("""
+        SELECT
+            custom_job_record AS job_record,
+            'Purchase' AS invoice_type,
+            name AS invoice_id,
+            grand_total AS total_amount,
+            0 AS sales_outstanding_amount,
+            outstanding_amount AS purchase_outstanding_amount
+        FROM `tabPurchase Invoice`
+        WHERE docstatus = 1 AND custom_job_record IN %(jobs)s
+    """, values, as_dict=True)
+
+    journals = frappe.db.sql("""
+        SELECT
+            je.custom_job_record AS job_record,
+            'Journal Entry' AS invoice_type,
+            je.name AS invoice_id,
+            SUM(jea.debit) AS total_amount,
+            0 AS sales_outstanding_amount,
+            0 AS purchase_outstanding_amount
+        FROM `tabJournal Entry` je
+        JOIN `tabJournal Entry Account` jea
+            ON jea.parent = je.name AND jea.parenttype = 'Journal Entry' AND jea.debit > 0
+        WHERE je.docstatus = 1 AND je.custom_job_record IN %(jobs)s
+        GROUP BY je.custom_job_record, je.name
+    """, values, as_dict=True)
+
+    return sales + purchase + journals
+
+
+def get_linked_jobs(doc, job_doctype="Job Record"):
+    """Return the jobs a voucher affects, directly or through the vouchers it references"""
+    link_field = JOB_LINK_FIELDS[job_doctype]
+    jobs = set()
+    if doc.get(link_field):
+        jobs.add(doc.get(link_field))
+
+    # Payments and journals against invoices change the invoice outstanding amounts
+    references = {"Sales Invoice": set(), "Purchase Invoice": set()}
+    for row in doc.get("references") or []:
+        if row.reference_doctype in references:
+            references[row.reference_doctype].add(row.reference_name)
+    if doc.doctype == "Journal Entry":
+        for row in doc.get("accounts") or []:
+            if row.reference_type in references:
+                references[row.reference_type].add(row.reference_name)
+
+    # Returns (credit and debit notes, return delivery notes and receipts) change
+    # the original voucher's outstanding amount or quantities, even when the
+    # return itself was made without the job link
+    if doc.get("is_return") and doc.get("return_against"):
+        references.setdefault(doc.doctype, set()).add(doc.return_against)
+
+    for voucher_doctype, names in references.items():
+        if names and frappe.get_meta(voucher_doctype).has_field(link_field):
+            jobs.update(frappe.get_all(
+                voucher_doctype,
+                filters={"name": ["in", list(names)], link_field: ["is", "set"]},
+                pluck=link_field
+            ))
+
+    return jobs
+
+
+def clear_job_voucher_cache(doc, method=None):
+    """doc_events hook: drop cached breakdowns and indicators for jobs touched by a submitted/cancelled voucher"""
+    keys = []
+    for job_doctype in JOB_LINK_FIELDS:
+        for job in get_linked_jobs(doc, job_doctype):
+            if job_doctype == "Job Record":
+                keys.append(get_breakdown_cache_key(job))
+            enqueue_publish_job_indicators(job_doctype, job)
+
+    # Deleted once the voucher is committed, a report reading before then would cache the old figures
+    if keys:
+        frappe.db.after_commit.add(lambda: frappe.cache().delete_value(keys))
+
+
+# Form indicators (Job Record / Warehouse Job Record dashboards)
+# --------------------------------------------------------------
+
+INDICATOR_CACHE_TTL = 300
+
+
+def get_indicator_cache_key(job_doctype, job):
+    return f"ksa_logistics:job_indicators:{job_doctype}:{job}"
+
+
+@frappe.whitelist()
+def get_job_indicators(doctype, name):
+    """
+    Return the dashboard figures of a Job Record / Warehouse Job Record in one call:
+    SI and PI totals (with and without VAT) and outstanding, JE debit total and
+    received / delivered quantities from Purchase Receipts and Delivery Notes.
+
+    Forms call this when they load, while open they get changes pushed by publish_job_indicators.
+    """
+    if doctype not in JOB_LINK_FIELDS:
+        frappe.throw(_("Indicators are not available for {0}").format(doctype))
+
+    # Unsaved ("new-job-record-...") or deleted jobs have nothing to show
+    if not frappe.db.exists(doctype, name):
+        return {}
+
+    frappe.has_permission(doctype, "read", name, throw=True)
+
+    cache = frappe.cache()
+    key = get_indicator_cache_key(doctype, name)
+    indicators = cache.get_value(key)
+    if indicators is None:
+        indicators = _query_job_indicators(doctype, name)
+        cache.set_value(key, indicators, expires_in_sec=INDICATOR_CACHE_TTL)
+
+    return indicators
+
+
+def enqueue_debounced(method, job_id, **kwargs):
+    """
+    Enqueue `method` unless a run under `job_id` is still waiting in the queue,
+    which will see the latest data anyway. A run that already started may have
+    read the data before this change, so a follow-up run is queued (under a
+    second id) instead of the change being dropped.
+    """
+    for candidate in (job_id, f"{job_id}:rerun"):
+        job = get_job(candidate)
+        status = job.get_status() if job else None
+        if status == JobStatus.QUEUED:
+            return
+        if status != JobStatus.STARTED:
+            frappe.enqueue(method, job_id=candidate, **kwargs)
+            return
+
+    # Both runs started already, the change still needs one more run
+    frappe.enqueue(method, **kwargs)
+
+
+def enqueue_publish_job_indicators(job_doctype, job):
+    # One recompute per job however many vouchers are submitted in the same burst
+    enqueue_debounced(
+        "ksa_logistics.job_vouchers.publish_job_indicators",
+        f"ksa_logistics:job_indicators:{job_doctype}:{job}",
+        queue="short",
+        enqueue_after_commit=True,
+        job_doctype=job_doctype,
+        job=job
+    )
+
+
+def publish_job_indicators(job_doctype, job):
+    """
+    Recompute the indicators of a job, refresh the cache and push the changed
+    values to the forms that have the job open (`job_indicators` realtime event).
+    """
+    cache = frappe.cache()
+    key = get_indicator_cache_key(job_doctype, job)
+    previous = cache.get_value(key) or {}
+
+    indicators = _query_job_indicators(job_doctype, job)
+    cache.set_value(key, indicators, expires_in_sec=INDICATOR_CACHE_TTL)
+
+    delta = {k: v for k, v in indicators.items() if previous.get(k) != v}
+    if not delta:
+        return
+
+    frappe.publish_realtime(
+        "job_indicators",
+        {"doctype": job_doctype, "name": job, "delta": delta},
+        doctype=job_doctype,
+        docname=job
+    )
+
+
+def _query_job_indicators(job_doctype, job):
+    link_field = JOB_LINK_FIELDS[job_doctype]
+
+    rows = frappe.db.sql(f"""
+        SELECT 'Sales Invoice' AS voucher_type, SUM(base_grand_total) AS grand_total,
+            SUM(base_total) AS total, SUM(outstanding_amount) AS outstanding, 0 AS qty
+        FROM `tabSales Invoice`
+        WHERE docstatus = 1 AND `{link_field}` = %(job)s
+        UNION ALL
+        SELECT 'Purchase Invoice', SUM(base_grand_total), SUM(base_total), SUM(outstanding_amount), 0
+        FROM `tabPurchase Invoice`
+        WHERE docstatus = 1 AND `{link_field}` = %(job)s
+        UNION ALL
+        SELECT 'Journal Entry', SUM(total_debit), SUM(total_debit), 0, 0
+        FROM `tabJournal Entry`
+        WHERE docstatus = 1 AND `{link_field}` = %(job)s
+        UNION ALL
+        SELECT 'Purchase Receipt', 0, 0, 0, SUM(total_qty)
+        FROM `tabPurchase Receipt`
+        WHERE docstatus = 1 AND `{link_field}` = %(job)s
+        UNION ALL
+        SELECT 'Delivery Note', 0, 0, 0, SUM(total_qty)
+        FROM `tabDelivery Note`
+        WHERE docstatus = 1 AND `{link_field}` = %(job)s
+    """, {"job": job}, as_dict=True)
+
+    totals = {row.voucher_type: row for row in rows}
+    sales = totals["Sales Invoice"]
+    purchase = totals["Purchase Invoice"]
+
+    return {
+        "sales_grand_total": flt(sales.grand_total),
+        "sales_total": flt(sales.total),
+        "sales_outstanding": flt(sales.outstanding),
+        "purchase_grand_total": flt(purchase.grand_total),
+        "purchase_total": flt(purchase.total),
+        "purchase_outstanding": flt(purchase.outstanding),
+        "journal_total": flt(totals["Journal Entry"].total),
+        "received_qty": flt(totals["Purchase Receipt"].qty),
+        "delivered_qty": flt(totals["Delivery Note"].qty),
+    }
@@ -5,12 +5,23 @@
 import frappe
 from frappe.model.document import Document
 from frappe import _
-from frappe.utils import now_datetime
+from frappe.utils import cint, now_datetime
+
+from ksa_logistics.assignment_constraints import (
+	add_assignment_constraint,
+	get_assigned_duplicate,
+	get_unassigned_duplicate,
+	is_assignment_violation,
+	validate_assignment,
+)
+from ksa_logistics.cargo import measure_rows
+from ksa_logistics.photo_upload import store_inline_images
 
 
 class CollectionNote(Document):
 	def validate(self):
 		"""Validate collection note"""
+		store_inline_images(self)
 		self.validate_job_record()
 		self.calculate_totals()
 		self.set_defaults_from_job()
@@ -21,93 +32,44 @@ class CollectionNote(Document):
 		if not self.flags.ignore_update_job_record:
 			self.update_job_record()
 	
+	def show_unique_validation_message(self, e):
+		if is_assignment_violation(e):
+			frappe.throw(_("Collection Note already exists for this Job Assignment: {0}").format(get_assigned_duplicate(self)), frappe.UniqueValidationError)
+		super().show_unique_validation_message(e)
+	
 	def validate_job_record(self):
 		"""Validate job record and job assignment"""
 		if not self.job_record:
 			frappe.throw(_("Job Record is required"))
 		
-		# If job_assignment_name is provided, check if collection note already exists for this assignment
+		existing = validate_assignment(self)
+		if existing:
+			frappe.throw(_("Collection Note already exists for this Job Assignment: {0}").format(existing))
+		
+		# One Collection Note per assignment is enforced by the job_assignment_unique
+		# constraint (see show_unique_validation_message), only check the row exists
 		if self.job_assignment_name:
-			job = frappe.get_doc("Job Record", self.job_record)
-			job_assignment_found = False
-			existing_collection_note = None
-			
-			# Find the job assignment row in the loaded document
-			for ja in job.job_assignment:
-				if str(ja.name) == str(self.job_assignment_name) or str(ja.idx) == str(self.job_assignment_name):
-					job_assignment_found = True
-					# Try to get collection_note from the child table row
-					# Use getattr to safely access the field (it might not be loaded)
-					existing_collection_note = getattr(ja, 'collection_note', None)
-					break
+			job_assignment_found = frappe.db.sql("""
+				SELECT 1
+				FROM `tabJob Assignment`
+				WHERE parent = %s AND parenttype = 'Job Record' AND (name = %s OR idx = %s)
+				LIMIT 1
+			""", (self.job_record, self.job_assignment_name, self.job_assignment_name))
 			
 			if not job_assignment_found:
 				frappe.throw(_("Job Assignment {0} not found in Job Record").format(self.job_assignment_name))
-			
-			# If collection_note wasn't found in the loaded document, try querying the database
-			# But handle the case where the column might not exist yet (migration not run)
-			if existing_collection_note is None:
-				try:
-					# Check if column exists first by querying table structure
-					columns = frappe.db.sql("""
-						SHOW COLUMNS FROM `tabJob Assignment` LIKE 'collection_note'
-					""", as_dict=True)
-					
-					if columns:
-						# Column exists, so we can query it
-						result = frappe.db.sql("""
-							SELECT collection_note
-							FROM `tabJob Assignment` 
-							WHERE parent = %s 
-							AND (name = %s OR idx = %s)
-							LIMIT 1
-						""", (self.job_record, self.job_assignment_name, self.job_assignment_name), as_dict=True)
-						
-						if result:
-							existing_collection_note = result[0].get('collection_note')
-				except Exception:
-					# Column doesn't exist yet - this is OK, migration will add it
-					# Skip the duplicate check for now
-					existing_collection_note = None
-			
-			# Check if collection note already exists for this assignment
-			if existing_collection_note and existing_collection_note != self.name:
-				frappe.throw(_("Collection Note already exists for this Job Assignment: {0}").format(existing_collection_note))
 		else:
 			# Legacy: Check if collection note already exists for this job (without assignment)
-			existing = frappe.db.exists("Collection Note", {
-				"job_record": self.job_record,
-				"job_assignment_name": ["in", ["", None]],
-				"name": ["!=", self.name]
-			})
-			
+			existing = get_unassigned_duplicate(self)
 			if existing:
 				frappe.msgprint(_("Warning: Collection Note already exists for this job without assignment: {0}").format(existing), indicator="orange")
 	
 	def calculate_totals(self):
-		"""Calculate totals including CBM"""
-		total_pieces = 0
-		total_weight = 0.0
-		total_cbm = 0.0
-		
-		for item in self.collection_items:
-			total_pieces += item.quantity or 0
-			total_weight += item.weight or 0
-			# Calculate CBM for this item if dimensions are provided
-			if item.length_cm and item.width_cm and item.height_cm:
-				# CBM = (L × W × H) / 1,000,000 (convert cm³ to m³)
-				item_cbm = (item.length_cm * item.width_cm * item.height_cm) / 1000000.0
-				# Multiply by quantity
-				item_cbm = item_cbm * (item.quantity or 1)
-				item.cbm = item_cbm
-				total_cbm += item_cbm
-			elif item.cbm:
-				# Use manually entered CBM
-				total_cbm += item.cbm * (item.quantity or 1)
-		
-		self.total_pieces = total_pieces
-		self.total_weight = total_weight
-		self.total_cbm = total_cbm
+		"""Calculate totals including CBM (row CBM = L x W x H x quantity)"""
+		totals = measure_rows(self.collection_items, cbm_field="cbm", weight_field="weight", qty_field="quantity")
+		self.total_pieces = cint(totals.qty)
+		self.total_weight = totals.weight
+		self.total_cbm = totals.cbm
 	
 	def set_defaults_from_job(self):
 		"""Auto-populate fields from job record and job assignment"""
@@ -259,6 +221,11 @@ class CollectionNote(Document):
 				# Column doesn't exist yet - skip this check
 				pass
 
+
+def on_doctype_update():
+	add_assignment_constraint("Collection Note")
+
+
 @frappe.whitelist()
 def get_collection_details(job_record, job_assignment_name=None):
 	"""Get collection details from job and job assignment"""
@@ -7,10 +7,20 @@ from frappe.model.document import Document
 from frappe import _
 from frappe.utils import now_datetime, flt
 
+from ksa_logistics.assignment_constraints import (
+	add_assignment_constraint,
+	get_assigned_duplicate,
+	get_unassigned_duplicate,
+	is_assignment_violation,
+	validate_assignment,
+)
+from ksa_logistics.photo_upload import store_inline_images
+
 
 class DeliveryNoteRecord(Document):
 	def validate(self):
 		"""Validate delivery note"""
+		store_inline_images(self)
 		# When waybill is set, fetch all details from Waybill first (internal reference)
 		if self.waybill:
 			self.set_defaults_from_waybill()
@@ -91,32 +101,26 @@ class DeliveryNoteRecord(Document):
 		"""Actions on save/update"""
 		self.update_job_record()
 	
+	def show_unique_validation_message(self, e):
+		if is_assignment_violation(e):
+			frappe.throw(_("Delivery Note already exists for this Job Assignment: {0}").format(get_assigned_duplicate(self)), frappe.UniqueValidationError)
+		super().show_unique_validation_message(e)
+	
 	def validate_job_record(self):
 		"""Require either Waybill or Job Record. Check duplicate delivery note per assignment when linked to job."""
 		if not self.waybill and not self.job_record:
 			frappe.throw(_("Waybill or Job Record is required"))
 		if not self.job_record:
 			return
-		# Check if delivery note already exists for this job assignment
-		# Multiple delivery notes are allowed per job, but only one per job assignment
-		if self.job_assignment_name:
-			# Check if delivery note already exists for this specific job assignment
-			existing = frappe.db.exists("Delivery Note Record", {
-				"job_record": self.job_record,
-				"job_assignment_name": self.job_assignment_name,
-				"name": ["!=", self.name]
-			})
-			
-			if existing:
-				frappe.throw(_("Delivery Note already exists for this Job Assignment: {0}").format(existing))
-		else:
-			# Legacy: If no job_assignment_name, check if delivery note exists for job (backward compatibility)
-			existing = frappe.db.exists("Delivery Note Record", {
-				"job_record": self.job_record,
-				"job_assignment_name": ["in", ["", None]],
-				"name": ["!=", self.name]
-			})
-			
+		# Multiple delivery notes are allowed per job, but only one per job assignment:
+		# the job_assignment_unique constraint enforces it (see show_unique_validation_message)
+		existing = validate_assignment(self)
+		if existing:
+			frappe.throw(_("Delivery Note already exists for this Job Assignment: {0}").format(existing))
+		
+		if not self.job_assignment_name:
+			# Legacy: If no job_assignment_name, check if one exists for job (backward compatibility)
+			existing = get_unassigned_duplicate(self)
 			if existing:
 				frappe.msgprint(_("Warning: Delivery Note already exists for this job without assignment: {0}. Consider specifying a job_assignment_name for multiple delivery notes.").format(existing), indicator="orange")
 	
@@ -212,6 +216,11 @@ class DeliveryNoteRecord(Document):
 				
 				frappe.msgprint(_("POD {0} created automatically").format(pod.name))
 
+
+def on_doctype_update():
+	add_assignment_constraint("Delivery Note Record")
+
+
 @frappe.whitelist()
 def get_delivery_details_from_waybill(waybill_name):
 	"""Return all Waybill fields to pre-fill Delivery Note Record (same structure as Waybill)."""
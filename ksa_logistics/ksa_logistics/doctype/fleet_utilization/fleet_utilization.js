@@ -0,0 +1,8 @@
+// Copyright (c) 2026, ramees@enfono.com and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Fleet Utilization", {
+// 	refresh(frm) {
+
+// 	},
+// });
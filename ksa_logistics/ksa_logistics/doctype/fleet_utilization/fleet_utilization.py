@@ -0,0 +1,226 @@
+# Copyright (c) 2026, ramees@enfono.com and contributors
+# For license information, please see license.txt
+
+import json
+from datetime import timedelta
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import getdate
+
+DIMENSIONS = ("vehicle", "driver", "week_start", "job_type", "origin", "destination")
+MEASURES = ("trips", "trip_amount", "vehicle_revenue", "allowance", "pi_cost", "je_cost")
+
+
+class FleetUtilization(Document):
+	pass
+
+
+def get_week_start(date):
+	"""Monday of the week `date` falls in"""
+	date = getdate(date)
+	return date - timedelta(days=date.weekday())
+
+
+def refresh_fleet_utilization(keys):
+	"""
+	Recompute the cube rows for each (vehicle, week_start) in `keys`.
+
+	Trip rows are grouped by driver, job type and route. The trip amount is
+	taken from the Job Assignments of the vehicle on Job Records dated in the
+	week, as the Vehicle PL Report credits it, and added to the trip row of the
+	same driver, job type and route. Purchase Invoice and Journal Entry costs
+	are booked per vehicle only, so they go on a separate row with empty
+	driver / job type / route.
+	"""
+	for vehicle, week_start in {(k[0], get_week_start(k[1])) for k in keys if k[0] and k[1]}:
+		week_end = week_start + timedelta(days=6)
+		values = {"vehicle": vehicle, "week_start": week_start, "week_end": week_end}
+
+		frappe.db.delete("Fleet Utilization", {"vehicle": vehicle, "week_start": week_start})
+
+		trips = frappe.db.sql("""
+			SELECT
+				td.driver,
+				jr.job_types AS job_type,
+				td.origin,
+				td.destination,
+				COUNT(td.name) AS trips,
+				SUM(IFNULL(td.vehicle_revenue, 0)) AS vehicle_revenue,
+				SUM(IFNULL(td.allowance, 0)) AS allowance
+			FROM `tabTrip Details` td
+			LEFT JOIN `tabJob Record` jr ON jr.name = td.job_records
+			WHERE td.vehicle = %(vehicle)s
+				AND td.docstatus < 2
+				AND IFNULL(td.status, '') != 'Cancelled'
+				AND COALESCE(td.posting_date, DATE(td.creation)) BETWEEN %(week_start)s AND %(week_end)s
+			GROUP BY td.driver, jr.job_types, td.origin, td.destination
+		""", values, as_dict=True)
+
+		assignments = frappe.db.sql("""
+			SELECT
+				ja.driver,
+				jr.job_types AS job_type,
+				jr.origin,
+				jr.destination,
+				SUM(IFNULL(ja.trip_amount, 0)) AS trip_amount
+			FROM `tabJob Assignment` ja
+			INNER JOIN `tabJob Record` jr ON jr.name = ja.parent
+			WHERE ja.parenttype = 'Job Record'
+				AND ja.vehicle = %(vehicle)s
+				AND jr.docstatus < 2
+				AND jr.date BETWEEN %(week_start)s AND %(week_end)s
+			GROUP BY ja.driver, jr.job_types, jr.origin, jr.destination
+		""", values, as_dict=True)
+
+		rows = {(t.driver, t.job_type, t.origin, t.destination): t for t in trips}
+		for a in assignments:
+			key = (a.driver, a.job_type, a.origin, a.destination)
+			if key in rows:
+				rows[key].trip_amount = a.trip_amount
+			else:
+				trips.append(a)
+
+		pi_cost = frappe.db.sql("""
+			SELECT SUM(pii.base_amount)
+			FROM `tabPurchase Invoice Item` pii
+			INNER JOIN `tabPurchase Invoice` pi ON pi.name = pii.parent
+			WHERE pii.custom_vehicle = %(vehicle)s
+				AND pi.docstatus = 1
+				AND pi.posting_date BETWEEN %(week_start)s AND %(week_end)s
+		""", values)[0][0] or 0
+
+		je_cost = frappe.db.sql("""
+			SELECT SUM(jea.debit)
+			FROM `tabJournal Entry Account` jea
+			INNER JOIN `tabJournal Entry` je ON je.name = jea.parent
+			WHERE jea.custom_vehicle = %(vehicle)s
+				AND je.docstatus = 1
+				AND je.posting_date BETWEEN %(week_start)s AND %(week_end)s
+		""", values)[0][0] or 0
+
+		if pi_cost or je_cost:
+			trips.append(frappe._dict(pi_cost=pi_cost, je_cost=je_cost))
+
+		for row in trips:
+			frappe.get_doc(dict(row, doctype="Fleet Utilization", vehicle=vehicle, week_start=week_start)).insert(
+				ignore_permissions=True
+			)
+
+
+def enqueue_refresh(keys):
+	keys = sorted({(vehicle, str(get_week_start(date))) for vehicle, date in keys if vehicle and date})
+	if not keys:
+		return
+
+	frappe.enqueue(
+		"ksa_logistics.ksa_logistics.doctype.fleet_utilization.fleet_utilization.refresh_fleet_utilization",
+		queue="short",
+		keys=keys,
+		enqueue_after_commit=True
+	)
+
+
+def get_trip_date(trip):
+	return trip.get("posting_date") or trip.get("creation")
+
+
+def on_trip_change(doc, method=None):
+	"""Trip Details on_update / on_trash: refresh the weeks of the current and previous vehicle"""
+	keys = [(doc.vehicle, get_trip_date(doc))]
+
+	before = doc.get_doc_before_save()
+	if before:
+		keys.append((before.vehicle, get_trip_date(before)))
+
+	enqueue_refresh(keys)
+
+
+def on_job_record_change(doc, method=None):
+	"""Job Record on_update / on_trash: refresh the weeks of the assigned vehicles, before and after the change"""
+	keys = [(row.vehicle, doc.date) for row in doc.get("job_assignment") or []]
+
+	before = doc.get_doc_before_save()
+	if before:
+		keys += [(row.vehicle, before.date) for row in before.get("job_assignment") or []]
+
+	enqueue_refresh(keys)
+
+
+def on_voucher_change(doc, method=None):
+	"""Purchase Invoice / Journal Entry on_submit / on_cancel: refresh the vehicles booked on the voucher"""
+	rows = doc.get("items") if doc.doctype == "Purchase Invoice" else doc.get("accounts")
+	enqueue_refresh([(row.get("custom_vehicle"), doc.posting_date) for row in rows or []])
+
+
+def rebuild_fleet_utilization():
+	"""Rebuild the whole cube from Trip Details, Job Assignments, Purchase Invoices and Journal Entries"""
+	dates = frappe.db.sql("""
+		SELECT DISTINCT vehicle, COALESCE(posting_date, DATE(creation))
+		FROM `tabTrip Details`
+		WHERE IFNULL(vehicle, '') != ''
+		UNION
+		SELECT DISTINCT ja.vehicle, jr.date
+		FROM `tabJob Assignment` ja
+		INNER JOIN `tabJob Record` jr ON jr.name = ja.parent
+		WHERE ja.parenttype = 'Job Record' AND jr.docstatus < 2 AND IFNULL(ja.vehicle, '') != ''
+		UNION
+		SELECT DISTINCT pii.custom_vehicle, pi.posting_date
+		FROM `tabPurchase Invoice Item` pii
+		INNER JOIN `tabPurchase Invoice` pi ON pi.name = pii.parent
+		WHERE pi.docstatus = 1 AND IFNULL(pii.custom_vehicle, '') != ''
+		UNION
+		SELECT DISTINCT jea.custom_vehicle, je.posting_date
+		FROM `tabJournal Entry Account` jea
+		INNER JOIN `tabJournal Entry` je ON je.name = jea.parent
+		WHERE je.docstatus = 1 AND IFNULL(jea.custom_vehicle, '') != ''
+	""")
+
+	frappe.db.delete("Fleet Utilization")
+	refresh_fleet_utilization(dates)
+
+
+@frappe.whitelist()
+def get_fleet_utilization(filters=None, group_by=None, from_date=None, to_date=None):
+	"""
+	Slice the cube: sum all measures grouped by `group_by` dimensions.
+
+	`filters` is a dict of dimension -> value, `from_date` / `to_date` match
+	the weeks they fall in, e.g.
+		get_fleet_utilization({"vehicle": "ABC-123"}, ["driver", "week_start"], "2026-01-01", "2026-03-31")
+	"""
+	frappe.has_permission("Fleet Utilization", "read", throw=True)
+
+	if isinstance(filters, str):
+		filters = json.loads(filters)
+	if isinstance(group_by, str):
+		group_by = json.loads(group_by) if group_by.startswith("[") else group_by.split(",")
+
+	filters = filters or {}
+	group_by = [d.strip() for d in group_by or [] if d.strip()] or ["vehicle", "week_start"]
+
+	invalid = [d for d in list(filters) + group_by if d not in DIMENSIONS]
+	if invalid:
+		frappe.throw(_("Invalid dimensions: {0}").format(", ".join(invalid)))
+
+	conditions = [f"`{d}` = %({d})s" for d in filters]
+	values = dict(filters)
+
+	if from_date:
+		conditions.append("week_start >= %(from_date)s")
+		values["from_date"] = get_week_start(from_date)
+	if to_date:
+		conditions.append("week_start <= %(to_date)s")
+		values["to_date"] = getdate(to_date)
+
+	select = ", ".join([f"`{d}`" for d in group_by] + [f"SUM(`{m}`) AS `{m}`" for m in MEASURES])
+	group = ", ".join(f"`{d}`" for d in group_by)
+
+	return frappe.db.sql(f"""
+		SELECT {select}
+		FROM `tabFleet Utilization`
+		{"WHERE " + " AND ".join(conditions) if conditions else ""}
+		GROUP BY {group}
+		ORDER BY {group}
+	""", values, as_dict=True)
@@ -49,95 +49,163 @@ frappe.ui.form.on("Job Record", {
 
         frm.add_custom_button(__('Get Items from Quotation'), () => {
 
-            frappe.call({
-                method: 'ksa_logistics.api.get_quotations_for_customer',
-                args: { customer: frm.doc.customer },
+            const dialog = new frappe.ui.Dialog({
+                title: __('Select Quotations'),
+                fields: [
+                    {
+                        fieldname: 'txt',
+                        fieldtype: 'Data',
+                        label: __('Search'),
+                        description: __('Quotation ID or title'),
+                        onchange: () => load_quotations(true)
+                    },
+                    { fieldtype: 'Column Break' },
+                    {
+                        fieldname: 'status',
+                        fieldtype: 'Select',
+                        label: __('Status'),
+                        options: ['', 'Open', 'Replied', 'Partially Ordered', 'Ordered', 'Lost', 'Expired'],
+                        onchange: () => load_quotations(true)
+                    },
+                    {
+                        fieldname: 'valid_only',
+                        fieldtype: 'Check',
+                        label: __('Valid Only'),
+                        onchange: () => load_quotations(true)
+                    },
+                    { fieldtype: 'Section Break' },
+                    { fieldname: 'quotation_table_wrapper', fieldtype: 'HTML' },
+                    { fieldname: 'merge', fieldtype: 'Check', label: __('Merge identical items across quotations') }
+                ],
+                primary_action_label: __('Get Items'),
 
-                callback(r) {
+                primary_action() {
 
-                    const quotations = r.message || [];
+                    const selected = dialog.$wrapper
+                        .find('.quotation-checkbox:checked')
+                        .map((i, el) => el.dataset.quotation)
+                        .get();
 
-                    if (!quotations.length) {
-                        frappe.msgprint(__('No submitted quotations found for this customer.'));
+                    if (!selected.length) {
+                        frappe.msgprint(__('Please select at least one quotation.'));
                         return;
                     }
 
-                    const dialog = new frappe.ui.Dialog({
-                        title: __('Select Quotations'),
-                        fields: [{ fieldname: 'quotation_table_wrapper', fieldtype: 'HTML' }],
-                        primary_action_label: __('Get Items'),
+                    frm.clear_table('items');
+
+                    // Items come a page of quotations at a time, `next_start` is null after the last one
+                    const load_items = (start) => frappe.call({
+                        method: 'ksa_logistics.api.get_items_from_multiple_quotations',
+                        args: { quotations: selected, merge: dialog.get_value('merge'), start: start },
+                        freeze: true,
 
-                        primary_action() {
+                        callback(res) {
 
-                            const selected = dialog.$wrapper
-                                .find('.quotation-checkbox:checked')
-                                .map((i, el) => el.dataset.quotation)
-                                .get();
+                            if (!res.message || !res.message.items) return;
 
-                            if (!selected.length) {
-                                frappe.msgprint(__('Please select at least one quotation.'));
+                            res.message.items.forEach(item => {
+                                let row = frm.add_child("items");
+                                row.item = item.item_code;
+                                row.item_name = item.item_name;
+                                row.uom = item.uom;
+                                row.quantity = item.qty;
+                                row.rate = item.rate;
+                                row.amount = item.amount;
+                                row.from_quotation = item.parent;
+                            });
+
+                            if (res.message.next_start) {
+                                load_items(res.message.next_start);
                                 return;
                             }
 
-                            frappe.call({
-                                method: 'ksa_logistics.api.get_items_from_multiple_quotations',
-                                args: { quotations: selected },
+                            frm.refresh_field('items');
+                            frm.events.update_totals(frm);
+                            dialog.hide();
+                        }
+                    });
 
-                                callback(res) {
+                    load_items(0);
+                }
+            });
 
-                                    if (!res.message || !res.message.items) return;
+            const page_length = 20;
+            let cursor = null;
+
+            const $wrapper = dialog.fields_dict.quotation_table_wrapper.$wrapper;
+            $wrapper.html(`
+                <table class="table table-bordered">
+                    <thead>
+                        <tr>
+                            <th><input type="checkbox" id="select-all-quotations"></th>
+                            <th>Quotation</th>
+                            <th>Title</th>
+                            <th>Valid Till</th>
+                            <th>Status</th>
+                            <th>Grand Total</th>
+                        </tr>
+                    </thead>
+                    <tbody class="quotation-rows"></tbody>
+                </table>
+                <button class="btn btn-xs btn-default load-more-quotations">${__('Load More')}</button>
+            `);
+
+            $wrapper.find('#select-all-quotations').on('change', function () {
+                $wrapper.find('.quotation-checkbox').prop('checked', this.checked);
+            });
 
-                                    frm.clear_table('items');
+            $wrapper.find('.load-more-quotations').on('click', () => load_quotations(false));
 
-                                    res.message.items.forEach(item => {
-                                        let row = frm.add_child("items");
-                                        row.item = item.item_code;
-                                        row.item_name = item.item_name;
-                                        row.uom = item.uom;
-                                        row.quantity = item.qty;
-                                        row.rate = item.rate;
-                                        row.amount = item.amount;
-                                        row.from_quotation = item.parent;
-                                    });
+            // Loads one page, `reset` starts again from the newest quotation (filters changed)
+            function load_quotations(reset) {
+                if (reset) {
+                    cursor = null;
+                    $wrapper.find('.quotation-rows').empty();
+                }
 
-                                    frm.refresh_field('items');
-                                    frm.events.update_totals(frm);
-                                    dialog.hide();
-                                }
-                            });
+                frappe.call({
+                    method: 'ksa_logistics.api.get_quotations_for_customer',
+                    args: {
+                        customer: frm.doc.customer,
+                        txt: dialog.get_value('txt'),
+                        status: dialog.get_value('status'),
+                        valid_only: dialog.get_value('valid_only'),
+                        after_creation: cursor && cursor.creation,
+                        after_name: cursor && cursor.name,
+                        page_length: page_length
+                    },
+
+                    callback(r) {
+
+                        const quotations = r.message || [];
+
+                        if (reset && !quotations.length) {
+                            $wrapper.find('.quotation-rows').html(`
+                                <tr><td colspan="6" class="text-muted">${__('No submitted quotations found for this customer.')}</td></tr>
+                            `);
                         }
-                    });
 
-                    dialog.show();
-
-                    const table_html = `
-                        <table class="table table-bordered">
-                            <thead>
-                                <tr>
-                                    <th><input type="checkbox" id="select-all-quotations"></th>
-                                    <th>Quotation</th>
-                                    <th>Grand Total</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                ${quotations.map(q => `
-                                    <tr>
-                                        <td><input type="checkbox" class="quotation-checkbox" data-quotation="${q.name}"></td>
-                                        <td>${q.name}</td>
-                                        <td style="text-align:right;">${frappe.format(q.grand_total, { fieldtype: 'Currency' })}</td>
-                                    </tr>
-                                `).join('')}
-                            </tbody>
-                        </table>
-                    `;
-
-                    dialog.fields_dict.quotation_table_wrapper.$wrapper.html(table_html);
-
-                    dialog.$wrapper.find('#select-all-quotations').on('change', function () {
-                        dialog.$wrapper.find('.quotation-checkbox').prop('checked', this.checked);
-                    });
-                }
-            });
+                        $wrapper.find('.quotation-rows').append(quotations.map(q => `
+                            <tr>
+                                <td><input type="checkbox" class="quotation-checkbox" data-quotation="${q.name}"></td>
+                                <td>${q.name}</td>
+                                <td>${frappe.utils.escape_html(q.title || '')}</td>
+                                <td>${q.valid_till ? frappe.datetime.str_to_user(q.valid_till) : ''}</td>
+                                <td>${q.status || ''}</td>
+                                <td style="text-align:right;">${frappe.format(q.grand_total, { fieldtype: 'Currency' })}</td>
+                            </tr>
+                        `).join(''));
+
+                        if (quotations.length) {
+                            cursor = quotations[quotations.length - 1];
+                        }
+                        $wrapper.find('.load-more-quotations').toggle(quotations.length === page_length);
+                    }
+                });
+            }
+
+            dialog.show();
+            load_quotations(true);
         });
     },
 
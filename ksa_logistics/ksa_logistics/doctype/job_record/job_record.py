@@ -6,9 +6,59 @@ from frappe.model.document import Document
 from frappe import _
 from frappe.utils import flt
 
+from ksa_logistics.cargo import set_chargeable_weights
+
+
+# Vouchers linked through `custom_job_record` that decide whether a job can be closed or cancelled
+JOB_CLOSURE_VOUCHER_DOCTYPES = ("Sales Invoice", "Purchase Invoice", "Journal Entry", "Purchase Order", "Delivery Note")
+
 
 class JobRecord(Document):
+	def before_save(self):
+		if self.has_value_changed("job_status"):
+			self.validate_job_closure()
+
+	def validate_job_closure(self):
+		"""Closed jobs need settled vouchers, cancelled jobs need no active vouchers"""
+		if self.job_status not in ("Closed", "Cancelled"):
+			return
+
+		if self.job_status == "Cancelled" and "Job Manager" not in frappe.get_roles():
+			frappe.throw(
+				_("User {0} does not have the permission to cancel Jobs.").format(frappe.session.user),
+				title=_("Action Unauthorized")
+			)
+
+		counts = get_voucher_counts(self.name)
+
+		def vouchers_with(docstatuses):
+			return [dt for dt in JOB_CLOSURE_VOUCHER_DOCTYPES if any(counts.get((dt, d)) for d in docstatuses)]
+
+		if self.job_status == "Closed":
+			pending = vouchers_with([0])
+			if pending:
+				frappe.throw(
+					_("Pending vouchers to be Submitted/Cancelled: {0}").format(", ".join(pending)),
+					title=_("Cannot close Job")
+				)
+
+			if not vouchers_with([1, 2]):
+				frappe.throw(
+					_("There needs to be atleast one voucher against the Job to close it."),
+					title=_("Cannot close Job")
+				)
+
+		elif self.job_status == "Cancelled":
+			active = vouchers_with([0, 1])
+			if active:
+				frappe.throw(
+					_("Active vouchers found against this Job: {0}").format(", ".join(active)),
+					title=_("Cannot cancel Job")
+				)
+
 	def validate(self):
+		set_chargeable_weights(self)
+
 		total_value = 0
 		item_profit = 0
 		if not hasattr(self, 'items') or not self.items:
@@ -108,6 +158,19 @@ class JobRecord(Document):
 				self.document_status = "Delivered"
 
 
+def get_voucher_counts(job_record):
+    """Return {(doctype, docstatus): count} for all vouchers linked to the job in one query"""
+    query = " UNION ALL ".join(
+        f"""SELECT '{doctype}' AS doctype, docstatus, COUNT(*) AS count
+            FROM `tab{doctype}`
+            WHERE custom_job_record = %(job_record)s
+            GROUP BY docstatus"""
+        for doctype in JOB_CLOSURE_VOUCHER_DOCTYPES
+    )
+    rows = frappe.db.sql(query, {"job_record": job_record}, as_dict=True)
+    return {(row.doctype, row.docstatus): row.count for row in rows}
+
+
 def get_latest_purchase_rate(item_code):
     result = frappe.db.sql("""
         SELECT pi_item.rate
@@ -7,40 +7,44 @@ from frappe.model.document import Document
 from frappe import _
 from frappe.utils import now_datetime
 
+from ksa_logistics.assignment_constraints import (
+	add_assignment_constraint,
+	get_assigned_duplicate,
+	get_unassigned_duplicate,
+	is_assignment_violation,
+	validate_assignment,
+)
+from ksa_logistics.photo_upload import store_inline_images
+
 
 class ProofofDelivery(Document):
 	def validate(self):
 		"""Validate POD"""
+		store_inline_images(self)
 		self.validate_job_record()
 		self.set_defaults_from_job_assignment()
 		self.calculate_discrepancies()
 		self.validate_mandatory_fields()
 	
+	def show_unique_validation_message(self, e):
+		if is_assignment_violation(e):
+			frappe.throw(_("Proof of Delivery already exists for this Job Assignment: {0}").format(get_assigned_duplicate(self)), frappe.UniqueValidationError)
+		super().show_unique_validation_message(e)
+	
 	def validate_job_record(self):
 		"""Validate job record and check for duplicate POD per assignment"""
 		if not self.job_record:
 			frappe.throw(_("Job Record is required"))
 		
-		# Check if POD already exists for this job assignment
-		# Multiple PODs are allowed per job, but only one per job assignment
-		if self.job_assignment_name:
-			# Check if POD already exists for this specific job assignment
-			existing = frappe.db.exists("Proof of Delivery", {
-				"job_record": self.job_record,
-				"job_assignment_name": self.job_assignment_name,
-				"name": ["!=", self.name]
-			})
-			
-			if existing:
-				frappe.throw(_("Proof of Delivery already exists for this Job Assignment: {0}").format(existing))
-		else:
-			# Legacy: If no job_assignment_name, check if POD exists for job (backward compatibility)
-			existing = frappe.db.exists("Proof of Delivery", {
-				"job_record": self.job_record,
-				"job_assignment_name": ["in", ["", None]],
-				"name": ["!=", self.name]
-			})
-			
+		# Multiple PODs are allowed per job, but only one per job assignment:
+		# the job_assignment_unique constraint enforces it (see show_unique_validation_message)
+		existing = validate_assignment(self)
+		if existing:
+			frappe.throw(_("Proof of Delivery already exists for this Job Assignment: {0}").format(existing))
+		
+		if not self.job_assignment_name:
+			# Legacy: If no job_assignment_name, check if one exists for job (backward compatibility)
+			existing = get_unassigned_duplicate(self)
 			if existing:
 				frappe.msgprint(_("Warning: Proof of Delivery already exists for this job without assignment: {0}. Consider specifying a job_assignment_name for multiple PODs.").format(existing), indicator="orange")
 	
@@ -190,6 +194,11 @@ class ProofofDelivery(Document):
 			wb = frappe.get_doc("Waybill", self.waybill)
 			wb.db_set("waybill_status", "Delivered", update_modified=False)
 
+
+def on_doctype_update():
+	add_assignment_constraint("Proof of Delivery")
+
+
 @frappe.whitelist()
 def verify_pod(pod_name):
 	"""Verify POD"""
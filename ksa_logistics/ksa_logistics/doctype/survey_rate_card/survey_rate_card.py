@@ -0,0 +1,300 @@
+# Copyright (c) 2026, ramees@enfono.com and contributors
+# For license information, please see license.txt
+
+import bisect
+import re
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import cint, flt, today
+
+from ksa_logistics.job_vouchers import enqueue_debounced
+
+# Rate card service -> (Survey Report check field, Survey Report charge field its amount goes to)
+SERVICE_FIELDS = {
+	"Packing": ("packing", "packing_charges"),
+	"Crating": ("crating", "packing_charges"),
+	"Loading": ("loading", "loading_charges"),
+	"Storage": ("storage", "storage_charges"),
+	"Transportation": ("transportation", "moving_charges"),
+	"Offloading": ("offloading", "offloading_charges"),
+	"Unpacking": ("unpacking", "other_charges_if_any"),
+	"Delivery": ("delivery", "delivery_charges"),
+	"Fixing": ("fixing", "fixing_charges"),
+	"Handyman Services": ("handyman_services", "other_charges_if_any"),
+}
+CHARGE_FIELDS = sorted({charge_field for _check, charge_field in SERVICE_FIELDS.values()})
+
+# Lift facility values that make the no lift surcharge apply
+NO_LIFT = ("No", "Yes, but unable to use")
+
+RATE_TABLE_CACHE_KEY = "ksa_logistics:survey_rate_table"
+
+
+class SurveyRateCard(Document):
+	def validate(self):
+		self.validate_bands()
+
+	def on_update(self):
+		# Cleared after commit, a lookup before then would cache the old card for the day.
+		# Registered before the reprice job, which is also enqueued after commit.
+		frappe.db.after_commit.add(clear_rate_table)
+		enqueue_reprice_open_surveys()
+
+	def on_trash(self):
+		frappe.db.after_commit.add(clear_rate_table)
+		enqueue_reprice_open_surveys()
+
+	def validate_bands(self):
+		"""Volume bands of the same service and commodity must not overlap"""
+		bands = {}
+		for row in self.rates:
+			if flt(row.to_cbm) and flt(row.to_cbm) <= flt(row.from_cbm):
+				frappe.throw(_("Row {0}: To CBM must be greater than From CBM").format(row.idx))
+			bands.setdefault((row.service, row.commodity or ""), []).append(row)
+
+		for rows in bands.values():
+			rows.sort(key=lambda r: flt(r.from_cbm))
+			for previous, row in zip(rows, rows[1:]):
+				if not flt(previous.to_cbm) or flt(previous.to_cbm) > flt(row.from_cbm):
+					frappe.throw(
+						_("Row {0}: {1} band overlaps row {2}").format(row.idx, row.service, previous.idx)
+					)
+
+
+def clear_rate_table():
+	frappe.cache().delete_keys(RATE_TABLE_CACHE_KEY)
+
+
+def get_rate_table():
+	"""The compiled rate table of the card in effect today, cached until the day or the card changes"""
+	return frappe.cache().get_value(f"{RATE_TABLE_CACHE_KEY}:{today()}", generator=compile_rate_table)
+
+
+def compile_rate_table():
+	"""
+	Compile the active card into {"rate_card", "no_lift_surcharge", "bands"} where
+	bands maps "service|commodity" to the sorted band starts and their rows, so
+	a lookup is a bisect instead of a scan.
+	"""
+	card = frappe.db.sql("""
+		SELECT name, no_lift_surcharge
+		FROM `tabSurvey Rate Card`
+		WHERE enabled = 1 AND IFNULL(valid_from, '1900-01-01') <= %s
+		ORDER BY valid_from DESC, modified DESC
+		LIMIT 1
+	""", today(), as_dict=True)
+	if not card:
+		return None
+
+	rows = frappe.get_all(
+		"Survey Rate Card Item",
+		filters={"parent": card[0].name, "parenttype": "Survey Rate Card"},
+		fields=["service", "commodity", "from_cbm", "to_cbm", "item", "rate_type", "rate"],
+		order_by="from_cbm"
+	)
+
+	bands = {}
+	for row in rows:
+		key = f"{row.service}|{row.commodity or ''}"
+		band = bands.setdefault(key, {"starts": [], "rows": []})
+		band["starts"].append(flt(row.from_cbm))
+		band["rows"].append([flt(row.from_cbm), flt(row.to_cbm), row.item, row.rate_type, flt(row.rate)])
+
+	return {"rate_card": card[0].name, "no_lift_surcharge": flt(card[0].no_lift_surcharge), "bands": bands}
+
+
+def lookup_rate(table, service, commodity, volume):
+	"""Band row [from_cbm, to_cbm, item, rate_type, rate] for the volume, commodity rates before generic ones"""
+	for key in (f"{service}|{commodity or ''}", f"{service}|"):
+		band = table["bands"].get(key)
+		if not band:
+			continue
+
+		idx = bisect.bisect_right(band["starts"], volume) - 1
+		if idx < 0:
+			continue
+
+		row = band["rows"][idx]
+		if not row[1] or volume < row[1]:
+			return row
+
+
+def get_floor(floor_no):
+	"""Floor number from free text such as "3", "3rd" or "Floor 3", ground floor as 0"""
+	match = re.search(r"\d+", floor_no or "")
+	return cint(match.group()) if match else 0
+
+
+def get_survey_lines(survey, table):
+	"""Return (priced lines, services without a rate) for the services requested on the survey"""
+	volume = flt(survey.volume_cbm)
+	surcharge = 1
+	if survey.lift_facility in NO_LIFT:
+		surcharge += table["no_lift_surcharge"] / 100 * get_floor(survey.floor_no)
+
+	lines, missing = [], []
+	for service, (check_field, charge_field) in SERVICE_FIELDS.items():
+		if not survey.get(check_field):
+			continue
+
+		row = lookup_rate(table, service, survey.commodity, volume)
+		if not row or (row[3] == "Per CBM" and not volume):
+			missing.append(service)
+			continue
+
+		qty = volume if row[3] == "Per CBM" else 1
+		rate = flt(row[4] * surcharge, 2)
+		lines.append(frappe._dict(
+			service=service,
+			item=row[2],
+			qty=qty,
+			rate=rate,
+			amount=flt(qty * rate, 2),
+			charge_field=charge_field
+		))
+
+	return lines, missing
+
+
+def set_rate_card_items(quotation, lines, table):
+	"""
+	Reprice the rate card lines of the Quotation (a service description or a
+	rate card item) in place, add the new ones and drop the services no longer
+	requested. Lines added by hand are kept as they are.
+	"""
+	rate_card_items = {row[2] for band in table["bands"].values() for row in band["rows"]}
+	previous = [
+		row for row in quotation.get("items")
+		if row.description in SERVICE_FIELDS or row.item_code in rate_card_items
+	]
+
+	for line in lines:
+		row = next((r for r in previous if r.description == line.service), None)
+		row = row or next((r for r in previous if r.item_code == line.item), None)
+		if row:
+			previous.remove(row)
+		else:
+			row = quotation.append("items", {})
+
+		row.update({"item_code": line.item, "description": line.service, "qty": line.qty, "rate": line.rate})
+
+	for row in previous:
+		quotation.remove(row)
+	for idx, row in enumerate(quotation.get("items"), 1):
+		row.idx = idx
+
+
+def price_survey_report(survey_report, table=None, ignore_permissions=True):
+	"""
+	Create the draft Quotation of a Survey Report, or reprice its existing draft,
+	and write the service charges back to the survey. Returns (quotation, missing services).
+	Background repricing saves the Quotation without permission checks, users
+	pass `ignore_permissions=False`.
+	"""
+	table = table or get_rate_table()
+	if not table:
+		frappe.throw(_("There is no enabled Survey Rate Card"))
+
+	survey = frappe.get_doc("Survey Report", survey_report)
+	if not survey.customer:
+		frappe.throw(_("Customer is required to create a Quotation"))
+
+	lines, missing = get_survey_lines(survey, table)
+	if not lines:
+		frappe.throw(_("No rates found on {0} for the requested services").format(table["rate_card"]))
+
+	name = frappe.db.get_value("Quotation", {"custom_survey_report": survey.name, "docstatus": 0}, "name")
+	quotation = frappe.get_doc("Quotation", name) if name else frappe.new_doc("Quotation")
+
+	if not name:
+		quotation.quotation_to = "Customer"
+		quotation.party_name = survey.customer
+		quotation.transaction_date = today()
+		quotation.custom_survey_report = survey.name
+
+	quotation.custom_origin = survey.origin
+	quotation.custom_destination = survey.destination
+	quotation.custom_volume = survey.volume_cbm
+
+	set_rate_card_items(quotation, lines, table)
+
+	quotation.run_method("set_missing_values")
+	quotation.save(ignore_permissions=ignore_permissions)
+
+	charges = dict.fromkeys(CHARGE_FIELDS, 0)
+	for line in lines:
+		charges[line.charge_field] += line.amount
+
+	survey.db_set(
+		{**charges, "quotation_no": quotation.name, "quotation_date": quotation.transaction_date},
+		update_modified=False
+	)
+
+	return quotation, missing
+
+
+@frappe.whitelist()
+def make_quotation_from_survey(survey_report):
+	"""Price a Survey Report into a draft Quotation with the active Survey Rate Card"""
+	frappe.has_permission("Quotation", "create", throw=True)
+	frappe.has_permission("Survey Report", "write", survey_report, throw=True)
+
+	quotation, missing = price_survey_report(survey_report, ignore_permissions=False)
+	if missing:
+		frappe.msgprint(
+			_("No rate found for: {0}").format(", ".join(missing)),
+			title=_("Some services were not priced"),
+			indicator="orange"
+		)
+
+	return quotation.name
+
+
+def enqueue_reprice_open_surveys():
+	# A run already started compiled the old card, so it gets a follow-up run
+	enqueue_debounced(
+		"ksa_logistics.ksa_logistics.doctype.survey_rate_card.survey_rate_card.reprice_open_surveys",
+		"ksa_logistics:reprice_open_surveys",
+		queue="long",
+		timeout=3600,
+		enqueue_after_commit=True
+	)
+
+
+def reprice_open_surveys():
+	"""Reprice the draft Quotation of every survey that has no submitted Quotation yet"""
+	table = get_rate_table()
+	if not table:
+		return
+
+	surveys = frappe.db.sql_list("""
+		SELECT DISTINCT q.custom_survey_report
+		FROM `tabQuotation` q
+		WHERE q.docstatus = 0
+			AND IFNULL(q.custom_survey_report, '') != ''
+			AND NOT EXISTS (
+				SELECT 1 FROM `tabQuotation` submitted
+				WHERE submitted.custom_survey_report = q.custom_survey_report AND submitted.docstatus = 1
+			)
+		ORDER BY q.custom_survey_report
+	""")
+
+	repriced, failed = [], []
+	for survey in surveys:
+		frappe.db.savepoint("reprice_survey")
+		try:
+			price_survey_report(survey, table)
+			frappe.db.commit()
+			repriced.append(survey)
+		except Exception:
+			frappe.db.rollback(save_point="reprice_survey")
+			frappe.log_error(title=f"Survey repricing failed for {survey}")
+			failed.append(survey)
+
+	frappe.publish_realtime(
+		"survey_repricing",
+		{"rate_card": table["rate_card"], "repriced": repriced, "failed": failed},
+		user=frappe.session.user
+	)
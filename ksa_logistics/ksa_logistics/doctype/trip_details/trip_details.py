@@ -4,6 +4,8 @@
 import frappe
 from frappe.model.document import Document
 from ksa_logistics.api import update_driver_allowances, update_job_assignment_allowances
+from ksa_logistics.masters import get_default_company
+from ksa_logistics.photo_upload import store_inline_images
 from frappe.utils import today
 
 
@@ -26,8 +28,7 @@ def make_purchase_invoice(source_name, target_doc=None):
 		frappe.throw("Purchase Invoice can only be created for external drivers (drivers with transporter)")
 	
 	# Get company
-	company = frappe.defaults.get_user_default("company") or \
-		frappe.db.get_single_value("Global Defaults", "default_company")
+	company = get_default_company()
 	
 	if not company:
 		frappe.throw("Please set default company")
@@ -54,13 +55,15 @@ def make_purchase_invoice(source_name, target_doc=None):
 	# Call set_missing_values to populate dependent fields like credit_to, etc.
 	pi.set_missing_values()
 	
-	# Return the document (as draft, not inserted)
+	# Return the document (as draft, not inserted); once saved, api.link_transporter_trip
+	# sets custom_purchase_invoice on the trip so consolidation does not bill it again
 	return pi
 
 
 class TripDetails(Document):
 	def before_save(self):
 		"""Auto-update driver and job assignment allowances when trip is completed (only for internal drivers)"""
+		store_inline_images(self)
 		if self.status == "Trip Completed" and self.driver and self.allowance:
 			# Check if driver is internal (has employee) before updating - use db.get_value to avoid loading full doc
 			employee = frappe.db.get_value("Driver", self.driver, "employee")
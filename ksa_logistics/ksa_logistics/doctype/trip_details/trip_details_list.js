@@ -0,0 +1,67 @@
+// Copyright (c) 2025, siva and contributors
+// For license information, please see license.txt
+
+frappe.listview_settings["Trip Details"] = {
+	onload(listview) {
+		listview.page.add_inner_button(__("Consolidate Transporter Invoices"), () => {
+			frappe.prompt(
+				[
+					{
+						fieldname: "from_date",
+						label: __("From Date"),
+						fieldtype: "Date",
+						default: frappe.datetime.month_start(),
+						reqd: 1,
+					},
+					{
+						fieldname: "to_date",
+						label: __("To Date"),
+						fieldtype: "Date",
+						default: frappe.datetime.month_end(),
+						reqd: 1,
+					},
+					{
+						fieldname: "transporter",
+						label: __("Transporter"),
+						fieldtype: "Link",
+						options: "Supplier",
+						description: __("Leave empty to invoice all transporters"),
+					},
+				],
+				(values) => {
+					frappe.call({
+						method: "ksa_logistics.api.consolidate_transporter_invoices",
+						args: values,
+						callback(r) {
+							if (r.message) {
+								frappe.show_alert({
+									message: r.message.message,
+									indicator: r.message.status === "queued" ? "blue" : "orange",
+								});
+							}
+						},
+					});
+				},
+				__("Consolidate Transporter Invoices"),
+				__("Create Invoices")
+			);
+		});
+
+		frappe.realtime.off("transporter_invoices");
+		frappe.realtime.on("transporter_invoices", (data) => {
+			let message = __("{0} draft Purchase Invoices created for {1} trips.", [data.invoices.length, data.trips]);
+
+			if (data.failed.length) {
+				message += "<br><br>" + __("Failed for the following transporters (see Error Log for details):")
+					+ "<br>" + data.failed.map((d) => frappe.utils.escape_html(d)).join("<br>");
+			}
+
+			frappe.msgprint({
+				title: __("Transporter Invoices"),
+				message: message,
+				indicator: data.failed.length ? "orange" : "green",
+			});
+			listview.refresh();
+		});
+	},
+};
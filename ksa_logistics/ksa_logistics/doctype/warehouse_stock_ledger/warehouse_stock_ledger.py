@@ -0,0 +1,260 @@
+# Copyright (c) 2026, ramees@enfono.com and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import cint, flt, getdate, today
+
+from ksa_logistics.job_vouchers import MAX_PAGE_LENGTH
+
+MOVEMENT_FIELDS = ("in_qty", "out_qty", "in_volume", "out_volume")
+LEDGER_FIELDS = ("warehouse", "posting_date", "sequence", "uom", "volume_uom") + MOVEMENT_FIELDS
+
+# Rows shown in the form's stock ledger window
+DEFAULT_WINDOW = 50
+
+
+class WarehouseStockLedger(Document):
+	pass
+
+
+def on_doctype_update():
+	# Point-in-time balances seek backwards on (job, warehouse, date), the form window on (job, date)
+	frappe.db.add_index(
+		"Warehouse Stock Ledger",
+		["warehouse_job_record", "warehouse", "posting_date", "sequence"],
+		index_name="job_warehouse_date_index"
+	)
+	frappe.db.add_index(
+		"Warehouse Stock Ledger",
+		["warehouse_job_record", "posting_date", "sequence"],
+		index_name="job_date_index"
+	)
+
+
+def get_movement(doc, row):
+	"""Ledger values of a Stock Movement Detail row, normalised the way they are read back from the database"""
+	movement = frappe._dict(
+		warehouse_job_record=doc.name,
+		stock_movement_detail=row.name,
+		warehouse=row.warehouse or None,
+		posting_date=getdate(row.date or doc.date or today()),
+		sequence=cint(row.idx),
+		uom=row.uom or None,
+		volume_uom=row.volume_uom or None
+	)
+	movement.update({field: flt(row.get(field)) for field in MOVEMENT_FIELDS})
+	return movement
+
+
+def get_warehouse_condition(warehouse):
+	# Rows without a warehouse keep NULL so the lookup can still use the index
+	return "warehouse = %(warehouse)s" if warehouse else "warehouse IS NULL"
+
+
+def get_last_entry(warehouse_job_record, warehouse, date=None, before=None):
+	"""
+	Latest ledger entry of (job, warehouse) on or before `date`, or strictly
+	before the (posting_date, sequence) key `before`. One backwards index seek.
+	"""
+	values = {"job": warehouse_job_record, "warehouse": warehouse}
+	conditions = ["warehouse_job_record = %(job)s", get_warehouse_condition(warehouse)]
+
+	if before:
+		values.update({"date": before[0], "sequence": before[1]})
+		conditions.append("(posting_date < %(date)s OR (posting_date = %(date)s AND sequence < %(sequence)s))")
+	elif date:
+		values["date"] = getdate(date)
+		conditions.append("posting_date <= %(date)s")
+
+	entries = frappe.db.sql(f"""
+		SELECT name, posting_date, sequence, balance_qty, balance_volume
+		FROM `tabWarehouse Stock Ledger`
+		WHERE {" AND ".join(conditions)}
+		ORDER BY posting_date DESC, sequence DESC
+		LIMIT 1
+	""", values, as_dict=True)
+
+	return entries[0] if entries else None
+
+
+def repost_stock_ledger(warehouse_job_record, warehouse, from_date, from_sequence):
+	"""
+	Recompute the running balance of (job, warehouse) from the movement at
+	(from_date, from_sequence) onwards. Returns {stock_movement_detail: balance_volume}.
+	"""
+	previous = get_last_entry(warehouse_job_record, warehouse, before=(from_date, from_sequence))
+	balance_qty = flt(previous.balance_qty) if previous else 0
+	balance_volume = flt(previous.balance_volume) if previous else 0
+
+	entries = frappe.db.sql(f"""
+		SELECT name, stock_movement_detail, in_qty, out_qty, in_volume, out_volume, balance_qty, balance_volume
+		FROM `tabWarehouse Stock Ledger`
+		WHERE warehouse_job_record = %(job)s
+			AND {get_warehouse_condition(warehouse)}
+			AND (posting_date > %(date)s OR (posting_date = %(date)s AND sequence >= %(sequence)s))
+		ORDER BY posting_date, sequence
+	""", {"job": warehouse_job_record, "warehouse": warehouse, "date": from_date, "sequence": from_sequence}, as_dict=True)
+
+	updates, balances = {}, {}
+	for entry in entries:
+		balance_qty += flt(entry.in_qty) - flt(entry.out_qty)
+		balance_volume += flt(entry.in_volume) - flt(entry.out_volume)
+
+		if flt(entry.balance_qty) != flt(balance_qty) or flt(entry.balance_volume) != flt(balance_volume):
+			updates[entry.name] = {"balance_qty": balance_qty, "balance_volume": balance_volume}
+		balances[entry.stock_movement_detail] = balance_volume
+
+	if updates:
+		frappe.db.bulk_update("Warehouse Stock Ledger", updates, update_modified=False)
+
+	return balances
+
+
+def sync_stock_ledger(doc, method=None):
+	"""
+	Warehouse Job Record on_update: bring the ledger in line with the movement table.
+
+	Rows appended after the last movement of their warehouse are posted from the
+	previous balance without touching older entries. Back-dated, edited, moved or
+	removed rows repost their warehouse from the earliest affected movement.
+	The resulting balances are written back to the rows' `balance` field.
+	"""
+	existing = {
+		entry.stock_movement_detail: entry
+		for entry in frappe.get_all(
+			"Warehouse Stock Ledger",
+			filters={"warehouse_job_record": doc.name},
+			fields=["name", "stock_movement_detail", *LEDGER_FIELDS]
+		)
+	}
+
+	# warehouse -> earliest (posting_date, sequence) to repost from
+	reposts = {}
+
+	def mark(warehouse, posting_date, sequence):
+		key = (getdate(posting_date), cint(sequence))
+		if warehouse not in reposts or key < reposts[warehouse]:
+			reposts[warehouse] = key
+
+	# Inserting or removing a row renumbers every row after it, so changed
+	# entries are written in one bulk update instead of one query each
+	appended, changed = [], {}
+	for row in doc.get("table_jjim") or []:
+		movement = get_movement(doc, row)
+		entry = existing.pop(row.name, None)
+
+		if not entry:
+			appended.append(movement)
+		elif any(entry.get(field) != movement.get(field) for field in LEDGER_FIELDS):
+			changed[entry.name] = {field: movement[field] for field in LEDGER_FIELDS}
+			mark(entry.warehouse, entry.posting_date, entry.sequence)
+			mark(movement.warehouse, movement.posting_date, movement.sequence)
+
+	if changed:
+		frappe.db.bulk_update("Warehouse Stock Ledger", changed, update_modified=False)
+
+	if existing:
+		frappe.db.delete("Warehouse Stock Ledger", {"name": ["in", [entry.name for entry in existing.values()]]})
+	for entry in existing.values():
+		mark(entry.warehouse, entry.posting_date, entry.sequence)
+
+	balances = {}
+	for movement in sorted(appended, key=lambda m: (m.posting_date, m.sequence)):
+		last = None if movement.warehouse in reposts else get_last_entry(doc.name, movement.warehouse)
+
+		if movement.warehouse in reposts or (last and (last.posting_date, last.sequence) > (movement.posting_date, movement.sequence)):
+			# Back-dated, the repost below sets the balance
+			mark(movement.warehouse, movement.posting_date, movement.sequence)
+		else:
+			movement.balance_qty = flt(last.balance_qty if last else 0) + movement.in_qty - movement.out_qty
+			movement.balance_volume = flt(last.balance_volume if last else 0) + movement.in_volume - movement.out_volume
+			balances[movement.stock_movement_detail] = movement.balance_volume
+
+		frappe.get_doc(dict(movement, doctype="Warehouse Stock Ledger")).insert(ignore_permissions=True)
+
+	for warehouse, (posting_date, sequence) in reposts.items():
+		balances.update(repost_stock_ledger(doc.name, warehouse, posting_date, sequence))
+
+	updates = {}
+	for row in doc.get("table_jjim") or []:
+		if row.name in balances and flt(row.balance) != flt(balances[row.name]):
+			row.balance = balances[row.name]
+			updates[row.name] = {"balance": row.balance}
+
+	if updates:
+		frappe.db.bulk_update("Stock Movement Detail", updates, update_modified=False)
+
+
+def delete_stock_ledger(doc, method=None):
+	"""Warehouse Job Record on_trash"""
+	frappe.db.delete("Warehouse Stock Ledger", {"warehouse_job_record": doc.name})
+
+
+def rebuild_stock_ledger(warehouse_job_record=None):
+	"""Rebuild the ledger of one or all Warehouse Job Records from their movement tables"""
+	jobs = [warehouse_job_record] if warehouse_job_record else frappe.get_all("Warehouse Job Record", pluck="name")
+
+	for job in jobs:
+		delete_stock_ledger(frappe._dict(name=job))
+		sync_stock_ledger(frappe.get_doc("Warehouse Job Record", job))
+
+
+@frappe.whitelist()
+def get_stock_balance(warehouse_job_record, warehouse=None, date=None):
+	"""
+	Balance of a Warehouse Job Record at the end of `date` (today when empty):
+		{"warehouses": {warehouse: {"balance_qty", "balance_volume"}}, "balance_qty", "balance_volume"}
+	"""
+	frappe.has_permission("Warehouse Job Record", "read", doc=warehouse_job_record, throw=True)
+
+	warehouses = [warehouse] if warehouse else frappe.db.sql_list("""
+		SELECT DISTINCT warehouse
+		FROM `tabWarehouse Stock Ledger`
+		WHERE warehouse_job_record = %s
+	""", warehouse_job_record)
+
+	out = frappe._dict(warehouses={}, balance_qty=0, balance_volume=0)
+	for wh in warehouses:
+		last = get_last_entry(warehouse_job_record, wh, date=date or today())
+		if not last:
+			continue
+
+		out.warehouses[wh or ""] = {"balance_qty": last.balance_qty, "balance_volume": last.balance_volume}
+		out.balance_qty += flt(last.balance_qty)
+		out.balance_volume += flt(last.balance_volume)
+
+	return out
+
+
+@frappe.whitelist()
+def get_stock_ledger(warehouse_job_record, warehouse=None, before_date=None, before_sequence=None, page_length=None):
+	"""
+	Newest-first window of ledger entries. Pass the `posting_date` / `sequence`
+	of the last row returned as `before_date` / `before_sequence` for older ones.
+	"""
+	frappe.has_permission("Warehouse Job Record", "read", doc=warehouse_job_record, throw=True)
+
+	values = {
+		"job": warehouse_job_record,
+		"warehouse": warehouse,
+		"date": before_date,
+		"sequence": cint(before_sequence)
+	}
+	conditions = ["warehouse_job_record = %(job)s"]
+
+	if warehouse:
+		conditions.append("warehouse = %(warehouse)s")
+	if before_date:
+		conditions.append("(posting_date < %(date)s OR (posting_date = %(date)s AND sequence < %(sequence)s))")
+
+	page_length = min(cint(page_length) or DEFAULT_WINDOW, MAX_PAGE_LENGTH)
+
+	return frappe.db.sql(f"""
+		SELECT posting_date, sequence, warehouse, stock_movement_detail, uom, volume_uom,
+			in_qty, out_qty, balance_qty, in_volume, out_volume, balance_volume
+		FROM `tabWarehouse Stock Ledger`
+		WHERE {" AND ".join(conditions)}
+		ORDER BY posting_date DESC, sequence DESC
+		LIMIT {page_length}
+	""", values, as_dict=True)
@@ -7,6 +7,14 @@ from frappe.model.document import Document
 from frappe import _
 from frappe.utils import now_datetime, today
 
+from ksa_logistics.assignment_constraints import (
+	add_assignment_constraint,
+	get_assigned_duplicate,
+	get_unassigned_duplicate,
+	is_assignment_violation,
+	validate_assignment,
+)
+
 
 class Waybill(Document):
 	def autoname(self):
@@ -75,6 +83,11 @@ class Waybill(Document):
 			if not self.vessel_name:
 				frappe.throw(_("Vessel name is required for Sea transport"))
 	
+	def show_unique_validation_message(self, e):
+		if is_assignment_violation(e):
+			frappe.throw(_("Waybill already exists for this Job Assignment: {0}").format(get_assigned_duplicate(self)), frappe.UniqueValidationError)
+		super().show_unique_validation_message(e)
+	
 	def validate_job_record(self):
 		"""Validate job record and check for duplicate waybill per assignment"""
 		if not self.job_record:
@@ -83,26 +96,15 @@ class Waybill(Document):
 				return
 			frappe.throw(_("Job Record is required"))
 		
-		# Check if waybill already exists for this job assignment
-		# Multiple waybills are allowed per job, but only one per job assignment
-		if self.job_assignment_name:
-			# Check if waybill already exists for this specific job assignment
-			existing = frappe.db.exists("Waybill", {
-				"job_record": self.job_record,
-				"job_assignment_name": self.job_assignment_name,
-				"name": ["!=", self.name]
-			})
-			
-			if existing:
-				frappe.throw(_("Waybill already exists for this Job Assignment: {0}").format(existing))
-		else:
-			# Legacy: If no job_assignment_name, check if waybill exists for job (backward compatibility)
-			existing = frappe.db.exists("Waybill", {
-				"job_record": self.job_record,
-				"job_assignment_name": ["in", ["", None]],
-				"name": ["!=", self.name]
-			})
-			
+		# Multiple waybills are allowed per job, but only one per job assignment:
+		# the job_assignment_unique constraint enforces it (see show_unique_validation_message)
+		existing = validate_assignment(self)
+		if existing:
+			frappe.throw(_("Waybill already exists for this Job Assignment: {0}").format(existing))
+		
+		if not self.job_assignment_name:
+			# Legacy: If no job_assignment_name, check if one exists for job (backward compatibility)
+			existing = get_unassigned_duplicate(self)
 			if existing:
 				frappe.msgprint(_("Warning: Waybill already exists for this job without assignment: {0}. Consider specifying a job_assignment_name for multiple waybills.").format(existing), indicator="orange")
 	
@@ -352,6 +354,11 @@ class Waybill(Document):
 			
 			job.db_set(update_data, update_modified=False)
 
+
+def on_doctype_update():
+	add_assignment_constraint("Waybill")
+
+
 @frappe.whitelist()
 def update_waybill_status(waybill_name, status, location=None, remarks=None):
 	"""Update waybill status - can be called from mobile"""
@@ -0,0 +1,13 @@
+// Copyright (c) 2026, KSA Logistics and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Duplicate Job Assignments"] = {
+    "filters": [
+        {
+            "fieldname": "document_type",
+            "label": __("Document Type"),
+            "fieldtype": "Select",
+            "options": ["", "Collection Note", "Waybill", "Delivery Note Record", "Proof of Delivery"]
+        }
+    ]
+};
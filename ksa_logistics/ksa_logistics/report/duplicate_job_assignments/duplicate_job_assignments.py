@@ -0,0 +1,76 @@
+# Copyright (c) 2026, KSA Logistics and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+
+from ksa_logistics.assignment_constraints import ASSIGNMENT_DOCTYPES, get_duplicate_assignments
+
+
+def execute(filters=None):
+    filters = frappe._dict(filters or {})
+    return get_columns(), get_data(filters)
+
+
+def get_columns():
+    return [
+        {
+            "fieldname": "document_type",
+            "label": _("Document Type"),
+            "fieldtype": "Data",
+            "width": 170
+        },
+        {
+            "fieldname": "job_record",
+            "label": _("Job Record"),
+            "fieldtype": "Link",
+            "options": "Job Record",
+            "width": 160
+        },
+        {
+            "fieldname": "job_assignment_name",
+            "label": _("Job Assignment"),
+            "fieldtype": "Data",
+            "width": 140
+        },
+        {
+            "fieldname": "documents",
+            "label": _("Documents"),
+            "fieldtype": "Int",
+            "width": 100
+        },
+        {
+            "fieldname": "oldest",
+            "label": _("Oldest"),
+            "fieldtype": "Dynamic Link",
+            "options": "document_type",
+            "width": 160
+        },
+        {
+            "fieldname": "duplicates",
+            "label": _("Duplicates"),
+            "fieldtype": "Data",
+            "width": 300
+        }
+    ]
+
+
+def get_data(filters):
+    # Each row blocks the job_assignment_unique constraint of its doctype until all but one document are removed or reassigned
+    data = []
+    for doctype in ASSIGNMENT_DOCTYPES:
+        if filters.get("document_type") and filters.document_type != doctype:
+            continue
+
+        for row in get_duplicate_assignments(doctype):
+            names = row.names.split(", ")
+            data.append({
+                "document_type": doctype,
+                "job_record": row.job_record,
+                "job_assignment_name": row.job_assignment_name,
+                "documents": row.documents,
+                "oldest": names[0],
+                "duplicates": ", ".join(names[1:])
+            })
+
+    return data
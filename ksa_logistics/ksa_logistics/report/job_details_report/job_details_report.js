@@ -0,0 +1,51 @@
+// Copyright (c) 2025, ramees@enfono.com and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Job Details Report"] = {
+    "filters": [
+        {
+            "fieldname": "from_date",
+            "label": __("From Date"),
+            "fieldtype": "Date",
+            "default": frappe.datetime.add_months(frappe.datetime.get_today(), -1),
+            "reqd": 1
+        },
+        {
+            "fieldname": "to_date",
+            "label": __("To Date"),
+            "fieldtype": "Date",
+            "default": frappe.datetime.get_today(),
+            "reqd": 1
+        },
+        {
+            "fieldname": "job_record",
+            "label": __("Job Record"),
+            "fieldtype": "Link",
+            "options": "Job Record"
+        },
+        {
+            "fieldname": "customer",
+            "label": __("Customer"),
+            "fieldtype": "Link",
+            "options": "Customer"
+        },
+        {
+            "fieldname": "branch",
+            "label": __("Branch"),
+            "fieldtype": "Link",
+            "options": "Cost Center"
+        },
+        {
+            "fieldname": "page",
+            "label": __("Page"),
+            "fieldtype": "Int",
+            "default": 1
+        },
+        {
+            "fieldname": "page_length",
+            "label": __("Jobs per Page"),
+            "fieldtype": "Int",
+            "default": 500
+        }
+    ]
+};
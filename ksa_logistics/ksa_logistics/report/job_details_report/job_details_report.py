@@ -0,0 +1,72 @@
+# Copyright (c) 2025, ramees@enfono.com and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+
+from ksa_logistics.job_vouchers import get_job_voucher_breakdown, get_page_limits
+
+
+def execute(filters=None):
+    filters = frappe._dict(filters or {})
+    columns = get_columns()
+    data = get_data(filters)
+    return columns, data
+
+
+def get_columns():
+    return [
+        {"fieldname": "job_record", "label": _("Job Record"), "fieldtype": "Link", "options": "Job Record", "width": 180},
+        {"fieldname": "invoice_type", "label": _("Invoice Type"), "fieldtype": "Data", "width": 150},
+        {"fieldname": "invoice_id", "label": _("Invoice ID"), "fieldtype": "Data", "width": 200},
+        {"fieldname": "total_amount", "label": _("Total Amount"), "fieldtype": "Currency", "width": 180},
+        {"fieldname": "sales_outstanding_amount", "label": _("Sales Outstanding"), "fieldtype": "Currency", "width": 180},
+        {"fieldname": "purchase_outstanding_amount", "label": _("Purchase Outstanding"), "fieldtype": "Currency", "width": 180},
+    ]
+
+
+def get_jobs(filters):
+    conditions = ["docstatus < 2"]
+
+    if filters.get("from_date"):
+        conditions.append("date >= %(from_date)s")
+    if filters.get("to_date"):
+        conditions.append("date <= %(to_date)s")
+    if filters.get("job_record"):
+        conditions.append("name = %(job_record)s")
+    if filters.get("customer"):
+        conditions.append("customer = %(customer)s")
+    if filters.get("branch"):
+        conditions.append("branch = %(branch)s")
+
+    limit, offset = get_page_limits(filters)
+
+    return frappe.db.sql_list(f"""
+        SELECT name
+        FROM `tabJob Record`
+        WHERE {" AND ".join(conditions)}
+        ORDER BY name
+        LIMIT {limit} OFFSET {offset}
+    """, filters)
+
+
+def get_data(filters):
+    # Filter the jobs first, vouchers are only fetched (or read from cache) for this job set
+    jobs = get_jobs(filters)
+    breakdown = get_job_voucher_breakdown(jobs)
+
+    data = []
+    for job in jobs:
+        rows = sorted(breakdown.get(job) or [], key=lambda r: (r.invoice_type, r.invoice_id))
+        for idx, row in enumerate(rows):
+            data.append({
+                # Show the job only on its first voucher row
+                "job_record": job if idx == 0 else "",
+                "invoice_type": row.invoice_type,
+                "invoice_id": row.invoice_id,
+                "total_amount": row.total_amount,
+                "sales_outstanding_amount": row.sales_outstanding_amount,
+                "purchase_outstanding_amount": row.purchase_outstanding_amount,
+            })
+
+    return data
@@ -0,0 +1,76 @@
+# Copyright (c) 2025, ramees@enfono.com and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.utils import add_months, getdate, today
+
+from ksa_logistics.job_vouchers import add_voucher_columns, get_page_limits, get_voucher_columns
+
+
+# Window used when the date filters are left empty, same as the report's JS defaults
+DEFAULT_MONTHS = 3
+
+
+def execute(filters=None):
+    filters = frappe._dict(filters or {})
+    set_default_dates(filters)
+    columns = get_columns()
+    data = get_data(filters)
+    return columns, data
+
+
+def set_default_dates(filters):
+    """Default to the last DEFAULT_MONTHS months so an empty filter never pulls every open job"""
+    filters.to_date = getdate(filters.get("to_date") or today())
+    filters.from_date = getdate(filters.get("from_date") or add_months(filters.to_date, -DEFAULT_MONTHS))
+
+    if filters.from_date > filters.to_date:
+        frappe.throw(_("From Date cannot be after To Date"))
+
+
+def get_columns():
+    return [
+        {"fieldname": "job_record", "label": _("Job Record"), "fieldtype": "Link", "options": "Job Record", "width": 180},
+        {"fieldname": "customer_name", "label": _("Customer Name"), "fieldtype": "Data", "width": 180},
+        {"fieldname": "po_no", "label": _("PO No"), "fieldtype": "Data", "width": 150},
+        {"fieldname": "blawb_no", "label": _("BL/AWB No"), "fieldtype": "Data", "width": 150},
+        {"fieldname": "branch", "label": _("Branch"), "fieldtype": "Link", "options": "Cost Center", "width": 150},
+    ] + get_voucher_columns()
+
+
+def get_conditions(filters):
+    conditions = [
+        "job.docstatus < 2",
+        "job.job_status != 'Completed'",
+    ]
+
+    if filters.get("from_date"):
+        conditions.append("job.date >= %(from_date)s")
+    if filters.get("to_date"):
+        conditions.append("job.date <= %(to_date)s")
+    if filters.get("branch"):
+        conditions.append("job.branch = %(branch)s")
+
+    return " AND ".join(conditions)
+
+
+def get_data(filters):
+    limit, offset = get_page_limits(filters)
+
+    # Page through the jobs first, voucher lists are only fetched for this page
+    data = frappe.db.sql(f"""
+        SELECT
+            job.name AS job_record,
+            cust.customer_name,
+            job.po_no,
+            COALESCE(NULLIF(job.bl_no, ''), job.awb_no) AS blawb_no,
+            job.branch
+        FROM `tabJob Record` job
+        LEFT JOIN `tabCustomer` cust ON cust.name = job.customer
+        WHERE {get_conditions(filters)}
+        ORDER BY job.date DESC, job.name DESC
+        LIMIT {limit} OFFSET {offset}
+    """, filters, as_dict=True)
+
+    return add_voucher_columns(data, "Job Record")
@@ -3,6 +3,74 @@
 
 frappe.query_reports["Job Records"] = {
 	"filters": [
+		{
+			"fieldname": "from_date",
+			"label": __("From Date"),
+			"fieldtype": "Date",
+			"default": frappe.datetime.add_days(frappe.datetime.get_today(), -30),
+			"reqd": 1
+		},
+		{
+			"fieldname": "to_date",
+			"label": __("To Date"),
+			"fieldtype": "Date",
+			"default": frappe.datetime.get_today(),
+			"reqd": 1
+		},
+		{
+			"fieldname": "columns",
+			"label": __("Columns"),
+			"fieldtype": "MultiSelectList",
+			"get_data": function() {
+				return [
+					"job_types", "branch", "current_operational_status", "job_status",
+					"customer_name", "place_of_delivery", "place_of_receipt", "eta", "etd",
+					"created_by", "sales_executive", "attentions"
+				].map(value => ({ value: value, description: "" }));
+			}
+		},
+		{
+			"fieldname": "page_length",
+			"label": __("Page Length"),
+			"fieldtype": "Int",
+			"default": 500
+		},
+		{
+			"fieldname": "count_only",
+			"label": __("Count Only"),
+			"fieldtype": "Check",
+			"default": 0
+		},
+		{
+			"fieldname": "after_date",
+			"fieldtype": "Date",
+			"hidden": 1
+		},
+		{
+			"fieldname": "after_name",
+			"fieldtype": "Data",
+			"hidden": 1
+		}
+	],
 
-	]
+	onload: function(report) {
+		report.page.add_inner_button(__("Job Records List"), function() {
+			window.location.href = "/app/job-record/view/list?date=%5B%22Timespan%22%2C%22last+30+days%22%5D";
+		});
+
+		report.page.add_inner_button(__("First Page"), function() {
+			report.set_filter_value({ after_date: "", after_name: "" });
+		});
+
+		// Keyset pagination: continue after the last row of the current page
+		report.page.add_inner_button(__("Next Page"), function() {
+			const data = report.data || [];
+			const last = data[data.length - 1];
+			if (!last || data.length < (report.get_filter_value("page_length") || 500)) {
+				frappe.show_alert({ message: __("No more records"), indicator: "orange" });
+				return;
+			}
+			report.set_filter_value({ after_date: last.date, after_name: last.name });
+		});
+	}
 };
@@ -1,52 +1,129 @@
 # Copyright (c) 2025, ramees@enfono.com and contributors
 # For license information, please see license.txt
 
+import json
+
 import frappe
 from frappe import _
+from frappe.utils import add_days, cint, getdate, today
+
+from ksa_logistics.job_vouchers import DEFAULT_PAGE_LENGTH, MAX_PAGE_LENGTH
+
+# Window used when the date filters are left empty
+DEFAULT_DAYS = 30
+
+COLUMNS = [
+    {"fieldname": "name", "label": _("ID"), "fieldtype": "Link", "options": "Job Record", "width": 180},
+    {"fieldname": "date", "label": _("Date"), "fieldtype": "Date", "width": 100},
+    {"fieldname": "job_types", "label": _("Job Type"), "fieldtype": "Link", "options": "Job Type", "width": 120},
+    {"fieldname": "branch", "label": _("Branch"), "fieldtype": "Link", "options": "Cost Center", "width": 120},
+    {"fieldname": "current_operational_status", "label": _("Current Operational Status"), "fieldtype": "Data", "width": 180},
+    {"fieldname": "job_status", "label": _("Job Status"), "fieldtype": "Data", "width": 120},
+    {"fieldname": "customer_name", "label": _("Customer Name"), "fieldtype": "Data", "width": 180},
+    {"fieldname": "place_of_delivery", "label": _("Place of Delivery"), "fieldtype": "Data", "width": 180},
+    {"fieldname": "place_of_receipt", "label": _("Place of Receipt"), "fieldtype": "Data", "width": 180},
+    {"fieldname": "eta", "label": _("ETA"), "fieldtype": "Date", "width": 120},
+    {"fieldname": "etd", "label": _("ETD"), "fieldtype": "Date", "width": 120},
+    {"fieldname": "created_by", "label": _("Created By"), "fieldtype": "Link", "options": "User", "width": 140},
+    {"fieldname": "sales_executive", "label": _("Sales Executive"), "fieldtype": "Link", "options": "Sales Person", "width": 150},
+    {"fieldname": "attentions", "label": _("Attention"), "fieldtype": "Link", "options": "Contact", "width": 150}
+]
+
+# Keyset columns, always fetched so the next page can be requested
+KEY_FIELDS = ("name", "date")
 
 
 def execute(filters=None):
-    columns = get_columns()
-    data = get_data(filters)
+    filters = frappe._dict(filters or {})
+    set_default_dates(filters)
+
+    if cint(filters.get("count_only")):
+        columns = [{"fieldname": "count", "label": _("Job Records"), "fieldtype": "Int", "width": 150}]
+        return columns, [{"count": get_count(filters)}]
+
+    columns = get_columns(filters.get("columns"))
+    data = get_data(filters, [c["fieldname"] for c in columns])
     return columns, data
 
 
-def get_columns():
-    return [
-        {"fieldname": "name", "label": _("ID"), "fieldtype": "Link", "options": "Job Record", "width": 180},
-        {"fieldname": "date", "label": _("Date"), "fieldtype": "Date", "width": 100},
-        {"fieldname": "job_type", "label": _("Job Type"), "fieldtype": "Data", "width": 120},
-        {"fieldname": "custom_branch", "label": _("Branch"), "fieldtype": "Data", "width": 120},
-        {"fieldname": "current_operational_status", "label": _("Current Operational Status"), "fieldtype": "Data", "width": 180},
-        {"fieldname": "job_status", "label": _("Job Status"), "fieldtype": "Data", "width": 120},
-        {"fieldname": "custom_customer_name", "label": _("Customer Name"), "fieldtype": "Data", "width": 180},
-        {"fieldname": "custom_place_of_delivery", "label": _("Place of Delivery"), "fieldtype": "Data", "width": 180},
-        {"fieldname": "custom_place_of_receipt", "label": _("Place of Receipt"), "fieldtype": "Data", "width": 180},
-        {"fieldname": "custom_eta", "label": _("ETA"), "fieldtype": "Datetime", "width": 150},
-        {"fieldname": "custom_etd", "label": _("ETD"), "fieldtype": "Datetime", "width": 150},
-        {"fieldname": "custom_created_by", "label": _("Created By"), "fieldtype": "Link", "options": "User", "width": 140},
-        {"fieldname": "custom_sales_executive", "label": _("Sales Executive"), "fieldtype": "Data", "width": 150},
-        {"fieldname": "custom_attentions", "label": _("Attention"), "fieldtype": "Data", "width": 150}
+def set_default_dates(filters):
+    """Default to the last DEFAULT_DAYS days so an empty filter never pulls the whole table"""
+    filters.to_date = getdate(filters.get("to_date") or today())
+    filters.from_date = getdate(filters.get("from_date") or add_days(filters.to_date, -DEFAULT_DAYS))
+
+    if filters.from_date > filters.to_date:
+        frappe.throw(_("From Date cannot be after To Date"))
+
+
+def get_columns(fields=None):
+    """Return the report columns, limited to `fields` (list or comma separated) when given"""
+    if isinstance(fields, str):
+        fields = json.loads(fields) if fields.startswith("[") else fields.split(",")
+
+    fields = {f.strip() for f in fields or [] if f and f.strip()}
+    if not fields:
+        return list(COLUMNS)
+
+    return [c for c in COLUMNS if c["fieldname"] in fields or c["fieldname"] in KEY_FIELDS]
+
+
+def get_conditions(filters):
+    conditions = [
+        "docstatus < 2",
+        "date BETWEEN %(from_date)s AND %(to_date)s",
     ]
 
+    # Keyset cursor: continue after the last (date, name) of the previous page
+    if filters.get("after_date") and filters.get("after_name"):
+        conditions.append("(date < %(after_date)s OR (date = %(after_date)s AND name < %(after_name)s))")
+
+    return " AND ".join(conditions)
+
+
+def get_count(filters):
+    return frappe.db.sql("""
+        SELECT COUNT(*)
+        FROM `tabJob Record`
+        WHERE docstatus < 2
+            AND date BETWEEN %(from_date)s AND %(to_date)s
+    """, filters)[0][0]
+
+
+def get_data(filters, fields):
+    page_length = min(cint(filters.get("page_length")) or DEFAULT_PAGE_LENGTH, MAX_PAGE_LENGTH)
+
+    # Field names come from COLUMNS only, never from the request
+    select = ", ".join(f"`{field}`" for field in fields)
+
+    return frappe.db.sql(f"""
+        SELECT {select}
+        FROM `tabJob Record`
+        WHERE {get_conditions(filters)}
+        ORDER BY date DESC, name DESC
+        LIMIT {page_length}
+    """, filters, as_dict=True)
+
+
+@frappe.whitelist()
+def get_page(filters=None, columns=None, after_date=None, after_name=None, page_length=None):
+    """
+    Return one page of Job Records with the cursor for the next one:
+        {"data": [...], "next_cursor": {"after_date": ..., "after_name": ...} or None}
+    """
+    frappe.has_permission("Job Record", "read", throw=True)
+
+    if isinstance(filters, str):
+        filters = json.loads(filters)
+
+    filters = frappe._dict(filters or {})
+    filters.update({"after_date": after_date, "after_name": after_name, "page_length": page_length})
+    set_default_dates(filters)
+
+    page_length = min(cint(page_length) or DEFAULT_PAGE_LENGTH, MAX_PAGE_LENGTH)
+    data = get_data(filters, [c["fieldname"] for c in get_columns(columns)])
+
+    next_cursor = None
+    if len(data) == page_length:
+        next_cursor = {"after_date": data[-1].date, "after_name": data[-1].name}
 
-def get_data(filters=None):
-    if not filters:
-        filters = {}
-    
-    results = frappe.get_all(
-        'Job Record',
-        fields=[
-            'name', 'date', 'job_type', 'custom_branch', 'current_operational_status',
-            'job_status', 'custom_customer_name', 'custom_place_of_delivery',
-            'custom_place_of_receipt', 'custom_eta', 'custom_etd', 'custom_created_by',
-            'custom_sales_executive', 'custom_attentions'
-        ],
-        filters={
-            "docstatus": ["<", 2], 
-            "date": ["between", [filters.get("from_date"), filters.get("to_date")]]
-        },
-        order_by="date DESC"
-    )
-    
-    return results
+    return {"data": data, "next_cursor": next_cursor}
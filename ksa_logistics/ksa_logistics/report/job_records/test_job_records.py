@@ -0,0 +1,28 @@
+# Copyright (c) 2026, ramees@enfono.com and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from ksa_logistics.ksa_logistics.report.job_records.job_records import COLUMNS, execute
+
+
+class TestJobRecords(FrappeTestCase):
+	def test_columns_exist_on_job_record(self):
+		meta = frappe.get_meta("Job Record")
+		for column in COLUMNS:
+			if column["fieldname"] != "name":
+				self.assertTrue(meta.has_field(column["fieldname"]), column["fieldname"])
+
+	def test_execute_without_filters(self):
+		columns, data = execute({})
+		self.assertEqual([c["fieldname"] for c in columns], [c["fieldname"] for c in COLUMNS])
+		self.assertIsInstance(data, list)
+
+	def test_execute_selected_columns(self):
+		columns, _data = execute({"columns": "job_types,branch"})
+		self.assertEqual([c["fieldname"] for c in columns], ["name", "date", "job_types", "branch"])
+
+	def test_count_only(self):
+		_columns, data = execute({"count_only": 1})
+		self.assertEqual(len(data), 1)
@@ -28,6 +28,12 @@ frappe.query_reports["Vehicle Driver Assignment"] = {
             "fieldtype": "Date",
             "default": frappe.datetime.get_today(),
             "reqd": 1
+        },
+        {
+            "fieldname": "group_by_day",
+            "label": __("Group by Driver, Vehicle and Day"),
+            "fieldtype": "Check",
+            "default": 0
         }
     ]
 };
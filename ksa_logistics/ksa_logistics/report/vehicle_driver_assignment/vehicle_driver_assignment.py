@@ -6,13 +6,14 @@ from frappe import _
 
 
 def execute(filters=None):
-    columns = get_columns()
+    filters = frappe._dict(filters or {})
+    columns = get_columns(filters)
     data = get_data(filters)
     return columns, data
 
 
-def get_columns():
-    return [
+def get_columns(filters):
+    columns = [
         {
             "fieldname": "driver",
             "label": _("Driver"),
@@ -38,76 +39,78 @@ def get_columns():
             "label": _("Posting Date"),
             "fieldtype": "Date",
             "width": 150
-        },
-        {
+        }
+    ]
+
+    if filters.get("group_by_day"):
+        columns.append({
+            "fieldname": "trip_count",
+            "label": _("Trips"),
+            "fieldtype": "Int",
+            "width": 100
+        })
+    else:
+        columns.append({
             "fieldname": "trip_details",
             "label": _("Trip Details"),
             "fieldtype": "Link",
             "options": "Trip Details",
             "width": 200
-        }
-    ]
+        })
 
+    return columns
+
+
+def get_conditions(filters):
+    # Only trips that have both vehicle and driver assigned
+    conditions = [
+        "trip.docstatus != 2",
+        "IFNULL(trip.vehicle, '') != ''",
+        "IFNULL(trip.driver, '') != ''",
+    ]
 
-def get_data(filters):
-    # Build Trip Details filter
-    trip_filter = {"docstatus": ["!=", 2]}
-    
-    # Vehicle filter
     if filters.get("vehicle"):
-        trip_filter["vehicle"] = filters.get("vehicle")
-    
-    # Driver filter
+        conditions.append("trip.vehicle = %(vehicle)s")
+
     if filters.get("driver"):
-        trip_filter["driver"] = filters.get("driver")
-    
-    # Date filter - using posting_date
-    from_date = filters.get("from_date")
-    to_date = filters.get("to_date")
-    
-    if from_date and to_date:
-        trip_filter["posting_date"] = ["between", [from_date, to_date]]
-    elif from_date:
-        trip_filter["posting_date"] = [">=", from_date]
-    elif to_date:
-        trip_filter["posting_date"] = ["<=", to_date]
-    
-    # Get Trip Details - only vehicles and drivers that are assigned
-    trip_details = frappe.get_all(
-        "Trip Details",
-        filters=trip_filter,
-        fields=[
-            "name",
-            "posting_date",
-            "vehicle",
-            "driver"
-        ],
-        order_by="driver, posting_date desc, vehicle"
-    )
-    
-    data = []
-    
-    for trip in trip_details:
-        # Only include trips that have both vehicle and driver assigned
-        if not trip.vehicle or not trip.driver:
-            continue
-            
-        # Get driver name
-        driver_name = ""
-        if trip.driver:
-            try:
-                driver_doc = frappe.get_cached_doc("Driver", trip.driver)
-                driver_name = driver_doc.full_name or trip.driver
-            except:
-                driver_name = trip.driver
-        
-        data.append({
-            "driver": trip.driver,
-            "driver_name": driver_name,
-            "vehicle": trip.vehicle,
-            "posting_date": trip.posting_date,
-            "trip_details": trip.name
-        })
-    
-    return data
+        conditions.append("trip.driver = %(driver)s")
+
+    if filters.get("from_date"):
+        conditions.append("trip.posting_date >= %(from_date)s")
+
+    if filters.get("to_date"):
+        conditions.append("trip.posting_date <= %(to_date)s")
+
+    return " AND ".join(conditions)
+
+
+def get_data(filters):
+    # Driver names come from a single join instead of a lookup per trip
+    if filters.get("group_by_day"):
+        # One row per driver, vehicle and day with the number of trips
+        return frappe.db.sql(f"""
+            SELECT
+                trip.driver,
+                COALESCE(NULLIF(drv.full_name, ''), trip.driver) AS driver_name,
+                trip.vehicle,
+                trip.posting_date,
+                COUNT(trip.name) AS trip_count
+            FROM `tabTrip Details` trip
+            LEFT JOIN `tabDriver` drv ON drv.name = trip.driver
+            WHERE {get_conditions(filters)}
+            GROUP BY trip.driver, drv.full_name, trip.vehicle, trip.posting_date
+            ORDER BY trip.driver, trip.posting_date DESC, trip.vehicle
+        """, filters, as_dict=True)
 
+    return frappe.db.sql(f"""
+        SELECT
+            trip.driver,
+            COALESCE(NULLIF(drv.full_name, ''), trip.driver) AS driver_name,
+            trip.vehicle,
+            trip.posting_date,
+            trip.name AS trip_details
+        FROM `tabTrip Details` trip
+        LEFT JOIN `tabDriver` drv ON drv.name = trip.driver
+        WHERE {get_conditions(filters)}
+        ORDER BY trip.driver, trip.posting_date DESC, trip.vehicle
+    """, filters, as_dict=True)
@@ -28,6 +28,12 @@ frappe.query_reports["Vehicle PL Report"] = {
             "fieldtype": "Date",
             "default": frappe.datetime.get_today(),
             "reqd": 1
+        },
+        {
+            "fieldname": "use_fleet_utilization",
+            "label": __("Use Fleet Utilization (Weekly)"),
+            "fieldtype": "Check",
+            "default": 0
         }
     ],
     "formatter": function(value, row, column, data, default_formatter) {
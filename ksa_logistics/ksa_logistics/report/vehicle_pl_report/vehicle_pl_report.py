@@ -4,6 +4,8 @@
 import frappe
 from frappe import _
 
+from ksa_logistics.ksa_logistics.doctype.fleet_utilization.fleet_utilization import get_week_start
+
 
 def execute(filters=None):
     columns = get_columns()
@@ -49,6 +51,9 @@ def get_columns():
 
 
 def get_data(filters):
+    if filters.get("use_fleet_utilization"):
+        return get_data_from_fleet_utilization(filters)
+
     # Date filters
     from_date = filters.get("from_date")
     to_date = filters.get("to_date")
@@ -239,3 +244,44 @@ def get_trip_amount_from_job_assignment(vehicle, from_date=None, to_date=None):
     
     return total_trip_amount
 
+
+def get_data_from_fleet_utilization(filters):
+    """Same figures read from the pre-aggregated Fleet Utilization cube (whole weeks only)"""
+    conditions = ["v.custom_is_external = 'Internal'"]
+    values = {}
+
+    if filters.get("vehicle"):
+        conditions.append("v.name = %(vehicle)s")
+        values["vehicle"] = filters.get("vehicle")
+    if filters.get("employee"):
+        conditions.append("v.employee = %(employee)s")
+        values["employee"] = filters.get("employee")
+    if filters.get("from_date"):
+        conditions.append("fu.week_start >= %(from_date)s")
+        values["from_date"] = get_week_start(filters.get("from_date"))
+    if filters.get("to_date"):
+        conditions.append("fu.week_start <= %(to_date)s")
+        values["to_date"] = filters.get("to_date")
+
+    data = frappe.db.sql(f"""
+        SELECT
+            v.name AS vehicle,
+            v.employee,
+            emp.employee_name,
+            SUM(fu.trip_amount) AS total_credit,
+            SUM(fu.pi_cost + fu.je_cost) AS total_debit
+        FROM `tabFleet Utilization` fu
+        INNER JOIN `tabVehicle` v ON v.name = fu.vehicle
+        LEFT JOIN `tabEmployee` emp ON emp.name = v.employee
+        WHERE {" AND ".join(conditions)}
+        GROUP BY v.name, v.employee, emp.employee_name
+        ORDER BY v.name
+    """, values, as_dict=True)
+
+    for row in data:
+        row.employee = row.employee or ""
+        row.employee_name = row.employee_name or row.employee
+        row.profit_loss = (row.total_credit or 0) - (row.total_debit or 0)
+
+    return data
+
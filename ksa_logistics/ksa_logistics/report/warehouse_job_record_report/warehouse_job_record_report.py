@@ -0,0 +1,59 @@
+# Copyright (c) 2025, ramees@enfono.com and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+
+from ksa_logistics.job_vouchers import add_voucher_columns, get_page_limits, get_voucher_columns
+
+
+def execute(filters=None):
+    filters = frappe._dict(filters or {})
+    columns = get_columns()
+    data = get_data(filters)
+    return columns, data
+
+
+def get_columns():
+    return [
+        {"fieldname": "job_record", "label": _("Job Record"), "fieldtype": "Link", "options": "Warehouse Job Record", "width": 180},
+        {"fieldname": "customer_name", "label": _("Customer Name"), "fieldtype": "Data", "width": 180},
+        {"fieldname": "date", "label": _("Date"), "fieldtype": "Date", "width": 120},
+        {"fieldname": "created_by", "label": _("Created By"), "fieldtype": "Data", "width": 150},
+    ] + get_voucher_columns()
+
+
+def get_conditions(filters):
+    conditions = [
+        "job.docstatus < 2",
+        "job.job_status NOT IN ('Closed', 'Cancelled')",
+    ]
+
+    if filters.get("from_date"):
+        conditions.append("job.date >= %(from_date)s")
+    if filters.get("to_date"):
+        conditions.append("job.date <= %(to_date)s")
+    if filters.get("branch"):
+        conditions.append("job.branch = %(branch)s")
+
+    return " AND ".join(conditions)
+
+
+def get_data(filters):
+    limit, offset = get_page_limits(filters)
+
+    # Page through the jobs first, voucher lists are only fetched for this page
+    data = frappe.db.sql(f"""
+        SELECT
+            job.name AS job_record,
+            cust.customer_name,
+            job.date,
+            job.created_by
+        FROM `tabWarehouse Job Record` job
+        LEFT JOIN `tabCustomer` cust ON cust.name = job.customer
+        WHERE {get_conditions(filters)}
+        ORDER BY job.date DESC, job.name DESC
+        LIMIT {limit} OFFSET {offset}
+    """, filters, as_dict=True)
+
+    return add_voucher_columns(data, "Warehouse Job Record")
@@ -0,0 +1,128 @@
+import frappe
+
+"""
+Master data used by the driver / transporter voucher paths (company defaults,
+expense accounts, service items and the trip allowance component).
+
+The masters are created at install / migrate time by `ensure_masters` and the
+values resolved per company are kept in the site cache, so the hot paths do not
+hit the database on every call. The cache is cleared from the Company, Account,
+Item and Salary Component doc_events.
+"""
+
+DRIVER_SERVICE_ITEM = "Driver Service"
+TRANSPORTER_SERVICE_ITEM = "Service Transportation"
+TRIP_ALLOWANCE_COMPONENT = "Trip Allowance"
+
+SERVICE_ITEMS = (DRIVER_SERVICE_ITEM, TRANSPORTER_SERVICE_ITEM)
+SERVICE_ITEM_GROUP = "Services"
+
+COMPANY_MASTERS_CACHE_KEY = "ksa_logistics:company_masters"
+DEFAULT_COMPANY_CACHE_KEY = "ksa_logistics:default_company"
+
+
+def ensure_masters():
+    """Create the service items and the trip allowance component when missing"""
+    item_group = SERVICE_ITEM_GROUP if frappe.db.exists("Item Group", SERVICE_ITEM_GROUP) else \
+        frappe.db.get_value("Item Group", {"is_group": 0}, "name")
+
+    for item_code in SERVICE_ITEMS:
+        if frappe.db.exists("Item", item_code) or not item_group:
+            continue
+
+        item = frappe.new_doc("Item")
+        item.item_code = item_code
+        item.item_name = item_code
+        item.item_group = item_group
+        item.is_stock_item = 0
+        item.is_service_item = 1
+        try:
+            item.insert(ignore_permissions=True)
+        except frappe.DuplicateEntryError:
+            # Created by another process in the meantime
+            pass
+
+    # Salary Component comes from HRMS, which may not be installed
+    if frappe.db.exists("DocType", "Salary Component") and \
+            not frappe.db.exists("Salary Component", TRIP_ALLOWANCE_COMPONENT):
+        component = frappe.new_doc("Salary Component")
+        component.salary_component = TRIP_ALLOWANCE_COMPONENT
+        component.type = "Earning"
+        component.insert(ignore_permissions=True)
+
+    clear_master_cache()
+
+
+def get_default_company():
+    """Session user's default company, falling back to Global Defaults"""
+    return frappe.defaults.get_user_default("company") or frappe.cache().get_value(
+        DEFAULT_COMPANY_CACHE_KEY,
+        generator=lambda: frappe.db.get_single_value("Global Defaults", "default_company")
+    )
+
+
+def get_company_masters(company=None):
+    """
+    Return the resolved masters for `company` (default company when empty):
+        {"company", "expense_account", "driver_service_item",
+         "transporter_service_item", "trip_allowance_component"}
+    """
+    company = company or get_default_company()
+    if not company:
+        frappe.throw("Please set default company")
+
+    return frappe._dict(
+        frappe.cache().hget(COMPANY_MASTERS_CACHE_KEY, company, generator=lambda: load_company_masters(company))
+    )
+
+
+def load_company_masters(company):
+    if not all(frappe.db.exists("Item", item_code) for item_code in SERVICE_ITEMS):
+        # A service item was deleted or renamed since the last migrate
+        ensure_masters()
+
+    expense_account = frappe.db.get_value(
+        "Company", company, "default_expense_account"
+    ) or frappe.db.get_value(
+        "Account", {"account_type": "Expense Account", "company": company, "is_group": 0}, "name"
+    )
+
+    return {
+        "company": company,
+        "expense_account": expense_account,
+        "driver_service_item": frappe.db.exists("Item", DRIVER_SERVICE_ITEM),
+        "transporter_service_item": frappe.db.exists("Item", TRANSPORTER_SERVICE_ITEM),
+        "trip_allowance_component": frappe.db.exists("DocType", "Salary Component")
+            and frappe.db.exists("Salary Component", TRIP_ALLOWANCE_COMPONENT),
+    }
+
+
+def get_expense_account(company=None):
+    expense_account = get_company_masters(company).expense_account
+    if not expense_account:
+        frappe.throw("Please set default expense account for company")
+    return expense_account
+
+
+def get_trip_allowance_component(company=None):
+    component = get_company_masters(company).trip_allowance_component
+    if not component:
+        frappe.throw(f"Salary Component {TRIP_ALLOWANCE_COMPONENT} is missing, please run bench migrate")
+    return component
+
+
+def clear_master_cache(doc=None, method=None, *args):
+    """
+    doc_events for Company, Account, Item, Salary Component and Global Defaults.
+    Account changes only drop their own company, everything else drops all companies.
+    `args` holds (old, new, merge) on after_rename.
+    """
+    if doc and doc.doctype == "Account":
+        if doc.company:
+            frappe.cache().hdel(COMPANY_MASTERS_CACHE_KEY, doc.company)
+        return
+
+    if doc and doc.doctype == "Item" and not {doc.name, *args[:2]} & set(SERVICE_ITEMS):
+        return
+
+    frappe.cache().delete_value([COMPANY_MASTERS_CACHE_KEY, DEFAULT_COMPANY_CACHE_KEY])
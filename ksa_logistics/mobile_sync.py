@@ -0,0 +1,296 @@
+import json
+from datetime import timedelta
+
+import frappe
+from frappe import _
+from frappe.utils import get_datetime, now
+
+"""
+Offline sync for the driver app.
+
+The app creates and edits Collection Notes, Waybills, Delivery Note Records and
+Proofs of Delivery while offline, under ids it generates itself (`client_id`).
+`sync` takes the queued changes in one request, applies them in workflow order
+so a Delivery Note can link to a Waybill created in the same batch, and returns
+what changed on the server since the device's last sync token.
+
+Every change on an existing document carries the server version (`modified`)
+it was based on. When the server copy moved on in the meantime the change is
+not applied but returned as a conflict with the server copy, for the app to
+merge and send again.
+"""
+
+# Doctypes in the order their changes are applied
+SYNC_DOCTYPES = ("Collection Note", "Waybill", "Delivery Note Record", "Proof of Delivery")
+
+# Link fields that may hold the client id of a document synced in the same batch
+SYNC_LINKS = {
+    "Delivery Note Record": {"waybill": "Waybill"},
+    "Proof of Delivery": {"delivery_note": "Delivery Note Record", "waybill": "Waybill"},
+}
+
+# Fields returned in the delta besides name, client_id and modified
+DELTA_FIELDS = {
+    "Collection Note": ["job_record", "job_assignment_name", "collection_status", "collection_date"],
+    "Waybill": ["job_record", "job_assignment_name", "waybill_number", "waybill_status", "current_location"],
+    "Delivery Note Record": ["job_record", "job_assignment_name", "waybill", "delivery_status", "pod_reference"],
+    "Proof of Delivery": ["job_record", "job_assignment_name", "delivery_note", "waybill", "pod_status"],
+}
+
+# Fields the app cannot set
+PROTECTED_FIELDS = ("name", "doctype", "owner", "creation", "modified", "modified_by", "docstatus", "client_id")
+
+MAX_SYNC_CHANGES = 200
+DELTA_PAGE_LENGTH = 500
+
+# A caught up cursor steps back this far behind the last row sent, so documents
+# of transactions still open during the query (an older `modified`, committed
+# later) are picked up by the next sync. Rows in the margin are sent again.
+SYNC_SAFETY_MARGIN = timedelta(minutes=5)
+
+
+class SyncConflict(Exception):
+    pass
+
+
+def load_client_ids(changes):
+    """{(doctype, client_id): name} for the client ids of the changes and of their batch links"""
+    client_ids = {doctype: set() for doctype in SYNC_DOCTYPES}
+    for change in changes:
+        client_ids[change["doctype"]].add(change["client_id"])
+        for fieldname, link_doctype in SYNC_LINKS.get(change["doctype"], {}).items():
+            if change["data"].get(fieldname):
+                client_ids[link_doctype].add(change["data"][fieldname])
+
+    names = {}
+    for doctype, ids in client_ids.items():
+        if not ids:
+            continue
+        for d in frappe.get_all(doctype, filters={"client_id": ["in", list(ids)]}, fields=["name", "client_id"]):
+            names[(doctype, d.client_id)] = d.name
+    return names
+
+
+def apply_change(change, names, unsynced):
+    """Create or update the document of a change, return the saved document"""
+    doctype, client_id = change["doctype"], change["client_id"]
+    data = {k: v for k, v in change["data"].items() if k not in PROTECTED_FIELDS}
+
+    for fieldname, link_doctype in SYNC_LINKS.get(doctype, {}).items():
+        value = data.get(fieldname)
+        if (link_doctype, value) in unsynced:
+            frappe.throw(_("{0} {1} it links to was not synced").format(_(link_doctype), value))
+        if (link_doctype, value) in names:
+            data[fieldname] = names[(link_doctype, value)]
+
+    name = names.get((doctype, client_id))
+    if not name:
+        doc = frappe.get_doc({"doctype": doctype, **data})
+        doc.client_id = client_id
+        doc.insert()
+        return doc
+
+    doc = frappe.get_doc(doctype, name)
+    # Client ids are resolved without permissions, nothing about the document is revealed before this
+    if not doc.has_permission("write"):
+        frappe.throw(_("Not permitted to edit {0} {1}").format(_(doctype), name), frappe.PermissionError)
+
+    base_version = change.get("base_version")
+    if not base_version or get_datetime(base_version) != get_datetime(doc.modified):
+        raise SyncConflict(doc)
+
+    doc.update(data)
+    doc.save()
+    return doc
+
+
+def parse_sync_token(since):
+    """
+    {doctype: (modified, name)} cursors of a sync token, the "Deleted Document"
+    entry a (creation, name) cursor over deletions. A plain timestamp (older
+    app versions) resumes every doctype from that moment.
+    """
+    if not since:
+        return {}
+
+    try:
+        token = json.loads(since)
+    except ValueError:
+        token = None
+
+    if not isinstance(token, dict):
+        return {doctype: (get_datetime(since), "") for doctype in (*SYNC_DOCTYPES, "Deleted Document")}
+
+    return {doctype: (get_datetime(cursor[0]), cursor[1]) for doctype, cursor in token.items()}
+
+
+def get_keyset_filters(cursor, field):
+    """Filters for (field, name) > cursor"""
+    if not cursor:
+        return [], []
+
+    value, name = cursor
+    return [[field, ">=", value]], [[field, ">", value], ["name", ">", name]]
+
+
+def get_next_cursor(rows, field, previous):
+    """
+    Cursor after `rows`: the last row of a full page, otherwise the last row
+    less SYNC_SAFETY_MARGIN, never behind the cursor the page started from.
+    """
+    if not rows:
+        return previous
+
+    last = (get_datetime(rows[-1][field]), rows[-1].name)
+    if len(rows) == DELTA_PAGE_LENGTH:
+        return last
+
+    cursor = (last[0] - SYNC_SAFETY_MARGIN, "")
+    return max(cursor, previous) if previous else cursor
+
+
+def can_read_deleted(row):
+    """Whether the user could read the document before it was deleted"""
+    try:
+        doc = frappe.get_doc(frappe.parse_json(row.data))
+    except Exception:
+        return False
+    return doc.has_permission("read")
+
+
+def get_deleted(cursor):
+    """
+    One page of deletions of the sync doctypes after `cursor`, limited to
+    documents the user could read. Returns (deleted, next cursor, has_more).
+    """
+    doctypes = [doctype for doctype in SYNC_DOCTYPES if frappe.has_permission(doctype, "read")]
+    if not doctypes:
+        return [], cursor, False
+
+    filters, or_filters = get_keyset_filters(cursor, "creation")
+    rows = frappe.get_all(
+        "Deleted Document",
+        filters=[["deleted_doctype", "in", doctypes], *filters],
+        or_filters=or_filters,
+        fields=["name", "creation", "deleted_doctype", "deleted_name", "data"],
+        order_by="creation asc, name asc",
+        limit_page_length=DELTA_PAGE_LENGTH
+    )
+
+    deleted = [
+        {"doctype": row.deleted_doctype, "name": row.deleted_name}
+        for row in rows
+        if can_read_deleted(row)
+    ]
+    return deleted, get_next_cursor(rows, "creation", cursor), len(rows) == DELTA_PAGE_LENGTH
+
+
+def get_delta(since=None):
+    """
+    Documents the user can read that changed after the cursors of the `since`
+    token, oldest first, with the token to send next time. Each doctype is
+    paged on (modified, name), so documents sharing a `modified` across a page
+    boundary are not skipped. Returns (delta, deleted, sync_token, has_more).
+    """
+    cursors = parse_sync_token(since)
+
+    delta, token, has_more = {}, {}, False
+    for doctype in SYNC_DOCTYPES:
+        filters, or_filters = get_keyset_filters(cursors.get(doctype), "modified")
+        rows = frappe.get_list(
+            doctype,
+            filters=filters,
+            or_filters=or_filters,
+            fields=["name", "client_id", "modified", *DELTA_FIELDS[doctype]],
+            order_by="modified asc, name asc",
+            limit_page_length=DELTA_PAGE_LENGTH
+        )
+        delta[doctype] = rows
+        has_more = has_more or len(rows) == DELTA_PAGE_LENGTH
+
+        cursor = get_next_cursor(rows, "modified", cursors.get(doctype))
+        if cursor:
+            token[doctype] = cursor
+
+    deleted = []
+    if "Deleted Document" in cursors:
+        deleted, cursor, more_deleted = get_deleted(cursors["Deleted Document"])
+        has_more = has_more or more_deleted
+    else:
+        # First sync: the documents are sent whole, only later deletions matter
+        cursor = (get_datetime(now()) - SYNC_SAFETY_MARGIN, "")
+    token["Deleted Document"] = cursor
+
+    sync_token = json.dumps({doctype: [str(cursor[0]), cursor[1]] for doctype, cursor in token.items()})
+    return delta, deleted, sync_token, has_more
+
+
+@frappe.whitelist(methods=["POST"])
+def sync(changes=None, since=None):
+    """
+    Apply the offline changes of the driver app and return the server changes.
+
+    `changes` is a list of {"doctype", "client_id", "base_version", "data"},
+    `base_version` being the `modified` of the server copy the change was made
+    on (empty for new documents). `since` is the sync token of the last sync,
+    opaque to the app.
+    """
+    changes = frappe.parse_json(changes) or []
+    if len(changes) > MAX_SYNC_CHANGES:
+        frappe.throw(_("At most {0} changes can be synced at once").format(MAX_SYNC_CHANGES))
+
+    for change in changes:
+        if change.get("doctype") not in SYNC_DOCTYPES or not change.get("client_id"):
+            frappe.throw(_("Every change needs a client_id and one of: {0}").format(", ".join(SYNC_DOCTYPES)))
+        change["data"] = change.get("data") or {}
+
+    # Workflow order, keeping the device order within a doctype
+    changes.sort(key=lambda c: SYNC_DOCTYPES.index(c["doctype"]))
+
+    names = load_client_ids(changes)
+    applied, conflicts, errors, unsynced = [], [], [], set()
+
+    for change in changes:
+        key = (change["doctype"], change["client_id"])
+        frappe.db.savepoint("mobile_sync")
+        try:
+            doc = apply_change(change, names, unsynced)
+            frappe.db.commit()
+        except SyncConflict as e:
+            frappe.db.rollback(save_point="mobile_sync")
+            server = e.args[0]
+            unsynced.add(key)
+            conflicts.append({
+                "doctype": server.doctype,
+                "client_id": change["client_id"],
+                "name": server.name,
+                "server_version": str(server.modified),
+                "server": server.as_dict(convert_dates_to_str=True) if server.has_permission("read") else None,
+            })
+            continue
+        except Exception as e:
+            frappe.db.rollback(save_point="mobile_sync")
+            unsynced.add(key)
+            errors.append({"doctype": change["doctype"], "client_id": change["client_id"], "error": str(e)})
+            if not isinstance(e, (frappe.ValidationError, frappe.PermissionError)):
+                frappe.log_error(title=f"Mobile sync failed for {change['doctype']} {change['client_id']}")
+            continue
+
+        names[key] = doc.name
+        applied.append({
+            "doctype": doc.doctype,
+            "client_id": change["client_id"],
+            "name": doc.name,
+            "version": str(doc.modified),
+        })
+
+    delta, deleted, sync_token, has_more = get_delta(since)
+    return {
+        "applied": applied,
+        "conflicts": conflicts,
+        "errors": errors,
+        "delta": delta,
+        "deleted": deleted,
+        "sync_token": sync_token,
+        "has_more": has_more,
+    }
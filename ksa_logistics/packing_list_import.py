@@ -0,0 +1,277 @@
+import csv
+import os
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, now
+from frappe.utils.background_jobs import is_job_enqueued
+
+from ksa_logistics.cargo import AREA_PRECISION, VOLUME_PRECISION, WEIGHT_PRECISION, measure_rows
+
+"""
+Bulk import of Packing List Item rows from a CSV or XLSX file.
+
+The file is read row by row, the Item / Area / UOM values are resolved against
+the masters once per batch, volume and area are computed for the whole batch
+and the valid rows are written with one multi-row insert. Invalid rows are
+reported with their line number and skipped, the rest of the file still loads.
+"""
+
+IMPORT_BATCH_SIZE = 500
+
+# Report at most this many row errors back to the browser
+MAX_REPORTED_ERRORS = 500
+
+IMPORT_FIELDS = (
+    "item", "area", "description", "quantity", "uom",
+    "weight_kg", "length_cm", "width_cm", "height_cm", "volume_cbm", "volume_sqrmtr",
+)
+FLOAT_FIELDS = ("quantity", "weight_kg", "length_cm", "width_cm", "height_cm", "volume_cbm", "volume_sqrmtr")
+
+# Master each link column is checked against, with the extra field it may be matched on
+MASTER_LOOKUPS = {
+    "item": ("Item", "item_name"),
+    "area": ("Area", None),
+    "uom": ("UOM", None),
+}
+
+
+def get_header_map(header):
+    """Column index -> Packing List Item fieldname, matching fieldnames or labels case-insensitively"""
+    meta = frappe.get_meta("Packing List Item")
+    aliases = {}
+    for fieldname in IMPORT_FIELDS:
+        aliases[fieldname] = fieldname
+        label = meta.get_label(fieldname)
+        if label:
+            aliases[label.strip().lower()] = fieldname
+
+    return {
+        idx: aliases[str(title).strip().lower()]
+        for idx, title in enumerate(header)
+        if title is not None and str(title).strip().lower() in aliases
+    }
+
+
+def iter_file_rows(file_url):
+    """Yield the rows of an attached CSV or XLSX file as lists, header first, without loading it all"""
+    path = frappe.get_doc("File", {"file_url": file_url}).get_full_path()
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.reader(f)
+
+    elif extension == ".xlsx":
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            workbook.close()
+
+    else:
+        frappe.throw(_("Only CSV and XLSX files can be imported"))
+
+
+class MasterLookup:
+    """Resolve link values to master names, querying only values not seen before"""
+
+    def __init__(self):
+        self.resolved = {fieldname: {} for fieldname in MASTER_LOOKUPS}
+
+    def load(self, fieldname, values):
+        doctype, alt_field = MASTER_LOOKUPS[fieldname]
+        cache = self.resolved[fieldname]
+        missing = list({v for v in values if v and v.lower() not in cache})
+        if not missing:
+            return
+
+        for value in missing:
+            cache[value.lower()] = None
+
+        fields = ["name", alt_field] if alt_field else ["name"]
+        for d in frappe.get_all(doctype, filters={"name": ["in", missing]}, fields=fields):
+            cache[d.name.lower()] = d.name
+
+        if alt_field:
+            unresolved = [v for v in missing if not cache[v.lower()]]
+            if unresolved:
+                for d in frappe.get_all(doctype, filters={alt_field: ["in", unresolved]}, fields=fields):
+                    cache[d.get(alt_field).lower()] = d.name
+
+    def get(self, fieldname, value):
+        return self.resolved[fieldname].get(value.lower())
+
+
+def parse_row(values, header_map):
+    row = frappe._dict()
+    for idx, fieldname in header_map.items():
+        value = values[idx] if idx < len(values) else None
+        row[fieldname] = value.strip() if isinstance(value, str) else value
+    return row
+
+
+def validate_batch(batch, lookup):
+    """Resolve links and numbers in place, return [(line, [errors])] for rows that failed"""
+    for fieldname in MASTER_LOOKUPS:
+        lookup.load(fieldname, [str(row[fieldname]) for _line, row in batch if row.get(fieldname)])
+
+    errors = []
+    for line, row in batch:
+        row_errors = []
+
+        for fieldname, (doctype, _alt_field) in MASTER_LOOKUPS.items():
+            value = row.get(fieldname)
+            if not value:
+                continue
+            row[fieldname] = lookup.get(fieldname, str(value))
+            if not row[fieldname]:
+                row_errors.append(_("{0} {1} not found").format(_(doctype), value))
+
+        for fieldname in FLOAT_FIELDS:
+            value = row.get(fieldname)
+            if value in (None, ""):
+                row[fieldname] = 0
+                continue
+            try:
+                row[fieldname] = float(value)
+            except (TypeError, ValueError):
+                row_errors.append(_("{0} must be a number, got {1}").format(fieldname, value))
+
+        if not (row.get("item") or row.get("description")):
+            row_errors.append(_("Item or Description is required"))
+
+        if row_errors:
+            errors.append((line, row_errors))
+
+    return errors
+
+
+def insert_batch(packing_list, rows, start_idx):
+    """Insert the validated rows as Packing List Item children in one statement"""
+    measure_rows(rows, cbm_field="volume_cbm", sqm_field="volume_sqrmtr")
+
+    timestamp = now()
+    fields = ["name", "parent", "parenttype", "parentfield", "idx", "owner", "modified_by", "creation", "modified",
+        *IMPORT_FIELDS]
+    values = [
+        [frappe.generate_hash(length=10), packing_list, "Packing List", "item", start_idx + i,
+            frappe.session.user, frappe.session.user, timestamp, timestamp,
+            *[row.get(fieldname) for fieldname in IMPORT_FIELDS]]
+        for i, row in enumerate(rows, 1)
+    ]
+
+    frappe.db.bulk_insert("Packing List Item", fields, values)
+
+
+def update_packing_list_totals(packing_list):
+    """Same totals as ksa_logistics.cargo.set_packing_list_totals, summed in the database"""
+    totals = frappe.db.sql("""
+        SELECT SUM(volume_cbm) AS cbm, SUM(volume_sqrmtr) AS sqm, SUM(weight_kg) AS weight
+        FROM `tabPacking List Item`
+        WHERE parent = %s AND parenttype = 'Packing List' AND parentfield = 'item'
+    """, packing_list, as_dict=True)[0]
+
+    frappe.db.set_value("Packing List", packing_list, {
+        "total_volume_cbm": flt(totals.cbm, VOLUME_PRECISION),
+        "total_volume_sqrmtr": flt(totals.sqm, AREA_PRECISION),
+        "total_weight_kg": flt(totals.weight, WEIGHT_PRECISION)
+    })
+
+
+@frappe.whitelist()
+def import_packing_list_items(packing_list, file_url):
+    """Queue the import of `file_url` into the items of `packing_list`"""
+    frappe.has_permission("Packing List", "write", doc=packing_list, throw=True)
+
+    if frappe.db.get_value("Packing List", packing_list, "docstatus") != 0:
+        frappe.throw(_("Items can only be imported into a draft Packing List"))
+
+    # The job reads the file straight from disk, so File permissions are checked here
+    file = frappe.db.get_value(
+        "File", {"file_url": file_url, "attached_to_doctype": "Packing List", "attached_to_name": packing_list}, "name"
+    ) or frappe.db.get_value("File", {"file_url": file_url}, "name")
+    if not file:
+        frappe.throw(_("File {0} not found").format(file_url), frappe.DoesNotExistError)
+    frappe.has_permission("File", "read", doc=file, throw=True)
+
+    # Imports append rows after the last idx, so one packing list takes one import at a time
+    job_id = f"ksa_logistics:packing_list_import:{packing_list}"
+    if is_job_enqueued(job_id):
+        return {
+            "status": "not_queued",
+            "message": _("Another import into this Packing List is still running, import the file again once it is done")
+        }
+
+    frappe.enqueue(
+        "ksa_logistics.packing_list_import.run_packing_list_import",
+        queue="long",
+        timeout=3600,
+        job_id=job_id,
+        enqueue_after_commit=True,
+        packing_list=packing_list,
+        file_url=file_url
+    )
+
+    return {"status": "queued", "message": _("Packing list import started in the background")}
+
+
+def run_packing_list_import(packing_list, file_url):
+    rows = iter_file_rows(file_url)
+    header_map = get_header_map(next(rows, None) or [])
+    if not header_map:
+        frappe.throw(_("None of the columns match Packing List Item fields: {0}").format(", ".join(IMPORT_FIELDS)))
+
+    lookup = MasterLookup()
+    next_idx = cint(frappe.db.sql("""
+        SELECT MAX(idx) FROM `tabPacking List Item`
+        WHERE parent = %s AND parenttype = 'Packing List' AND parentfield = 'item'
+    """, packing_list)[0][0])
+
+    imported, errors, batch = 0, [], []
+
+    def flush():
+        nonlocal imported, next_idx
+        batch_errors = validate_batch(batch, lookup)
+        failed_lines = {line for line, _row_errors in batch_errors}
+        valid = [row for line, row in batch if line not in failed_lines]
+
+        if valid:
+            insert_batch(packing_list, valid, next_idx)
+            next_idx += len(valid)
+            imported += len(valid)
+
+        errors.extend(batch_errors)
+        frappe.db.commit()
+        frappe.publish_realtime(
+            "packing_list_import_progress",
+            {"packing_list": packing_list, "imported": imported, "failed": len(errors)},
+            user=frappe.session.user
+        )
+        batch.clear()
+
+    # Line numbers match the spreadsheet, the header is line 1
+    for line, values in enumerate(rows, 2):
+        if not any(v not in (None, "") for v in values):
+            continue
+        batch.append((line, parse_row(values, header_map)))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            flush()
+
+    if batch:
+        flush()
+
+    update_packing_list_totals(packing_list)
+    frappe.db.commit()
+
+    summary = {
+        "packing_list": packing_list,
+        "imported": imported,
+        "failed": len(errors),
+        "errors": [{"row": line, "errors": row_errors} for line, row_errors in errors[:MAX_REPORTED_ERRORS]]
+    }
+    frappe.publish_realtime("packing_list_import", summary, user=frappe.session.user)
+    return summary
@@ -0,0 +1,6 @@
+import frappe
+
+
+def execute():
+    # Backs the customer quotation picker (api.get_quotations_for_customer)
+    frappe.db.add_index("Quotation", ["party_name", "creation"], index_name="party_name_creation_index")
@@ -0,0 +1,5 @@
+from ksa_logistics.api import update_percent_for_open_jobs
+
+
+def execute():
+    update_percent_for_open_jobs()
@@ -0,0 +1,5 @@
+from ksa_logistics.waybill_migration import enqueue_truck_way_bill_migration
+
+
+def execute():
+    enqueue_truck_way_bill_migration()
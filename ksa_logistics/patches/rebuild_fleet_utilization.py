@@ -0,0 +1,5 @@
+from ksa_logistics.ksa_logistics.doctype.fleet_utilization.fleet_utilization import rebuild_fleet_utilization
+
+
+def execute():
+    rebuild_fleet_utilization()
@@ -0,0 +1,5 @@
+from ksa_logistics.ksa_logistics.doctype.warehouse_stock_ledger.warehouse_stock_ledger import rebuild_stock_ledger
+
+
+def execute():
+    rebuild_stock_ledger()
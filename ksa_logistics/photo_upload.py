@@ -0,0 +1,226 @@
+import base64
+import hashlib
+import mimetypes
+import os
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+
+"""
+Resumable chunked upload of workflow photos and signatures.
+
+The app announces a file with its size and MD5 (the hash File stores as
+`content_hash`). A file the user can already read is not uploaded again, a new
+File record just points at the stored copy. Otherwise the app sends the file in
+chunks appended to a partial file under private/uploads, so after a dropped
+connection it asks for the received offset and carries on from there.
+
+Photo rows and signatures only hold the file URL, so copying photos from a
+Delivery Note Record to its POD copies URLs, never images. Images still posted
+inline as data URIs are moved into files the same way when the document is saved.
+"""
+
+UPLOAD_FOLDER = "uploads"
+UPLOAD_CACHE_KEY = "ksa_logistics:photo_upload"
+
+# Partial uploads not finished within a day are dropped
+UPLOAD_TTL = 24 * 60 * 60
+
+CHUNK_SIZE = 256 * 1024
+MAX_UPLOAD_SIZE = 25 * 1024 * 1024
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+ATTACH_FIELDTYPES = ("Attach", "Attach Image")
+
+
+def get_upload_path(upload_id):
+    return frappe.get_site_path("private", UPLOAD_FOLDER, f"{upload_id}.part")
+
+
+def get_upload(upload_id):
+    upload = frappe.cache().get_value(f"{UPLOAD_CACHE_KEY}:{upload_id}")
+    if not upload or upload["user"] != frappe.session.user:
+        frappe.throw(_("Upload {0} not found or expired").format(upload_id), frappe.DoesNotExistError)
+    return upload
+
+
+def get_received(upload_id):
+    path = get_upload_path(upload_id)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def get_readable_stored_file(content_hash):
+    """
+    URL of a stored private file with `content_hash` the user can already read.
+    A matching hash alone proves nothing about having the file, so other users'
+    files are only deduplicated on disk once the full upload has been checked.
+    """
+    for f in frappe.get_all(
+        "File",
+        filters={"content_hash": content_hash, "is_private": 1},
+        fields=["name", "file_url"],
+        limit_page_length=20
+    ):
+        if (
+            frappe.has_permission("File", "read", doc=f.name)
+            and os.path.exists(frappe.get_site_path(f.file_url.lstrip("/")))
+        ):
+            return f.file_url
+
+
+def link_stored_file(file_url, file_name, attached_to_doctype=None, attached_to_name=None):
+    """New File record for a file already stored, so the user gets access without a second copy"""
+    return frappe.get_doc({
+        "doctype": "File",
+        "file_url": file_url,
+        "file_name": file_name,
+        "is_private": 1,
+        "attached_to_doctype": attached_to_doctype,
+        "attached_to_name": attached_to_name,
+    }).insert(ignore_permissions=True)
+
+
+def save_image(content, file_name, attached_to_doctype=None, attached_to_name=None):
+    """Store image bytes as a private File, reusing the stored copy of identical content"""
+    file_doc = frappe.get_doc({
+        "doctype": "File",
+        "file_name": file_name,
+        "is_private": 1,
+        "content": content,
+        "attached_to_doctype": attached_to_doctype,
+        "attached_to_name": attached_to_name,
+    }).insert(ignore_permissions=True)
+    enqueue_thumbnail(file_doc.name)
+    return file_doc
+
+
+@frappe.whitelist(methods=["POST"])
+def start_upload(file_name, size, content_hash):
+    """
+    Announce an upload of `size` bytes with MD5 `content_hash`. Returns the
+    file URL when the server already has the file, otherwise an upload id.
+    """
+    size = cint(size)
+    if os.path.splitext(file_name)[1].lower() not in IMAGE_EXTENSIONS:
+        frappe.throw(_("Only {0} images can be uploaded").format(", ".join(IMAGE_EXTENSIONS)))
+    if not 0 < size <= MAX_UPLOAD_SIZE:
+        frappe.throw(_("Images must be between 1 byte and {0} MB").format(MAX_UPLOAD_SIZE // 1024 // 1024))
+
+    stored = get_readable_stored_file(content_hash)
+    if stored:
+        file_doc = link_stored_file(stored, file_name)
+        return {"complete": True, "file_url": file_doc.file_url}
+
+    upload_id = frappe.generate_hash(length=20)
+    frappe.cache().set_value(
+        f"{UPLOAD_CACHE_KEY}:{upload_id}",
+        {"user": frappe.session.user, "file_name": file_name, "size": size, "content_hash": content_hash},
+        expires_in_sec=UPLOAD_TTL
+    )
+    os.makedirs(os.path.dirname(get_upload_path(upload_id)), exist_ok=True)
+
+    return {"complete": False, "upload_id": upload_id, "offset": 0, "chunk_size": CHUNK_SIZE}
+
+
+@frappe.whitelist()
+def get_upload_status(upload_id):
+    """Bytes received so far, where the app resumes the upload"""
+    get_upload(upload_id)
+    return {"upload_id": upload_id, "offset": get_received(upload_id)}
+
+
+@frappe.whitelist(methods=["POST"])
+def upload_chunk(upload_id, offset, chunk=None):
+    """
+    Append a chunk at `offset`, sent as the `chunk` multipart file or base64
+    encoded. A chunk at the wrong offset is ignored and the expected offset returned.
+    """
+    upload = get_upload(upload_id)
+    received = get_received(upload_id)
+    if cint(offset) != received:
+        return {"upload_id": upload_id, "offset": received}
+
+    if frappe.request and frappe.request.files.get("chunk"):
+        content = frappe.request.files["chunk"].read()
+    else:
+        content = base64.b64decode(chunk or "")
+
+    if received + len(content) > upload["size"]:
+        frappe.throw(_("Chunk goes past the announced size of the upload"))
+
+    with open(get_upload_path(upload_id), "ab") as f:
+        f.write(content)
+
+    return {"upload_id": upload_id, "offset": received + len(content)}
+
+
+@frappe.whitelist(methods=["POST"])
+def finish_upload(upload_id, attached_to_doctype=None, attached_to_name=None):
+    """Check the received file against the announced size and hash and store it"""
+    if attached_to_doctype or attached_to_name:
+        # The File is inserted with ignore_permissions, attaching needs write access to the document
+        frappe.has_permission(attached_to_doctype, "write", attached_to_name, throw=True)
+
+    upload = get_upload(upload_id)
+    path = get_upload_path(upload_id)
+    if get_received(upload_id) != upload["size"]:
+        frappe.throw(_("Upload is incomplete, {0} of {1} bytes received").format(get_received(upload_id), upload["size"]))
+
+    with open(path, "rb") as f:
+        content = f.read()
+
+    if hashlib.md5(content).hexdigest() != upload["content_hash"]:
+        os.remove(path)
+        frappe.cache().delete_value(f"{UPLOAD_CACHE_KEY}:{upload_id}")
+        frappe.throw(_("Uploaded file does not match its hash, upload it again"))
+
+    file_doc = save_image(content, upload["file_name"], attached_to_doctype, attached_to_name)
+    os.remove(path)
+    frappe.cache().delete_value(f"{UPLOAD_CACHE_KEY}:{upload_id}")
+
+    return {"complete": True, "file_url": file_doc.file_url}
+
+
+def store_inline_images(doc):
+    """Move data URI images in the attach fields of `doc` and its rows into stored files"""
+    for d in [doc, *doc.get_all_children()]:
+        for df in d.meta.get("fields", {"fieldtype": ["in", ATTACH_FIELDTYPES]}):
+            value = d.get(df.fieldname)
+            if not (value and value.startswith("data:") and ";base64," in value):
+                continue
+
+            header, data = value.split(";base64,", 1)
+            extension = mimetypes.guess_extension(header[5:]) or ".jpg"
+            file_doc = save_image(
+                base64.b64decode(data),
+                f"{df.fieldname}-{frappe.generate_hash(length=8)}{extension}",
+                doc.doctype,
+                doc.name
+            )
+            d.set(df.fieldname, file_doc.file_url)
+
+
+def enqueue_thumbnail(file):
+    frappe.enqueue(
+        "ksa_logistics.thumbnails.make_renditions",
+        queue="short",
+        job_id=f"ksa_logistics:thumbnail:{file}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        file=file
+    )
+
+
+def remove_stale_uploads():
+    """Daily: drop partial uploads older than UPLOAD_TTL"""
+    folder = frappe.get_site_path("private", UPLOAD_FOLDER)
+    if not os.path.isdir(folder):
+        return
+
+    cutoff = time.time() - UPLOAD_TTL
+    for entry in os.scandir(folder):
+        if entry.name.endswith(".part") and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
@@ -1,15 +1,36 @@
 
 
 import frappe
-from ksa_logistics.api import update_percent_purchased, update_percent_delivered
-
-def update_job_record_percent(doc, method):
-    if doc.doctype in ["Purchase Order", "Purchase Invoice", "Purchase Receipt"] and doc.get("custom_job_record"):
-        update_percent_purchased(doc.custom_job_record)
-    elif doc.doctype in ["Sales Order", "Sales Invoice", "Delivery Note"] and doc.get("custom_job_record"):
-        update_percent_delivered(doc.custom_job_record)
-
 
+from ksa_logistics.job_vouchers import enqueue_debounced
 
+PURCHASE_DOCTYPES = ["Purchase Order", "Purchase Invoice", "Purchase Receipt"]
+SALES_DOCTYPES = ["Sales Order", "Sales Invoice", "Delivery Note"]
 
 
+def update_job_record_percent(doc, method):
+    """
+    Recompute the Job Record % Received / % Delivered in the background.
+
+    The job is debounced per Job Record and runs after commit, so submitting
+    many orders for the same job in one go only recomputes it once, while an
+    order submitted during a running recompute still gets a run of its own.
+    """
+    job_record = doc.get("custom_job_record")
+    if not job_record:
+        return
+
+    if doc.doctype in PURCHASE_DOCTYPES:
+        method_path = "ksa_logistics.api.update_percent_purchased"
+    elif doc.doctype in SALES_DOCTYPES:
+        method_path = "ksa_logistics.api.update_percent_delivered"
+    else:
+        return
+
+    enqueue_debounced(
+        method_path,
+        f"{method_path}:{job_record}",
+        queue="short",
+        enqueue_after_commit=True,
+        job_record=job_record
+    )
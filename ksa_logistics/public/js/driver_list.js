@@ -0,0 +1,61 @@
+// Copyright (c) 2025, KSA Logistics and contributors
+// For license information, please see license.txt
+
+frappe.listview_settings["Driver"] = {
+    onload: function(listview) {
+        listview.page.add_inner_button(__("Process All Allowances"), function() {
+            frappe.prompt(
+                {
+                    fieldname: "payroll_date",
+                    label: __("Payroll Date"),
+                    fieldtype: "Date",
+                    default: frappe.datetime.get_today(),
+                    reqd: 1
+                },
+                function(values) {
+                    // Selected drivers only, or every internal driver when nothing is selected
+                    const drivers = listview.get_checked_items(true);
+                    frappe.call({
+                        method: "ksa_logistics.api.process_driver_allowances_bulk",
+                        args: {
+                            drivers: drivers.length ? drivers : null,
+                            payroll_date: values.payroll_date
+                        },
+                        callback: function(r) {
+                            if (r.message) {
+                                frappe.show_alert({
+                                    message: r.message.message,
+                                    indicator: r.message.status === "queued" ? "blue" : "orange"
+                                });
+                            }
+                        }
+                    });
+                },
+                __("Process Driver Allowances"),
+                __("Start")
+            );
+        });
+
+        frappe.realtime.off("driver_allowance_payout");
+        frappe.realtime.on("driver_allowance_payout", function(summary) {
+            frappe.hide_progress();
+
+            let message = __("{0} Additional Salaries created for a total of {1}.", [
+                summary.created.length,
+                format_currency(summary.total_amount)
+            ]);
+
+            if (summary.failed.length) {
+                message += "<br><br>" + __("Failed for the following drivers (see Error Log for details):")
+                    + "<br>" + summary.failed.map(d => frappe.utils.escape_html(d)).join("<br>");
+            }
+
+            frappe.msgprint({
+                title: __("Driver Allowance Payout"),
+                message: message,
+                indicator: summary.failed.length ? "orange" : "green"
+            });
+            listview.refresh();
+        });
+    }
+};
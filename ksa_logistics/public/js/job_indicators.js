@@ -0,0 +1,55 @@
+// Job Record / Warehouse Job Record dashboard indicators.
+// Figures are fetched when a job form loads, while it is open the server pushes
+// only the changed values (job_indicators realtime event) when a linked voucher
+// is submitted or cancelled, so refreshing a form never queries the ledgers.
+frappe.provide("ksa_logistics.job_indicators");
+
+$.extend(ksa_logistics.job_indicators, {
+    state: {},
+
+    // Pushes only reach open forms, so state older than this is fetched again
+    // (from the server cache) in case a voucher changed while the form was closed
+    ttl: 30 * 1000,
+
+    key: function(doctype, name) {
+        return doctype + "::" + name;
+    },
+
+    get: function(frm, callback) {
+        const key = this.key(frm.doctype, frm.doc.name);
+        const entry = this.state[key];
+        if (entry && Date.now() - entry.fetched_at < this.ttl) {
+            callback(entry.indicators);
+            return;
+        }
+
+        frappe.call({
+            method: "ksa_logistics.job_vouchers.get_job_indicators",
+            args: {
+                doctype: frm.doctype,
+                name: frm.doc.name
+            },
+            callback: (r) => {
+                this.state[key] = { indicators: r.message || {}, fetched_at: Date.now() };
+                callback(this.state[key].indicators);
+            }
+        });
+    },
+
+    on_push: function(data) {
+        const key = this.key(data.doctype, data.name);
+        if (!this.state[key]) return;
+
+        Object.assign(this.state[key].indicators, data.delta);
+        this.state[key].fetched_at = Date.now();
+
+        // Re-render the open form from the pushed state
+        if (cur_frm && cur_frm.doctype === data.doctype && cur_frm.doc.name === data.name) {
+            cur_frm.refresh();
+        }
+    }
+});
+
+$(document).on("app_ready", function() {
+    frappe.realtime.on("job_indicators", (data) => ksa_logistics.job_indicators.on_push(data));
+});
@@ -0,0 +1,68 @@
+// Copyright (c) 2026, ramees@enfono.com and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on("Packing List", {
+    refresh: function(frm) {
+        if (frm.is_new() || frm.doc.docstatus !== 0) {
+            return;
+        }
+
+        frm.add_custom_button(__("Import Items"), function() {
+            frappe.prompt(
+                {
+                    fieldname: "file_url",
+                    label: __("CSV / XLSX File"),
+                    fieldtype: "Attach",
+                    reqd: 1,
+                    description: __("Header row with the item fields, e.g. Item, Area, Quantity, UoM, Weight (kg), Length (cm), Width (cm), Height (cm)")
+                },
+                function(values) {
+                    frappe.call({
+                        method: "ksa_logistics.packing_list_import.import_packing_list_items",
+                        args: { packing_list: frm.doc.name, file_url: values.file_url },
+                        callback: function(r) {
+                            if (r.message) {
+                                frappe.show_alert({
+                                    message: r.message.message,
+                                    indicator: r.message.status === "queued" ? "blue" : "orange"
+                                });
+                            }
+                        }
+                    });
+                },
+                __("Import Packing List Items"),
+                __("Import")
+            );
+        });
+
+        frappe.realtime.off("packing_list_import_progress");
+        frappe.realtime.on("packing_list_import_progress", function(data) {
+            if (data.packing_list === frm.doc.name) {
+                frappe.show_alert({
+                    message: __("{0} rows imported, {1} failed", [data.imported, data.failed]),
+                    indicator: "blue"
+                }, 3);
+            }
+        });
+
+        frappe.realtime.off("packing_list_import");
+        frappe.realtime.on("packing_list_import", function(summary) {
+            if (summary.packing_list !== frm.doc.name) {
+                return;
+            }
+
+            let message = __("{0} rows imported.", [summary.imported]);
+            if (summary.failed) {
+                message += "<br><br>" + __("{0} rows were skipped:", [summary.failed]) + "<br>"
+                    + summary.errors.map(e => __("Row {0}: {1}", [e.row, frappe.utils.escape_html(e.errors.join(", "))])).join("<br>");
+            }
+
+            frappe.msgprint({
+                title: __("Packing List Import"),
+                message: message,
+                indicator: summary.failed ? "orange" : "green"
+            });
+            frm.reload_doc();
+        });
+    }
+});
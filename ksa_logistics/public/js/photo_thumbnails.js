@@ -0,0 +1,48 @@
+// Photo tables of the workflow forms are shown as a grid of server-side
+// thumbnails (ksa_logistics.thumbnails), the original image only loads when
+// a thumbnail is clicked.
+frappe.provide("ksa_logistics.photo_thumbnails");
+
+$.extend(ksa_logistics.photo_thumbnails, {
+    // Photo table of each form, with the child doctype holding the photo
+    tables: {
+        "Collection Note": { fieldname: "collection_photos", child: "Collection Photo" },
+        "Delivery Note Record": { fieldname: "delivery_photos", child: "Delivery Photo" },
+        "Proof of Delivery": { fieldname: "delivery_photos", child: "POD Photo" }
+    },
+
+    url: function(file_url, size) {
+        return "/api/method/ksa_logistics.thumbnails.get_thumbnail?"
+            + $.param({ file_url: file_url, size: size || "small" });
+    },
+
+    render: function(frm) {
+        const table = this.tables[frm.doctype];
+        const field = frm.fields_dict[table.fieldname];
+        if (!field) return;
+
+        field.$wrapper.find(".ksa-photo-thumbnails").remove();
+        const rows = (frm.doc[table.fieldname] || []).filter(row => row.photo);
+        if (!rows.length) return;
+
+        const items = rows.map(row => `
+            <a href="${encodeURI(row.photo)}" target="_blank" rel="noopener"
+                title="${frappe.utils.escape_html(row.description || row.photo_type || "")}"
+                style="display: inline-block; margin: 0 8px 8px 0;">
+                <img src="${this.url(row.photo)}" loading="lazy"
+                    style="width: 120px; height: 120px; object-fit: cover; border-radius: var(--border-radius);">
+            </a>`).join("");
+
+        field.$wrapper.append(`<div class="ksa-photo-thumbnails" style="margin-top: 8px;">${items}</div>`);
+    }
+});
+
+$.each(ksa_logistics.photo_thumbnails.tables, function(doctype, table) {
+    const render = (frm) => ksa_logistics.photo_thumbnails.render(frm);
+
+    frappe.ui.form.on(doctype, { refresh: render });
+    frappe.ui.form.on(table.child, {
+        photo: render,
+        [table.fieldname + "_remove"]: render
+    });
+});
@@ -0,0 +1,25 @@
+// Copyright (c) 2026, ramees@enfono.com and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on("Survey Report", {
+    refresh: function(frm) {
+        if (frm.is_new()) {
+            return;
+        }
+
+        frm.add_custom_button(__("Price Quotation"), function() {
+            frappe.call({
+                method: "ksa_logistics.ksa_logistics.doctype.survey_rate_card.survey_rate_card.make_quotation_from_survey",
+                args: { survey_report: frm.doc.name },
+                freeze: true,
+                freeze_message: __("Pricing survey..."),
+                callback: function(r) {
+                    if (r.message) {
+                        frm.reload_doc();
+                        frappe.set_route("Form", "Quotation", r.message);
+                    }
+                }
+            });
+        }, __("Create"));
+    }
+});
@@ -0,0 +1,95 @@
+// Copyright (c) 2026, ramees@enfono.com and contributors
+// For license information, please see license.txt
+
+const STOCK_LEDGER_METHOD = "ksa_logistics.ksa_logistics.doctype.warehouse_stock_ledger.warehouse_stock_ledger";
+
+frappe.ui.form.on("Warehouse Job Record", {
+    refresh: function(frm) {
+        if (frm.is_new()) {
+            frm.fields_dict.stock_ledger_html.$wrapper.empty();
+            return;
+        }
+
+        frm.events.set_stock_balance_indicator(frm);
+        frm.events.show_stock_ledger(frm);
+    },
+
+    set_stock_balance_indicator: function(frm) {
+        frappe.call({
+            method: STOCK_LEDGER_METHOD + ".get_stock_balance",
+            args: { warehouse_job_record: frm.doc.name },
+            callback: function(r) {
+                if (r.message) {
+                    frm.dashboard.add_indicator(
+                        __("Balance Volume: {0}", [format_number(r.message.balance_volume)]),
+                        r.message.balance_volume > 0 ? "blue" : "gray"
+                    );
+                }
+            }
+        });
+    },
+
+    show_stock_ledger: function(frm) {
+        // The most recent movements are shown above the collapsed movement
+        // table, older ones are fetched on demand
+        const $wrapper = frm.fields_dict.stock_ledger_html.$wrapper;
+        const page_length = 50;
+
+        let rows = [];
+        let cursor = null;
+
+        function load_page() {
+            frappe.call({
+                method: STOCK_LEDGER_METHOD + ".get_stock_ledger",
+                args: {
+                    warehouse_job_record: frm.doc.name,
+                    before_date: cursor && cursor.posting_date,
+                    before_sequence: cursor && cursor.sequence,
+                    page_length: page_length
+                },
+                callback: function(r) {
+                    const page = r.message || [];
+                    rows = rows.concat(page);
+                    cursor = page.length ? page[page.length - 1] : cursor;
+                    render(page.length === page_length);
+                }
+            });
+        }
+
+        function render(has_more) {
+            const body = rows.map(row => `
+                <tr>
+                    <td>${frappe.datetime.str_to_user(row.posting_date)}</td>
+                    <td>${frappe.utils.escape_html(row.warehouse || "")}</td>
+                    <td class="text-right">${format_number(row.in_qty)}</td>
+                    <td class="text-right">${format_number(row.out_qty)}</td>
+                    <td class="text-right">${format_number(row.balance_qty)}</td>
+                    <td class="text-right">${format_number(row.in_volume)}</td>
+                    <td class="text-right">${format_number(row.out_volume)}</td>
+                    <td class="text-right">${format_number(row.balance_volume)}</td>
+                </tr>`).join("");
+
+            $wrapper.html(`
+                <table class="table table-bordered table-condensed">
+                    <thead>
+                        <tr>
+                            <th>${__("Date")}</th>
+                            <th>${__("Warehouse")}</th>
+                            <th class="text-right">${__("In Qty")}</th>
+                            <th class="text-right">${__("Out Qty")}</th>
+                            <th class="text-right">${__("Balance Qty")}</th>
+                            <th class="text-right">${__("In Volume")}</th>
+                            <th class="text-right">${__("Out Volume")}</th>
+                            <th class="text-right">${__("Balance Volume")}</th>
+                        </tr>
+                    </thead>
+                    <tbody>${body || `<tr><td colspan="8" class="text-muted">${__("No movements")}</td></tr>`}</tbody>
+                </table>
+                ${has_more ? `<button class="btn btn-default btn-xs load-older">${__("Load Older")}</button>` : ""}`);
+
+            $wrapper.find(".load-older").on("click", load_page);
+        }
+
+        load_page();
+    }
+});
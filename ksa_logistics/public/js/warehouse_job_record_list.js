@@ -0,0 +1,128 @@
+// Copyright (c) 2026, ramees@enfono.com and contributors
+// For license information, please see license.txt
+
+frappe.listview_settings["Warehouse Job Record"] = {
+    onload: function(listview) {
+        listview.page.add_inner_button(__("Storage Billing"), function() {
+            const dialog = new frappe.ui.Dialog({
+                title: __("Storage Billing"),
+                size: "extra-large",
+                fields: [
+                    {
+                        fieldname: "from_date",
+                        label: __("From Date"),
+                        fieldtype: "Date",
+                        default: frappe.datetime.month_start(),
+                        reqd: 1
+                    },
+                    { fieldtype: "Column Break" },
+                    {
+                        fieldname: "to_date",
+                        label: __("To Date"),
+                        fieldtype: "Date",
+                        default: frappe.datetime.month_end(),
+                        reqd: 1
+                    },
+                    { fieldtype: "Section Break" },
+                    { fieldname: "charges_html", fieldtype: "HTML" }
+                ],
+                secondary_action_label: __("Preview"),
+                secondary_action: function() {
+                    run(1);
+                },
+                primary_action_label: __("Create Invoices"),
+                primary_action: function() {
+                    frappe.confirm(__("Create draft Sales Invoices for all billable jobs?"), function() {
+                        run(0);
+                    });
+                }
+            });
+
+            function run(dry_run) {
+                const values = dialog.get_values();
+                if (!values) {
+                    return;
+                }
+
+                // Selected jobs only, or every open job when nothing is selected
+                const jobs = listview.get_checked_items(true);
+                frappe.call({
+                    method: "ksa_logistics.storage_billing.run_storage_billing",
+                    args: {
+                        from_date: values.from_date,
+                        to_date: values.to_date,
+                        jobs: jobs.length ? jobs : null,
+                        dry_run: dry_run
+                    },
+                    freeze: true,
+                    callback: function(r) {
+                        if (dry_run) {
+                            render(r.message || []);
+                        } else if (r.message) {
+                            dialog.hide();
+                            frappe.show_alert({
+                                message: r.message.message,
+                                indicator: r.message.status === "queued" ? "blue" : "orange"
+                            });
+                        }
+                    }
+                });
+            }
+
+            function render(charges) {
+                const body = charges.map(charge => `
+                    <tr class="${charge.skipped ? "text-muted" : ""}">
+                        <td>${frappe.utils.escape_html(charge.warehouse_job_record)}</td>
+                        <td>${frappe.utils.escape_html(charge.customer || "")}</td>
+                        <td>${frappe.utils.escape_html(charge.billing_criteria || "")}</td>
+                        <td class="text-right">${format_number(charge.unit_days)}</td>
+                        <td class="text-right">${format_number(charge.qty)}</td>
+                        <td class="text-right">${format_currency(charge.rate)}</td>
+                        <td class="text-right">${format_currency(charge.amount)}</td>
+                        <td>${frappe.utils.escape_html(charge.skipped || "")}</td>
+                    </tr>`).join("");
+
+                const total = charges.filter(c => !c.skipped).reduce((sum, c) => sum + flt(c.amount), 0);
+
+                dialog.fields_dict.charges_html.$wrapper.html(`
+                    <table class="table table-bordered table-condensed">
+                        <thead>
+                            <tr>
+                                <th>${__("Job")}</th>
+                                <th>${__("Customer")}</th>
+                                <th>${__("Billing Criteria")}</th>
+                                <th class="text-right">${__("Unit Days")}</th>
+                                <th class="text-right">${__("Qty")}</th>
+                                <th class="text-right">${__("Rate")}</th>
+                                <th class="text-right">${__("Amount")}</th>
+                                <th>${__("Skipped")}</th>
+                            </tr>
+                        </thead>
+                        <tbody>${body || `<tr><td colspan="8" class="text-muted">${__("Nothing to bill")}</td></tr>`}</tbody>
+                        <tfoot>
+                            <tr>
+                                <th colspan="6">${__("Total")}</th>
+                                <th class="text-right">${format_currency(total)}</th>
+                                <th></th>
+                            </tr>
+                        </tfoot>
+                    </table>`);
+            }
+
+            dialog.show();
+        });
+
+        frappe.realtime.off("storage_billing");
+        frappe.realtime.on("storage_billing", function(summary) {
+            let message = __("{0} draft Sales Invoices created.", [summary.invoices.length]);
+
+            if (summary.failed.length) {
+                message += "<br><br>" + __("Failed for the following jobs (see Error Log for details):")
+                    + "<br>" + summary.failed.map(d => frappe.utils.escape_html(d)).join("<br>");
+            }
+
+            frappe.msgprint({ title: __("Storage Billing"), message: message, indicator: summary.failed.length ? "orange" : "green" });
+            listview.refresh();
+        });
+    }
+};
@@ -0,0 +1,248 @@
+import hashlib
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, flt, formatdate, getdate
+from frappe.utils.background_jobs import is_job_enqueued
+
+from ksa_logistics.masters import get_default_company
+
+"""
+Storage billing for Warehouse Job Records.
+
+Chargeable storage is measured in unit-days over the Warehouse Stock Ledger:
+the end-of-day balance of each warehouse is held until the next movement (or
+the end of the period), so every ledger interval contributes
+balance x days. CBM and Sqrmtr jobs are billed on the volume balance, Pallet
+and Box jobs on the quantity balance. The job's storage rate is per billing
+unit per storage term, e.g. per CBM per month.
+"""
+
+TERM_DAYS = {"Daily": 1, "Weekly": 7, "Monthly": 30, "Yearly": 365}
+
+# Ledger balance each billing criteria is measured on
+CRITERIA_MEASURE = {"CBM": "volume", "Sqrmtr": "volume", "Pallet": "qty", "Box": "qty"}
+
+CLOSED_JOB_STATUSES = ("Closed", "Cancelled")
+
+
+def get_storage_unit_days(from_date, to_date, jobs=None):
+    """
+    Return {job: {"qty_days", "volume_days"}} for every open Warehouse Job Record
+    (or `jobs`) in one pass over the ledger.
+    """
+    values = {
+        "from_date": getdate(from_date),
+        "to_date": getdate(to_date),
+        # Intervals are half open, the last day of the period is still charged
+        "period_end": add_days(getdate(to_date), 1),
+        "closed": CLOSED_JOB_STATUSES,
+        "jobs": list(jobs or []),
+    }
+    job_condition = "AND job.name IN %(jobs)s" if jobs else ""
+
+    rows = frappe.db.sql(f"""
+        SELECT
+            warehouse_job_record AS job,
+            SUM(balance_qty * days) AS qty_days,
+            SUM(balance_volume * days) AS volume_days
+        FROM (
+            SELECT
+                ledger.warehouse_job_record,
+                ledger.balance_qty,
+                ledger.balance_volume,
+                DATEDIFF(
+                    LEAST(COALESCE(LEAD(ledger.posting_date) OVER movements, %(period_end)s), %(period_end)s),
+                    GREATEST(ledger.posting_date, %(from_date)s)
+                ) AS days
+            FROM `tabWarehouse Stock Ledger` ledger
+            INNER JOIN `tabWarehouse Job Record` job ON job.name = ledger.warehouse_job_record
+            WHERE ledger.posting_date <= %(to_date)s
+                AND IFNULL(job.job_status, '') NOT IN %(closed)s
+                {job_condition}
+            WINDOW movements AS (
+                PARTITION BY ledger.warehouse_job_record, ledger.warehouse
+                ORDER BY ledger.posting_date, ledger.sequence
+            )
+        ) intervals
+        WHERE days > 0
+        GROUP BY warehouse_job_record
+    """, values, as_dict=True)
+
+    return {row.job: row for row in rows}
+
+
+def get_billed_jobs(jobs, from_date, to_date):
+    """Jobs that already have a storage Sales Invoice overlapping the period"""
+    if not jobs:
+        return set()
+
+    return set(frappe.db.sql_list("""
+        SELECT DISTINCT custom_warehouse_job_record
+        FROM `tabSales Invoice`
+        WHERE custom_warehouse_job_record IN %(jobs)s
+            AND docstatus < 2
+            AND from_date <= %(to_date)s
+            AND to_date >= %(from_date)s
+    """, {"jobs": list(jobs), "from_date": getdate(from_date), "to_date": getdate(to_date)}))
+
+
+def get_quotation_rates(jobs):
+    """{job: rate} of the job's storage item on its quotation, for jobs without a storage rate"""
+    jobs = [job for job in jobs if not flt(job.storage_rate) and job.quotation and job.storage_item]
+    if not jobs:
+        return {}
+
+    rates = frappe.db.sql("""
+        SELECT parent, item_code, MAX(rate) AS rate
+        FROM `tabQuotation Item`
+        WHERE parent IN %(quotations)s
+        GROUP BY parent, item_code
+    """, {"quotations": list({job.quotation for job in jobs})}, as_dict=True)
+
+    rates = {(row.parent, row.item_code): row.rate for row in rates}
+    return {job.name: rates.get((job.quotation, job.storage_item)) for job in jobs}
+
+
+def compute_storage_charges(from_date, to_date, jobs=None):
+    """
+    Storage charge lines for the period, one per billable job. Jobs that cannot
+    be billed (no customer, item, rate, billing criteria or already invoiced)
+    are returned with a `skipped` reason so the dry run shows them.
+    """
+    unit_days = get_storage_unit_days(from_date, to_date, jobs)
+    if not unit_days:
+        return []
+
+    job_docs = frappe.get_all(
+        "Warehouse Job Record",
+        filters={"name": ["in", list(unit_days)]},
+        fields=["name", "customer", "branch", "quotation", "billing_criteria", "storage_terms",
+            "storage_item", "storage_rate"]
+    )
+    quotation_rates = get_quotation_rates(job_docs)
+    billed = get_billed_jobs(list(unit_days), from_date, to_date)
+
+    charges = []
+    for job in sorted(job_docs, key=lambda d: d.name):
+        measure = CRITERIA_MEASURE.get(job.billing_criteria)
+        term_days = TERM_DAYS.get(job.storage_terms or "Daily")
+        days = flt(unit_days[job.name].get(f"{measure}_days")) if measure else 0
+        rate = flt(job.storage_rate) or flt(quotation_rates.get(job.name))
+
+        charge = frappe._dict(
+            warehouse_job_record=job.name,
+            customer=job.customer,
+            cost_center=job.branch,
+            billing_criteria=job.billing_criteria,
+            storage_terms=job.storage_terms or "Daily",
+            item_code=job.storage_item,
+            unit_days=days,
+            qty=flt(days / term_days, 3),
+            rate=rate,
+        )
+        charge.amount = flt(charge.qty * rate, 2)
+
+        if job.name in billed:
+            charge.skipped = _("Already invoiced for this period")
+        elif not measure:
+            charge.skipped = _("Billing Criteria not set")
+        elif not job.customer:
+            charge.skipped = _("Customer not set")
+        elif not job.storage_item:
+            charge.skipped = _("Storage Item not set")
+        elif not rate:
+            charge.skipped = _("No storage rate on the job or its quotation")
+        elif not charge.qty:
+            charge.skipped = _("Nothing in storage during the period")
+
+        charges.append(charge)
+
+    return charges
+
+
+@frappe.whitelist()
+def run_storage_billing(from_date, to_date, jobs=None, dry_run=1):
+    """
+    Compute storage charges of every open Warehouse Job Record for the period.
+    With `dry_run` the charges are returned for review, otherwise draft Sales
+    Invoices are created in the background.
+    """
+    frappe.has_permission("Sales Invoice", "create", throw=True)
+
+    if isinstance(jobs, str):
+        jobs = frappe.parse_json(jobs)
+    if getdate(from_date) > getdate(to_date):
+        frappe.throw(_("From Date cannot be after To Date"))
+
+    if cint(dry_run):
+        return compute_storage_charges(from_date, to_date, jobs)
+
+    # Only a second run of the same period and jobs is held back
+    job_set = hashlib.md5(json.dumps(sorted(jobs or [])).encode()).hexdigest()[:10]
+    job_id = f"ksa_logistics:storage_billing:{getdate(from_date)}:{getdate(to_date)}:{job_set}"
+    if is_job_enqueued(job_id):
+        return {
+            "status": "not_queued",
+            "message": _("Storage billing for this period and these jobs is already running, it was not queued again")
+        }
+
+    frappe.enqueue(
+        "ksa_logistics.storage_billing.make_storage_invoices",
+        queue="long",
+        timeout=3600,
+        job_id=job_id,
+        from_date=from_date,
+        to_date=to_date,
+        jobs=jobs
+    )
+
+    return {"status": "queued", "message": _("Storage billing started in the background")}
+
+
+def make_storage_invoices(from_date, to_date, jobs=None):
+    """Create one draft Sales Invoice per billable job, committing after each one"""
+    company = get_default_company()
+    invoices, failed = [], []
+
+    for charge in compute_storage_charges(from_date, to_date, jobs):
+        if charge.skipped:
+            continue
+
+        frappe.db.savepoint("storage_billing")
+        try:
+            si = frappe.new_doc("Sales Invoice")
+            si.company = company
+            si.customer = charge.customer
+            si.posting_date = getdate(to_date)
+            si.set_posting_time = 1
+            si.from_date = getdate(from_date)
+            si.to_date = getdate(to_date)
+            si.custom_warehouse_job_record = charge.warehouse_job_record
+            si.append("items", {
+                "item_code": charge.item_code,
+                "description": _("Storage from {0} to {1}: {2} {3}-days ({4})").format(
+                    formatdate(from_date), formatdate(to_date), flt(charge.unit_days, 2),
+                    charge.billing_criteria, charge.storage_terms
+                ),
+                "qty": charge.qty,
+                "rate": charge.rate,
+                "cost_center": charge.cost_center
+            })
+
+            si.set_missing_values()
+            si.insert(ignore_permissions=True)
+            frappe.db.commit()
+            invoices.append(si.name)
+        except Exception:
+            frappe.db.rollback(save_point="storage_billing")
+            frappe.log_error(title=f"Storage billing failed for {charge.warehouse_job_record}")
+            failed.append(charge.warehouse_job_record)
+
+    frappe.publish_realtime(
+        "storage_billing",
+        {"invoices": invoices, "failed": failed},
+        user=frappe.session.user
+    )
+    return invoices
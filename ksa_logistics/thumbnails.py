@@ -0,0 +1,146 @@
+import base64
+import hashlib
+import os
+from io import BytesIO
+
+import frappe
+from frappe import _
+from PIL import Image, ImageOps
+
+"""
+Downscaled renditions of workflow photos for forms and print.
+
+Renditions are made on first request (or right after upload) and kept under
+private/thumbnails, named by the content hash of the image so a photo copied
+to several documents has a single set of renditions. Each access touches the
+rendition's mtime, and `evict_thumbnails` drops the least recently used ones
+once the folder grows past the disk budget (`thumbnail_disk_budget_mb` in
+site_config, THUMBNAIL_DISK_BUDGET_MB by default).
+"""
+
+THUMBNAIL_FOLDER = "thumbnails"
+
+# Bounding box of each rendition, images are scaled down keeping their aspect
+RENDITIONS = {"small": (240, 240), "medium": (800, 800)}
+
+FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 75, "method": 4}),
+    "jpg": ("JPEG", "image/jpeg", {"quality": 80, "optimize": True, "progressive": True}),
+}
+
+THUMBNAIL_DISK_BUDGET_MB = 512
+
+# Eviction frees space down to this share of the budget, so it does not run on every new rendition
+EVICTION_LOW_WATERMARK = 0.8
+
+
+def get_thumbnail_folder():
+    return frappe.get_site_path("private", THUMBNAIL_FOLDER)
+
+
+def get_source(file_url):
+    """(File name, content hash) of the image at `file_url`, checking the user may read it"""
+    files = frappe.get_all("File", filters={"file_url": file_url}, fields=["name", "content_hash", "is_private"])
+    if not files:
+        frappe.throw(_("File {0} not found").format(file_url), frappe.DoesNotExistError)
+
+    readable = [f for f in files if not f.is_private or frappe.has_permission("File", "read", doc=f.name)]
+    if not readable:
+        frappe.throw(_("Not permitted to read {0}").format(file_url), frappe.PermissionError)
+
+    content_hash = next((f.content_hash for f in files if f.content_hash), None)
+    return readable[0].name, content_hash or hashlib.md5(file_url.encode()).hexdigest()
+
+
+def get_rendition_path(content_hash, size, fmt):
+    return os.path.join(get_thumbnail_folder(), f"{content_hash}-{size}.{fmt}")
+
+
+def make_rendition(file, path, size, fmt):
+    """Scale the image of File `file` into `path`"""
+    content = frappe.get_doc("File", file).get_content()
+    image = ImageOps.exif_transpose(Image.open(BytesIO(content)))
+    image.thumbnail(RENDITIONS[size], Image.LANCZOS)
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    pil_format, _mimetype, options = FORMATS[fmt]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write beside and rename, a concurrent request never reads half a file
+    temp_path = f"{path}.{frappe.generate_hash(length=6)}"
+    image.save(temp_path, format=pil_format, **options)
+    os.replace(temp_path, path)
+
+
+def get_rendition(file_url, size="small", fmt="webp"):
+    """Path of the rendition of `file_url`, made on first access"""
+    if size not in RENDITIONS or fmt not in FORMATS:
+        frappe.throw(_("Unknown thumbnail size or format"))
+
+    file, content_hash = get_source(file_url)
+    path = get_rendition_path(content_hash, size, fmt)
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        make_rendition(file, path, size, fmt)
+    return path
+
+
+def accepts_webp():
+    return bool(frappe.request) and "image/webp" in (frappe.request.headers.get("Accept") or "")
+
+
+@frappe.whitelist()
+def get_thumbnail(file_url, size="small"):
+    """Serve the rendition of `file_url`, WebP when the browser takes it and JPEG otherwise"""
+    fmt = "webp" if accepts_webp() else "jpg"
+    path = get_rendition(file_url, size, fmt)
+
+    with open(path, "rb") as f:
+        frappe.local.response.filecontent = f.read()
+    frappe.local.response.filename = os.path.basename(path)
+    frappe.local.response.type = "binary"
+    frappe.local.response.display_content_as = "inline"
+
+
+def get_thumbnail_data_uri(file_url, size="medium"):
+    """
+    Jinja method for print formats: the JPEG rendition inline, since PDF
+    rendering neither fetches private URLs nor decodes WebP.
+    """
+    if not file_url:
+        return ""
+
+    path = get_rendition(file_url, size, "jpg")
+    with open(path, "rb") as f:
+        return "data:image/jpeg;base64," + base64.b64encode(f.read()).decode()
+
+
+def make_renditions(file):
+    """Make every rendition of an uploaded image ahead of its first view"""
+    file_doc = frappe.get_doc("File", file)
+    content_hash = file_doc.content_hash or hashlib.md5(file_doc.file_url.encode()).hexdigest()
+    for size in RENDITIONS:
+        for fmt in FORMATS:
+            path = get_rendition_path(content_hash, size, fmt)
+            if not os.path.exists(path):
+                make_rendition(file_doc.name, path, size, fmt)
+
+
+def evict_thumbnails():
+    """Hourly: delete least recently used renditions while the folder is over its disk budget"""
+    folder = get_thumbnail_folder()
+    if not os.path.isdir(folder):
+        return
+
+    budget = (frappe.conf.get("thumbnail_disk_budget_mb") or THUMBNAIL_DISK_BUDGET_MB) * 1024 * 1024
+    entries = [entry for entry in os.scandir(folder) if entry.is_file()]
+    used = sum(entry.stat().st_size for entry in entries)
+    if used <= budget:
+        return
+
+    for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+        if used <= budget * EVICTION_LOW_WATERMARK:
+            break
+        used -= entry.stat().st_size
+        os.remove(entry.path)
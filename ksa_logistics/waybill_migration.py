@@ -0,0 +1,253 @@
+import frappe
+from frappe import _
+from frappe.model.naming import set_name_from_naming_options
+from frappe.utils import now, strip_html
+
+"""
+Migration of the legacy Truck Way Bill doctype into Waybill.
+
+Truck Way Bills are copied in chunks of MIGRATION_CHUNK_SIZE, ordered by name
+so an interrupted run resumes where it stopped. The free-text plate number and
+driver are resolved to Vehicle and Driver through a cached index, the original
+Truck Way Bill name is kept as the waybill number and in the `truck_way_bill`
+link, and anything without a Waybill field goes to the remarks.
+
+Until every report reads Waybill, the LAND_WAYBILL_VIEW view exposes migrated
+and not yet migrated land waybills as one table.
+"""
+
+MIGRATION_CHUNK_SIZE = 500
+
+LINK_INDEX_CACHE_KEY = "ksa_logistics:waybill_link_index"
+LINK_INDEX_CACHE_TTL = 600
+
+LAND_WAYBILL_VIEW = "ksa_land_waybill"
+
+
+def normalize(value):
+    """Upper case without spaces and punctuation, so "ABC 1234" and "abc-1234" match"""
+    return "".join(ch for ch in (value or "").upper() if ch.isalnum())
+
+
+def build_link_index():
+    """{"vehicles": {plate: name}, "drivers": {name or mobile: name}} with ambiguous keys dropped"""
+    vehicles, drivers = {}, {}
+
+    for vehicle in frappe.get_all("Vehicle", fields=["name", "license_plate"]):
+        for key in {normalize(vehicle.name), normalize(vehicle.license_plate)} - {""}:
+            vehicles[key] = vehicle.name if vehicles.get(key, vehicle.name) == vehicle.name else None
+
+    for driver in frappe.get_all("Driver", fields=["name", "full_name", "cell_number"]):
+        for key in {normalize(driver.full_name), normalize(driver.cell_number)} - {""}:
+            drivers[key] = driver.name if drivers.get(key, driver.name) == driver.name else None
+
+    return {
+        "vehicles": {k: v for k, v in vehicles.items() if v},
+        "drivers": {k: v for k, v in drivers.items() if v},
+    }
+
+
+def get_link_index():
+    cache = frappe.cache()
+    index = cache.get_value(LINK_INDEX_CACHE_KEY)
+    if index is None:
+        index = build_link_index()
+        cache.set_value(LINK_INDEX_CACHE_KEY, index, expires_in_sec=LINK_INDEX_CACHE_TTL)
+    return index
+
+
+def get_pending_truck_way_bills(after=None, limit=MIGRATION_CHUNK_SIZE):
+    """Next chunk of Truck Way Bills without a Waybill, by name after `after`"""
+    return frappe.db.sql("""
+        SELECT twb.*
+        FROM `tabTruck Way Bill` twb
+        WHERE twb.name > %(after)s
+            AND NOT EXISTS (
+                SELECT 1 FROM `tabWaybill` wb WHERE wb.truck_way_bill = twb.name
+            )
+        ORDER BY twb.name
+        LIMIT %(limit)s
+    """, {"after": after or "", "limit": limit}, as_dict=True)
+
+
+def get_remarks(twb, unresolved):
+    lines = [_("Migrated from Truck Way Bill {0}").format(twb.name)]
+    for label, value in (
+        (_("Vehicle Type"), twb.vehicle),
+        (_("Shipper / Consignee"), twb.shipperconsignee),
+        (_("Driver ID No"), twb.id_no),
+        (_("Cell No 2"), twb.cell_no_2),
+        (_("Warehouse Job Record"), twb.warehouse_job_record),
+        *unresolved,
+    ):
+        if value:
+            lines.append(f"{label}: {value}")
+    return "\n".join(lines)
+
+
+def make_waybill_row(twb, index, locations):
+    """Waybill field values for a Truck Way Bill"""
+    vehicle = index["vehicles"].get(normalize(twb.plate_no))
+    driver = index["drivers"].get(normalize(twb.cell_no_1)) or index["drivers"].get(normalize(twb.driver_name))
+
+    unresolved = [
+        (_(label), twb.get(fieldname))
+        for label, fieldname in (("Origin", "origin"), ("Destination", "destination"))
+        if twb.get(fieldname) and twb.get(fieldname) not in locations
+    ]
+
+    return {
+        "waybill_number": twb.name,
+        "truck_way_bill": twb.name,
+        "transport_mode": "Land",
+        "waybill_status": "Prepared",
+        "waybill_date": twb.date or twb.creation.date(),
+        "job_record": twb.reference_job_record,
+        "customer": twb.customer,
+        "vehicle": vehicle,
+        "vehicle_plate_number": twb.plate_no,
+        "driver": driver,
+        "driver_name": twb.driver_name,
+        "driver_mobile": twb.cell_no_1,
+        "service_charge": twb.rent,
+        "origin": twb.origin if twb.origin in locations else None,
+        "destination": twb.destination if twb.destination in locations else None,
+        "consignee_address": "\n".join(
+            line for line in (twb.address_line_1, twb.address_line_2, twb.address_line_3) if line
+        ),
+        "cargo_description": strip_html(twb.description or "").strip(),
+        "remarks": get_remarks(twb, unresolved),
+    }
+
+
+def insert_waybills(truck_way_bills, index):
+    """Insert one Waybill per Truck Way Bill with a single multi-row insert"""
+    places = {twb.get(f) for twb in truck_way_bills for f in ("origin", "destination")} - {None, ""}
+    locations = set(frappe.get_all("Location", filters={"name": ["in", list(places)]}, pluck="name")) if places else set()
+
+    autoname = frappe.get_meta("Waybill").autoname
+    timestamp = now()
+    rows = []
+    for twb in truck_way_bills:
+        row = make_waybill_row(twb, index, locations)
+        # Name by the doctype's own rule, the controller autoname would also take a TWB number
+        waybill = frappe.new_doc("Waybill")
+        set_name_from_naming_options(autoname, waybill)
+        rows.append({
+            "name": waybill.name,
+            "owner": twb.owner,
+            "creation": twb.creation,
+            "modified": timestamp,
+            "modified_by": frappe.session.user,
+            "docstatus": 0,
+            **row,
+        })
+
+    fields = list(rows[0])
+    frappe.db.bulk_insert("Waybill", fields, [[row[f] for f in fields] for row in rows])
+
+
+@frappe.whitelist()
+def migrate_truck_way_bills():
+    """Queue the migration of every Truck Way Bill that has no Waybill yet"""
+    frappe.only_for("System Manager")
+    enqueue_truck_way_bill_migration()
+    return {"status": "queued", "message": _("Truck Way Bill migration started in the background")}
+
+
+def enqueue_truck_way_bill_migration():
+    frappe.enqueue(
+        "ksa_logistics.waybill_migration.run_truck_way_bill_migration",
+        queue="long",
+        timeout=3600,
+        job_id="ksa_logistics:truck_way_bill_migration",
+        deduplicate=True,
+        enqueue_after_commit=True
+    )
+
+
+def run_truck_way_bill_migration():
+    index = get_link_index()
+    migrated, failed, last = 0, [], None
+
+    while True:
+        chunk = get_pending_truck_way_bills(after=last)
+        if not chunk:
+            break
+        last = chunk[-1].name
+
+        frappe.db.savepoint("truck_way_bill_migration")
+        try:
+            insert_waybills(chunk, index)
+            frappe.db.commit()
+            migrated += len(chunk)
+        except Exception:
+            frappe.db.rollback(save_point="truck_way_bill_migration")
+            frappe.log_error(title=f"Truck Way Bill migration failed for {chunk[0].name} to {last}")
+            failed.extend(twb.name for twb in chunk)
+
+        frappe.publish_realtime(
+            "truck_way_bill_migration_progress",
+            {"migrated": migrated, "failed": len(failed)},
+            user=frappe.session.user
+        )
+
+    summary = {"migrated": migrated, "failed": failed}
+    frappe.publish_realtime("truck_way_bill_migration", summary, user=frappe.session.user)
+    return summary
+
+
+def create_land_waybill_view():
+    """
+    (Re)create the LAND_WAYBILL_VIEW read view: land Waybills plus the Truck Way
+    Bills not migrated yet, with the Waybill column names.
+    """
+    if not (frappe.db.table_exists("Waybill") and frappe.db.table_exists("Truck Way Bill")):
+        return
+
+    frappe.db.sql_ddl(f"""
+        CREATE OR REPLACE VIEW `{LAND_WAYBILL_VIEW}` AS
+        SELECT
+            'Waybill' AS source_doctype,
+            wb.name AS source_name,
+            wb.waybill_number,
+            wb.waybill_date,
+            wb.waybill_status,
+            wb.job_record,
+            wb.customer,
+            wb.vehicle,
+            wb.vehicle_plate_number,
+            wb.driver,
+            wb.driver_name,
+            wb.driver_mobile,
+            wb.origin,
+            wb.destination,
+            wb.service_charge,
+            wb.cargo_description,
+            wb.creation,
+            wb.modified
+        FROM `tabWaybill` wb
+        WHERE wb.transport_mode = 'Land'
+        UNION ALL
+        SELECT
+            'Truck Way Bill',
+            twb.name,
+            twb.name,
+            twb.date,
+            NULL,
+            twb.reference_job_record,
+            twb.customer,
+            NULL,
+            twb.plate_no,
+            NULL,
+            twb.driver_name,
+            twb.cell_no_1,
+            twb.origin,
+            twb.destination,
+            twb.rent,
+            twb.description,
+            twb.creation,
+            twb.modified
+        FROM `tabTruck Way Bill` twb
+        WHERE NOT EXISTS (SELECT 1 FROM `tabWaybill` wb WHERE wb.truck_way_bill = twb.name)
+    """)